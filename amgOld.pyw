@@ -2,7 +2,12 @@
 from datetime import datetime
 
 from gooey import Gooey, GooeyParser
-from pandas import read_excel, read_csv, DataFrame, errors
+from pandas import read_csv, DataFrame, errors
+
+from anthem_contracts import ContractResolver, reduce_unlisted
+from anthem_grid import load_branding_grid
+from anthem_proofs import select_proofs, write_with_proofs
+from instrument import finish_run, stage, start_run
 
 now = datetime.now()
 
@@ -31,100 +36,48 @@ class AnthemMerge:
         self._dfMailMerge = DataFrame()  # Mailing list to be grouped by Envelope for presort.
 
         # Import Branding Grid and Mailing List
-        try:
-            self._dfGrid = read_excel(brandgrid, dtype=str)
-        except errors.ParserError:
-            print("Unable to process Branding Grid")
-        try:
-            self._dfList = read_csv(maillist, dtype=str)
-        except errors.ParserError:
-            print("Unable to process Mailing List")
-
-        # ---- Branding Grid cleanup ---- #
-        self._dfGrid.columns = self._dfGrid.columns.str.title().str.strip()
-        # Assign Anthem to any empty 'Envelope' fields
-        self._dfGrid['Envelope'] = self._dfGrid['Envelope'].fillna('Anthem')
-        # Fill in remaining na values.
-        self._dfGrid = self._dfGrid.fillna('')
-        self._dfGrid = self._dfGrid.apply(lambda x: x.str.strip())
-
-        # Merge Contract Number columns and drop original columns.
+        # The grid is cleaned and its Contract Number columns merged by load_branding_grid.
         print('Generating Contract Numbers...')
-        self._dfGrid['Contract Number'] = self._dfGrid.apply(self.col_merge, axis=1)
-        self._dfGrid.drop(['Cms Contract', '2018 Pbp', 'Sourcegroupnumber', 'Sourcesubgrpnbr'],
-                          axis=1,
-                          inplace=True)
-
-    # --- Data Adjustment Functions ---
-    @staticmethod
-    def col_merge(row):
-        """
-        Combine Contract Elements separated by a '-'
-        :param row:
-        :return str:
-        """
-        contract_name = []
-        if row['Cms Contract']:
-            contract_name.append(row['Cms Contract'])
-        if row['2018 Pbp']:
-            contract_name.append(row['2018 Pbp'])
-        if row['Sourcegroupnumber']:
-            contract_name.append(row['Sourcegroupnumber'])
-        if row['Sourcesubgrpnbr']:
-            contract_name.append(row['Sourcesubgrpnbr'])
-        return '-'.join(contract_name)
-
-    def list_check(self, row):
-        """
-        Check for 4 tier List Contract Number in grid_df.
-        If not found, check for 3 tier, otherwise return 2 tier List Contract Number.
-        :param row:
-        :return str:
-        """
-        if row['List Contract Number'] in row[self._dfGrid['Contract Number']]:
-            return row['List Contract Number']
-        if "-".join(row['List Contract Number'].split('-')[:3]) in row[self._dfGrid['Contract Number']]:
-            return "-".join(row['List Contract Number'].split('-')[:3])
-        else:
-            return "-".join(row['List Contract Number'].split('-')[:2])
-
-    def grid_check(self, row):
-        """
-        Method to assign partial Contract Number matches
-        Check for Contract Number in _dfList. If not found, reduce to 2 tier Contract Number
-        :param row:
-        :return str:
-        """
-        if row['Contract Number'] in row[self._dfList['Contract Number']]:
-            return row['Contract Number']
-        else:
-            return "-".join(row['Contract Number'].split('-')[:2])
+        with stage('read branding grid') as s:
+            try:
+                self._dfGrid = load_branding_grid(brandgrid)
+                s.rows_out = len(self._dfGrid.index)
+            except errors.ParserError:
+                print("Unable to process Branding Grid")
+        with stage('read mailing list') as s:
+            try:
+                self._dfList = read_csv(maillist, dtype=str)
+                s.rows_out = len(self._dfList.index)
+            except errors.ParserError:
+                print("Unable to process Mailing List")
 
     # --- Create joined DataFrames ---
     def merge(self):
         print('Merging files...')
-        self._dfList.drop(['Envelope'], axis=1, inplace=True)  # Drop Envelope Column from presorted list before merge.
-        self._dfGrid['Contract Number'] = self._dfGrid.apply(self.grid_check, axis=1)
-        self._dfMerged = self._dfList.join(self._dfGrid.drop_duplicates(['Contract Number'])
-                                           .set_index('Contract Number'),
-                                           on='Contract Number')
+        with stage('merge', rows_in=len(self._dfList.index)) as s:
+            self._dfList.drop(['Envelope'], axis=1, inplace=True)  # Drop Envelope Column from presorted list before merge.
+            # Reduce grid Contract Numbers that aren't on the list to Tier 2.
+            self._dfGrid['Contract Number'] = reduce_unlisted(self._dfGrid['Contract Number'],
+                                                              self._dfList['Contract Number'])
+            self._dfMerged = self._dfList.join(self._dfGrid.drop_duplicates(['Contract Number'])
+                                               .set_index('Contract Number'),
+                                               on='Contract Number')
+            s.rows_out = len(self._dfMerged.index)
 
         self._dfFinal = self._dfMerged  # set to _dfFinal for when proofs aren't being made.
 
-    def get_proofs(self):
+    def get_proofs(self, n=2, per=None):
         """
         Generate a new data working_df consisting of the first 2 records
         of each unique contract number
+        :param n: number of proofs per contract number
+        :param per: optional {Contract Number: number} overrides
         """
 
         print('Getting unique Contract Numbers for proofs..')
-        contracts = self._dfMerged['Contract Number'].unique()
-        for x in range(len(contracts)):
-            self._dfProofs = self._dfProofs.append(self._dfMerged.loc[self._dfMerged['Contract Number'] ==
-                                                                      contracts[x]].head(2))
-        self._dfProofs['Proofs'] = 'Proof'
-        print('Adding proofs to mailing list...')
-        self._dfFinal = self._dfProofs.append(self._dfMerged, ignore_index=True, sort=False)
+        with stage('proofs', rows_in=len(self._dfMerged.index)) as s:
+            self._dfProofs = select_proofs(self._dfMerged, n=n, per=per)
+            s.rows_out = len(self._dfProofs.index)
 
     # --- Output Methods ---
     def mail_list_env(self):
@@ -134,30 +87,41 @@ class AnthemMerge:
         # Cleanup Mailing List
         self._dfList.columns = self._dfList.columns.str.title()
         print('Verifying Contract Numbers...')
-        self._dfList['Contract Number'] = self._dfList.apply(self.list_check, axis=1)
-        # self._dfMailGrid['Contract Number'] = self._dfMailGrid.apply(self.grid_check, axis=1)
-        self._dfMailMerge = self._dfList.join(self._dfMailGrid.drop_duplicates(['Contract Number'])
-                                              .set_index('Contract Number'),
-                                              on='Contract Number')
-
-        # Output new .csv files based on Envelope type.
-        sorted_frames = dict(tuple(self._dfMailMerge.groupby(['Envelope'])))
-        frame_list = [sorted_frames[x] for x in sorted_frames]
-        for idx, frame in enumerate(frame_list):
-            frame_list[idx].to_csv(frame_list[idx].iloc[0]['Envelope'] + f' Envelope List_{now:%m%d%y}.csv',
-                                   index=False,
-                                   header=True)
-
-        # Output breakdown of merged list based on Envelope type and Contract Number
-        # Fill na values with #N/A to indicate missing values from join.
-        df_group = self._dfMailMerge.fillna('#N/A').groupby(['Envelope', 'Contract Number'])
-        df_group['Envelope'].agg(len).to_csv(f'Merge Summary_{now:%m%d%y}.csv', header=True)
+        with stage('resolve contracts', rows_in=len(self._dfList.index)) as s:
+            # Longest match in the Branding Grid, otherwise the Tier 2 List Contract Number.
+            resolver = ContractResolver(self._dfGrid['Contract Number'])
+            self._dfList['Contract Number'], tiers = resolver.resolve(self._dfList['List Contract Number'])
+            print(resolver.tier_counts(tiers).to_string())
+            self._dfMailMerge = self._dfList.join(self._dfMailGrid.drop_duplicates(['Contract Number'])
+                                                  .set_index('Contract Number'),
+                                                  on='Contract Number')
+            s.rows_out = len(self._dfMailMerge.index)
+
+        with stage('write envelope lists', rows_in=len(self._dfMailMerge.index)):
+            # Output new .csv files based on Envelope type.
+            sorted_frames = dict(tuple(self._dfMailMerge.groupby(['Envelope'])))
+            frame_list = [sorted_frames[x] for x in sorted_frames]
+            for idx, frame in enumerate(frame_list):
+                frame_list[idx].to_csv(frame_list[idx].iloc[0]['Envelope'] + f' Envelope List_{now:%m%d%y}.csv',
+                                       index=False,
+                                       header=True)
+
+            # Output breakdown of merged list based on Envelope type and Contract Number
+            # Fill na values with #N/A to indicate missing values from join.
+            df_group = self._dfMailMerge.fillna('#N/A').groupby(['Envelope', 'Contract Number'])
+            df_group['Envelope'].agg(len).to_csv(f'Merge Summary_{now:%m%d%y}.csv', header=True)
 
     def create_csv(self):
         """ Output to csv file with Latin(ISO-8859-1) encoding for compatibility with Variable Data Software """
         name = f'Anthem Merged_{now:%m%d%y}'
         print('Outputting list to .csv...')
-        self._dfFinal.to_csv(name + '.csv', index=False, encoding='ISO-8859-1')
+        with stage('write merged list', rows_in=len(self._dfFinal.index)) as s:
+            if self._dfProofs.empty:
+                self._dfFinal.to_csv(name + '.csv', index=False, encoding='ISO-8859-1')
+            else:
+                print('Adding proofs to mailing list...')
+                write_with_proofs(self._dfProofs, self._dfFinal, name + '.csv', encoding='ISO-8859-1')
+            s.rows_out = len(self._dfProofs.index) + len(self._dfFinal.index)
 
 
 @Gooey(program_name='Anthem Merge Program')
@@ -177,6 +141,7 @@ def main():
                              action="store_true")
     args = parser.parse_args()
 
+    start_run('Anthem Merge')
     anthemjob = AnthemMerge(args.Branding_Grid, args.Mailing_List)
     if args.Data:
         # Process files for data processing. For use with customer original data.
@@ -187,6 +152,7 @@ def main():
         anthemjob.get_proofs()
         anthemjob.create_csv()
     del anthemjob
+    finish_run()
     print('Job Complete!')
 
 
@@ -5,8 +5,6 @@ from tkinter import *
 from tkinter.filedialog import askopenfilename
 from tkinter.ttk import *
 
-from amgOld import AnthemMerge
-
 now = datetime.datetime.now()
 
 # TODO: Change import based on file type.
@@ -68,6 +66,9 @@ class Window(Frame):
         self.ent_list.insert(0, path.basename(self.maillist))
 
     def process(self):
+        # pandas is only loaded once a job is run, so the window opens straight away.
+        from amgOld import AnthemMerge
+
         anthemjob = AnthemMerge(self.brandgrid, self.maillist)
         anthemjob.merge()
         anthemjob.get_proofs()
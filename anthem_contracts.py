@@ -0,0 +1,108 @@
+# Python 3.7.2
+""" Resolve mailing list contract numbers against the Anthem branding grid. """
+from numpy import append, array, flatnonzero, ones, zeros
+from pandas import Series, factorize
+
+from normalize import arrow_strings
+
+try:
+    import pyarrow.compute as pc
+except ImportError:  # pandas string methods only
+    pc = None
+
+
+def contract_prefix(contract, tier):
+    """
+    First 'tier' elements of a '-' separated contract number.
+    :param contract: e.g. 'H1234-001-GRP-SUB'
+    :param tier: number of elements to keep
+    :return str:
+    """
+    return '-'.join(contract.split('-')[:tier])
+
+
+def tier_prefixes(contracts, min_tier):
+    """
+    Prefixes of every contract number for each tier from min_tier up to the longest contract,
+    one column-wise pass per tier. Contracts shorter than a tier keep their whole number at that tier.
+    :param contracts: Series of contract number strings
+    :param min_tier: shortest prefix
+    :return tuple: (array of element counts, dict of tier to array of prefixes)
+    """
+    values = arrow_strings(contracts)
+    if values is None:
+        parts = contracts.str.split('-')
+        lengths = parts.str.len().to_numpy(dtype=int)
+        top = max(lengths.max(initial=0), min_tier)
+        return lengths, {tier: parts.str[:tier].str.join('-').to_numpy(dtype=object)
+                         for tier in range(min_tier, top + 1)}
+    parts = pc.split_pattern(values, '-')
+    lengths = pc.list_value_length(parts).to_numpy(zero_copy_only=False)
+    top = max(lengths.max(initial=0), min_tier)
+    return lengths, {tier: pc.binary_join(pc.list_slice(parts, 0, tier), '-').to_numpy(zero_copy_only=False)
+                     for tier in range(min_tier, top + 1)}
+
+
+class ContractResolver:
+    def __init__(self, grid_contracts, min_tier=2):
+        """
+        Hashed lookup of the branding grid contract numbers.
+        :param grid_contracts: iterable of grid Contract Numbers (e.g. grid_df.index)
+        :param min_tier: shortest prefix used; contracts without a longer match fall back to it
+        """
+        self.min_tier = min_tier
+        self.contracts = set(grid_contracts)
+
+    def resolve(self, contracts):
+        """
+        Resolve a column of list contract numbers to the longest prefix that is a grid Contract Number.
+        The unique contract numbers are matched one tier at a time, longest tier first, and the result
+        broadcast back to every row. Contracts without a match fall back to their min_tier prefix.
+        :param contracts: Series of list contract numbers
+        :return tuple: (Series of resolved Contract Numbers, Series of matched tiers, 0 when unmatched)
+        """
+        codes, uniques = factorize(contracts)
+        numbers = array(uniques, dtype=object)
+        tiers = zeros(len(numbers), dtype=int)
+        # Non-string contract numbers are passed through unmatched.
+        rows = flatnonzero([isinstance(c, str) for c in numbers])
+        lengths, prefixes = tier_prefixes(Series(numbers[rows], dtype=object), self.min_tier)
+        unmatched = ones(len(rows), dtype=bool)
+        for tier in sorted(prefixes, reverse=True):
+            hits = unmatched & (lengths >= tier) & Series(prefixes[tier]).isin(self.contracts).to_numpy()
+            numbers[rows[hits]] = prefixes[tier][hits]
+            tiers[rows[hits]] = tier
+            unmatched &= ~hits
+        numbers[rows[unmatched]] = prefixes[self.min_tier][unmatched]
+        # Codes of -1 (missing contract numbers) index the trailing unmatched value.
+        numbers = append(numbers, None)
+        tiers = append(tiers, 0)
+        return (Series(numbers[codes], index=contracts.index, name='Contract Number'),
+                Series(tiers[codes], index=contracts.index, name='Tier'))
+
+    @staticmethod
+    def tier_counts(tiers):
+        """
+        Number of records matched at each tier.
+        :param tiers: Series of tiers from resolve
+        :return Series: count per tier label
+        """
+        counts = tiers.value_counts()
+        stats = {f'Tier {t}': int(counts[t]) for t in sorted(counts.index, reverse=True) if t}
+        stats['Unmatched'] = int(counts.get(0, 0))
+        return Series(stats, name='Count')
+
+
+def reduce_unlisted(grid_contracts, list_contracts, tier=2):
+    """
+    Reduce grid Contract Numbers that are not on the mailing list to their 'tier' prefix,
+    so list contracts resolved to that tier still find a grid row.
+    :param grid_contracts: Series of grid Contract Numbers
+    :param list_contracts: Series of list Contract Numbers
+    :param tier: prefix length
+    :return Series:
+    """
+    on_list = grid_contracts.isin(set(list_contracts.dropna()))
+    codes, uniques = factorize(grid_contracts)
+    prefixes = array([contract_prefix(c, tier) for c in uniques] + [None], dtype=object)
+    return grid_contracts.where(on_list, Series(prefixes[codes], index=grid_contracts.index))
@@ -0,0 +1,117 @@
+# Python 3.7.2
+""" Streaming Anthem Data path: split a mailing list into per-envelope lists one chunk at a time. """
+from collections import Counter
+from itertools import zip_longest
+
+from pandas import DataFrame, Series, read_csv
+from xlsxwriter import Workbook
+
+from anthem_contracts import ContractResolver
+from input_schema import STRING
+
+CHUNK_SIZE = 100000
+MISSING = '#N/A'
+
+
+class EnvelopeWriters:
+    def __init__(self, filename_format):
+        """
+        One .csv per envelope brand, opened when the brand's first rows arrive and the header written once.
+        :param filename_format: output name with an {envelope} field, e.g. '{envelope} Envelope List 010121.csv'
+        """
+        self.filename_format = filename_format
+        self.files = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def write(self, chunk, column='Envelope'):
+        """
+        Append each envelope's rows of a chunk to its list. Rows without an envelope aren't written.
+        :param chunk: DataFrame with an envelope column
+        :param column: envelope column
+        """
+        for envelope, rows in chunk.groupby(column, sort=False, observed=True):
+            f = self.files.get(envelope)
+            new = f is None
+            if new:
+                f = self.files[envelope] = open(self.filename_format.format(envelope=envelope), 'w', newline='',
+                                                encoding='utf-8')
+            rows.to_csv(f, header=new, index=False)
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+
+    @property
+    def filenames(self):
+        return {envelope: f.name for envelope, f in self.files.items()}
+
+
+def split_envelopes(mailing_list_file, grid_df, filename_format, chunksize=CHUNK_SIZE):
+    """
+    Resolve the Contract Number and Envelope of a mailing list chunk by chunk and append the rows to
+    per-envelope lists, keeping running counts for the summary. Memory is bounded by the chunk size.
+    :param mailing_list_file: mailing list (.csv) with a 'List Contract Number' column
+    :param grid_df: branding grid indexed by unique Contract Number, with an 'Envelope' column
+    :param filename_format: envelope list name with an {envelope} field
+    :param chunksize: mailing list rows read at a time
+    :return tuple: (DataFrame of Envelope, Contract Number and Count, Series of tier counts)
+    """
+    resolver = ContractResolver(grid_df.index)
+    # Plain text, so unmatched rows can be filled with MISSING (a categorical would need the category first).
+    envelopes = grid_df['Envelope'].astype(object)
+    counts = Counter()
+    tier_counts = Series(dtype='int64')
+
+    with EnvelopeWriters(filename_format) as writers:
+        for chunk in read_csv(mailing_list_file, dtype=STRING, chunksize=chunksize):
+            # Longest match in the Branding Grid, otherwise the Tier 2 List Contract Number.
+            chunk['Contract Number'], tiers = resolver.resolve(chunk['List Contract Number'])
+            tier_counts = tier_counts.add(resolver.tier_counts(tiers), fill_value=0)
+            chunk = chunk.join(envelopes, on='Contract Number')
+            writers.write(chunk)
+
+            keys = [chunk['Envelope'].fillna(MISSING), chunk['Contract Number'].fillna(MISSING)]
+            counts.update(chunk.groupby(keys, sort=False).size().to_dict())
+
+    summary = DataFrame([(envelope, contract, count) for (envelope, contract), count in counts.items()],
+                        columns=['Envelope', 'Contract Number', 'Count'])
+    return summary.sort_values(['Envelope', 'Contract Number']).reset_index(drop=True), tier_counts.astype(int)
+
+
+def write_summary(counts, filename):
+    """
+    Summary workbook with a Contract Number / Count block per envelope, unmatched ('#N/A') first.
+    :param counts: DataFrame of Envelope, Contract Number and Count (see split_envelopes)
+    :param filename: output .xlsx
+    """
+    envelope_list = sorted(counts['Envelope'].unique(), key=lambda e: (e != MISSING, e))
+    dfs = [counts.loc[counts['Envelope'] == envelope].reset_index(drop=True) for envelope in envelope_list]
+
+    with Workbook(filename, {'constant_memory': True}) as wb:
+        ws = wb.add_worksheet()
+        fmt_header = wb.add_format({'font_size': 14, 'bold': 1, 'align': 'center'})
+        fmt_bold = wb.add_format({'bold': 1})
+        fmt_right = wb.add_format({'align': 'right'})
+        cols = [idx * 3 for idx in range(len(dfs))]
+        for col in cols:
+            ws.set_column(col, col, 26)
+            ws.set_column(col+1, col+1, 9, fmt_right)
+
+        # constant_memory flushes each row once the next is started, so the envelopes are written across.
+        for col, envelope in zip(cols, envelope_list):
+            ws.merge_range(0, col, 0, col+1, envelope, fmt_header)
+        for col, frame in zip(cols, dfs):
+            ws.write(1, col, 'Total', fmt_bold)
+            ws.write(1, col+1, int(frame['Count'].sum()), fmt_bold)
+        for col in cols:
+            ws.write_row(2, col, ['Contract Number', 'Count'])
+        rows = zip_longest(*[frame[['Contract Number', 'Count']].values.tolist() for frame in dfs])
+        for row, values in enumerate(rows, 3):
+            for col, value in zip(cols, values):
+                if value is not None:
+                    ws.write_row(row, col, value)
@@ -0,0 +1,74 @@
+# Python 3.7.2
+""" Anthem branding grid loader with vectorized Contract Number construction and a parsed grid cache. """
+import re
+from hashlib import sha1
+
+from pandas import read_excel
+
+from input_cache import cache_location, cached_frame, file_digest
+from input_schema import ANTHEM_GRID, STRING
+
+PBP_COLUMN = re.compile(r'^\d{4} Pbp$')
+# Part of the cache key: raise it when load_branding_grid changes the grid it builds.
+LOADER_VERSION = 2
+
+
+def default_key_columns(columns):
+    """
+    Contract Number elements in order. The plan benefit package column is found by its '<year> Pbp' name,
+    so a new plan year's grid works without a code change.
+    :param columns: grid column names (title cased)
+    :return list:
+    :raises ValueError: when there is no '<year> Pbp' column
+    """
+    pbp = [c for c in columns if PBP_COLUMN.match(c)]
+    if not pbp:
+        raise ValueError("No '<year> Pbp' column in the branding grid, pass key_columns to load_branding_grid")
+    return ['Cms Contract'] + pbp[:1] + ['Sourcegroupnumber', 'Sourcesubgrpnbr']
+
+
+def contract_numbers(grid_df, key_columns):
+    """
+    Combine the non-empty Contract elements separated by a '-', column by column.
+    :param grid_df: grid DataFrame with empty elements as ''
+    :param key_columns: Contract Number element columns in order
+    :return Series:
+    """
+    contract = grid_df[key_columns[0]]
+    for col in key_columns[1:]:
+        part = grid_df[col]
+        # With either side empty, plain concatenation gives the non-empty one.
+        contract = (contract + '-' + part).where((contract != '') & (part != ''), contract + part)
+    return contract
+
+
+def load_branding_grid(filename, key_columns=None, cache_dir=None):
+    """
+    Read and clean a branding grid and build its 'Contract Number' column, dropping the element columns.
+    The cleaned grid is kept in the input cache keyed by the hash of the source file, the key columns, the
+    loader version and the grid schema, so repeat runs against the same grid skip read_excel.
+    :param filename: branding grid (.xlsx)
+    :param key_columns: Contract Number element columns, found with default_key_columns when None
+    :param cache_dir: cache location, input_cache.CACHE_DIR when None, '' to disable the cache
+    :return DataFrame:
+    """
+    def build():
+        grid_df = read_excel(filename, dtype=str)
+        grid_df.columns = grid_df.columns.str.title().str.strip()
+        # Fill in envelope data that is not otherwise indicated.
+        grid_df['Envelope'] = grid_df['Envelope'].fillna('Anthem')
+        grid_df = grid_df.fillna('')
+        grid_df = grid_df.apply(lambda x: x.str.strip())
+
+        # Merge Contract Number columns and drop original columns.
+        columns = key_columns or default_key_columns(grid_df.columns)
+        grid_df['Contract Number'] = contract_numbers(grid_df, columns)
+        grid_df.drop(columns, axis=1, inplace=True)
+        return ANTHEM_GRID.apply(grid_df)
+
+    cache_dir = cache_location(cache_dir)
+    if not cache_dir:
+        return build()
+    schema = f'{sorted(ANTHEM_GRID.categories)}|{STRING}'
+    key = sha1(f'grid|{LOADER_VERSION}|{schema}|{file_digest(filename)}|{key_columns}'.encode('utf-8')).hexdigest()
+    return cached_frame(key, build, cache_dir)
@@ -0,0 +1,93 @@
+# Python 3.7.2
+""" Anthem merge pipeline behind the Gooey (anthem-merge.pyw) and command line (duke.py) front ends. """
+from datetime import datetime
+from os import path
+
+import pandas as pd
+
+from anthem_contracts import ContractResolver
+from anthem_envelopes import split_envelopes, write_summary
+from anthem_grid import load_branding_grid
+from anthem_proofs import select_proofs, write_with_proofs
+from input_schema import ANTHEM_LIST, STRING
+from instrument import stage
+
+now = datetime.now()
+
+
+def initialize_branding_grid(branding_grid_file, key_columns=None):
+    grid_df = pd.DataFrame()
+    try:
+        # Cleaned grid with merged Contract Number columns, served from cache on repeat runs.
+        grid_df = load_branding_grid(branding_grid_file, key_columns)
+    except pd.errors.ParserError:
+        print("Unable to process Branding Grid")
+
+    grid_df.drop_duplicates(subset=['Contract Number'], inplace=True)
+    grid_df.set_index('Contract Number', inplace=True)
+    return grid_df
+
+
+def initialize_mailing_list(mailing_list_file, grid_df):
+    list_df = pd.DataFrame()
+    try:
+        list_df = pd.read_csv(mailing_list_file, dtype=STRING)
+    except pd.errors.ParserError:
+        print("Unable to process Mailing List")
+
+    # Resolve each List Contract Number to its longest match in the Branding Grid.
+    # Contracts without a match are filled in with their Tier 2 contract number.
+    resolver = ContractResolver(grid_df.index)
+    list_df['Contract Number'], tiers = resolver.resolve(list_df['List Contract Number'])
+    print(resolver.tier_counts(tiers).to_string())
+    return ANTHEM_LIST.apply(list_df)
+
+
+def generate_proofs(working_df, n=2, per=None, per_column=None):
+    """
+    First n records of each Contract Number, marked as proofs.
+    :param working_df: merged DataFrame
+    :param n: number of proofs per Contract Number
+    :param per: optional {value: number} overrides, e.g. {'Amerigroup': 3}
+    :param per_column: column the overrides are keyed on, e.g. 'Envelope' (defaults to 'Contract Number')
+    :return DataFrame:
+    """
+    return select_proofs(working_df, n=n, per=per, per_column=per_column)
+
+
+def run_merge(branding_grid_file, mailing_list_file, purpose=('Data', 'Merge'), key_columns=None, proofs=2):
+    """
+    Write the envelope lists and summary (Data) and/or the merged variable list with proofs (Merge)
+    to the current directory.
+    :param branding_grid_file: Branding Grid (.xlsx)
+    :param mailing_list_file: processed mailing list (.csv)
+    :param purpose: 'Data', 'Merge' or both
+    :param key_columns: Branding Grid Contract Number columns in order, found from the header when None
+    :param proofs: number of proofs per Contract Number (Merge)
+    """
+    with stage('read branding grid') as s:
+        grid_df = initialize_branding_grid(branding_grid_file, key_columns)
+        s.rows_out = len(grid_df.index)
+
+    if 'Data' in purpose:
+        # Streamed one chunk at a time into a list per envelope brand.
+        with stage('envelope lists') as s:
+            counts, tiers = split_envelopes(mailing_list_file, grid_df, f'{{envelope}} Envelope List {now:%m%d%y}.csv')
+            print(tiers.to_string())
+            write_summary(counts, f'Anthem Merge Summary_{now:%m%d%y}.xlsx')
+            s.rows_out = int(counts['Count'].sum())
+
+    if 'Merge' in purpose:
+        with stage('read mailing list') as s:
+            mail_df = initialize_mailing_list(mailing_list_file, grid_df)
+            s.rows_out = len(mail_df.index)
+        with stage('merge', rows_in=len(mail_df.index)) as s:
+            mail_df.drop(['Envelope'], axis=1, inplace=True)
+            merged_df = mail_df.join(grid_df, on='Contract Number')
+            s.rows_out = len(merged_df.index)
+        with stage('proofs', rows_in=len(merged_df.index)) as s:
+            proof_df = generate_proofs(merged_df, n=proofs)
+            s.rows_out = len(proof_df.index)
+        with stage('write merged list', rows_in=len(merged_df.index)):
+            filename = path.basename(mailing_list_file).rsplit(' ', 1)[0]
+            write_with_proofs(proof_df, merged_df, f'{filename} Merged Variable.csv', encoding='ISO-8859-1')
@@ -0,0 +1,50 @@
+# Python 3.7.2
+""" Proof record selection and merged variable file output for the Anthem merge. """
+from numpy import argsort
+from pandas import Series, factorize
+
+CHUNK_SIZE = 100000
+
+
+def select_proofs(frame, n=2, column='Contract Number', per=None, per_column=None):
+    """
+    First n records of each contract in a single grouped pass, ordered by the first appearance of each
+    contract the same way the original per-contract loop was. Records without a contract get no proofs.
+    :param frame: merged DataFrame
+    :param n: number of proofs per contract
+    :param column: column identifying a proof version
+    :param per: optional {value: n} overrides, e.g. {'Amerigroup': 3}
+    :param per_column: column the per overrides are keyed on (defaults to column)
+    :return DataFrame: proof records with a 'Proofs' column
+    """
+    codes, _ = factorize(frame[column])
+    ranks = Series(codes).groupby(codes).cumcount().values
+
+    limits = n
+    if per:
+        limits = frame[per_column or column].map(per).fillna(n).values
+    selected = (codes >= 0) & (ranks < limits)
+
+    # Stable sort by contract so each contract's proofs stay together and in list order.
+    positions = selected.nonzero()[0]
+    positions = positions[argsort(codes[positions], kind='mergesort')]
+    proofs = frame.iloc[positions].copy()
+    proofs['Proofs'] = 'Proof'
+    return proofs
+
+
+def write_with_proofs(proofs, body, filename, encoding='ISO-8859-1', chunksize=CHUNK_SIZE):
+    """
+    Write the proofs followed by the full list without building the combined frame in memory.
+    Columns match proofs.append(body): the body rows have an empty 'Proofs' column.
+    :param proofs: DataFrame from select_proofs
+    :param body: merged DataFrame
+    :param filename: output .csv
+    :param encoding: output encoding (Latin for the Variable Data Software)
+    :param chunksize: body rows written at a time
+    """
+    columns = list(proofs.columns) + [c for c in body.columns if c not in proofs.columns]
+    proofs.reindex(columns=columns).to_csv(filename, index=False, encoding=encoding)
+    for start in range(0, len(body.index), chunksize):
+        body.iloc[start:start + chunksize].reindex(columns=columns).to_csv(filename, mode='a', header=False,
+                                                                            index=False, encoding=encoding)
@@ -0,0 +1,216 @@
+# Python 3.7.2
+""" Seeded synthetic inputs for the benchmark suite: MMO order XML, BCC variable files, Anthem grids/lists and W weekly billing files. """
+from os import makedirs, path
+from xml.sax.saxutils import escape
+
+from numpy import array, where
+from numpy.random import RandomState
+from pandas import DataFrame
+
+from report_writer import write_report
+
+CHUNK_SIZE = 100000
+
+FIRST = ['James', 'Mary', 'Robert', 'Patricia', 'John', 'Jennifer', 'Michael', 'Linda', 'William', 'Elizabeth',
+         'David', 'Barbara', 'Richard', 'Susan', 'Joseph', 'Jessica', 'Thomas', 'Sarah', 'Charles', 'Karen']
+LAST = ['Smith', 'Johnson', 'Williams', 'Brown', 'Jones', 'Garcia', 'Miller', 'Davis', 'Rodriguez', 'Martinez',
+        'Hernandez', 'Lopez', 'Gonzalez', 'Wilson', 'Anderson', 'Thomas', 'Taylor', 'Moore', 'Jackson', 'Martin']
+STREETS = ['Main St', 'Oak Ave', 'Maple Dr', 'Cedar Ln', 'Park Blvd', 'Elm St', 'Lake Rd', 'Hill St',
+           'Pine Ct', 'Washington Ave', 'Church St', 'High St']
+CITIES = [('Cleveland', 'OH', '44101'), ('Columbus', 'OH', '43004'), ('Akron', 'OH', '44301'),
+          ('Toledo', 'OH', '43601'), ('Dayton', 'OH', '45401'), ('Canton', 'OH', '44701'),
+          ('Indianapolis', 'IN', '46201'), ('Richmond', 'VA', '23218'), ('Atlanta', 'GA', '30301'),
+          ('Boston', 'MA', '02108')]
+
+MMO_PRODUCTS = ['MMO ENROLLKIT', 'MMO MGNFR', 'MMO UMG', 'MMO OSB', '']
+MMO_ORDER_TYPES = ['SalesCallCenter', 'End User', 'CustomerCare', '']
+BILLING_PRODUCTS = ['PEK', 'MMO MAG', 'MMO OSB', 'UMG']
+BILLING_ORDER_TYPES = ['BRE', 'WEB', 'Call Center', 'Customer Service']
+ENVELOPES = ['Anthem', 'Amerigroup', 'Empire', '']
+
+
+def _pick(state, values, n):
+    """ n values drawn uniformly from a list, as an object array. """
+    return array(values, dtype=object)[state.randint(0, len(values), n)]
+
+
+def _people(state, n):
+    """ Names and addresses, with a share of repeated people for the dedupe stages. """
+    city = state.randint(0, len(CITIES), n)
+    people = DataFrame({'First': _pick(state, FIRST, n),
+                        'Last': _pick(state, LAST, n),
+                        'Address': state.randint(1, 9999, n).astype(str).astype(object) + ' ' +
+                        _pick(state, STREETS, n),
+                        'City': array([c[0] for c in CITIES], dtype=object)[city],
+                        'State': array([c[1] for c in CITIES], dtype=object)[city],
+                        'Zip': array([c[2] for c in CITIES], dtype=object)[city]})
+    # About 5% of the rows repeat an earlier person.
+    repeats = (state.random_sample(n) < .05).nonzero()[0]
+    repeats = repeats[repeats > 0]
+    people.iloc[repeats] = people.iloc[state.randint(0, repeats, len(repeats)) if len(repeats) else []].values
+    return people
+
+
+def mmo_orders(n, seed=0):
+    """
+    Orders as XmlImport reads them, keyed by XML tag.
+    :param n: number of orders
+    :param seed: random seed
+    :return DataFrame: one column per tag, '' where a tag is empty
+    """
+    state = RandomState(seed)
+    people = _people(state, n)
+    return DataFrame({'ShipToName': people['First'] + ' ' + people['Last'],
+                      'ShipToAddress1': people['Address'],
+                      'ShipToCity': people['City'],
+                      'ShipToState': people['State'],
+                      'ShipToZip': people['Zip'],
+                      'ShipToAddress3': '',
+                      'ProductCode': _pick(state, MMO_PRODUCTS, n),
+                      'ProductName': '',
+                      'PromiseDate': '01/15/2021',
+                      'OrderType': _pick(state, MMO_ORDER_TYPES, n),
+                      'OrderDate': '01/04/2021',
+                      'UserEmail': '',
+                      'ShipToAddress4': state.randint(2000000000, 9999999999, n).astype(str),
+                      'BillToRegion': _pick(state, ['Region 1', 'Region 1S', 'Region 2', ''], n),
+                      'PlanYear': _pick(state, ['2020', '2021', ''], n),
+                      'PlanType': _pick(state, ['MAPD', 'PDP'], n),
+                      'MemberType': _pick(state, ['Member', 'Prospect'], n),
+                      'WebtrendscampaignIDcode': _pick(state, ['', 'Prospect', 'Spring'], n)})
+
+
+def write_mmo_xml(orders, directory, files=10):
+    """
+    Write orders as MMO order XML files.
+    :param orders: DataFrame from mmo_orders
+    :param directory: output folder
+    :param files: number of files the orders are spread over
+    :return list: file paths
+    """
+    makedirs(directory, exist_ok=True)
+    tags = list(orders.columns)
+    per_file = -(-len(orders.index) // files)
+    filenames = []
+    for idx, start in enumerate(range(0, len(orders.index), per_file)):
+        filename = path.join(directory, f'MMO Orders {idx:03}.xml')
+        with open(filename, 'w', encoding='utf-8') as f:
+            f.write('<?xml version="1.0" encoding="utf-8"?>\n<Orders>\n')
+            for values in orders.iloc[start:start + per_file].itertuples(index=False):
+                f.write('<Order>' + ''.join(f'<{tag}>{escape(str(value))}</{tag}>'
+                                            for tag, value in zip(tags, values)) + '</Order>\n')
+            f.write('</Orders>\n')
+        filenames.append(filename)
+    return filenames
+
+
+def write_bcc_file(filename, n, variables=60, sparsity=.6, sep=',', seed=0):
+    """
+    Wide, sparse variable data file like the BCC lists checked by the QC tools. Pkg/Con columns carry
+    '###'/'***' markers, two columns are always empty and every row has blank variable fields.
+    :param filename: output .csv/.txt
+    :param n: number of rows
+    :param variables: number of variable fields
+    :param sparsity: share of blank variable fields
+    :param sep: ',' for .csv, '\\t' for .txt
+    :param seed: random seed
+    """
+    state = RandomState(seed)
+    for start in range(0, n, CHUNK_SIZE):
+        rows = min(CHUNK_SIZE, n - start)
+        people = _people(state, rows)
+        chunk = DataFrame({'Key Code': (start + 1 + state.permutation(rows)).astype(str),
+                           'First Name': people['First'], 'Last Name': people['Last'],
+                           'Address 1': people['Address'], 'Address 2': '',
+                           'City': people['City'], 'State': people['State'], 'Zip': people['Zip'],
+                           'Pkg': where(state.random_sample(rows) < .01, '###', 'A'),
+                           'Con': where(state.random_sample(rows) < .01, '***', '01'),
+                           'Empty 1': '', 'Empty 2': ''})
+        for idx in range(variables):
+            values = _pick(state, [f'Value {idx}-{v}' for v in range(20)], rows)
+            chunk[f'Var {idx:02}'] = where(state.random_sample(rows) < sparsity, '', values)
+        chunk.to_csv(filename, sep=sep, index=False, header=start == 0, mode='w' if start == 0 else 'a')
+
+
+def anthem_grid(contracts=2000, seed=0):
+    """
+    Branding grid with 4-tier contract keys (contract, plan benefit package, group, subgroup).
+    About a fifth of the rows leave the subgroup or group empty, giving 2 and 3 tier keys.
+    :param contracts: number of grid rows
+    :param seed: random seed
+    :return DataFrame: columns as on the client's grid
+    """
+    state = RandomState(seed)
+    group = array([f'G{g:05}' for g in state.randint(0, 99999, contracts)], dtype=object)
+    subgroup = array([f'S{s:03}' for s in state.randint(0, 999, contracts)], dtype=object)
+    tiers = state.random_sample(contracts)
+    subgroup[tiers < .2] = ''
+    group[tiers < .1] = ''
+    grid = DataFrame({'CMS CONTRACT': array([f'H{c:04}' for c in state.randint(1000, 9999, contracts)]),
+                      '2021 PBP': array([f'{p:03}' for p in state.randint(1, 40, contracts)]),
+                      'SOURCEGROUPNUMBER': group,
+                      'SOURCESUBGRPNBR': subgroup,
+                      'ENVELOPE': _pick(state, ENVELOPES, contracts),
+                      'LOGO': _pick(state, ['anthem.eps', 'amerigroup.eps', 'empire.eps'], contracts),
+                      'PHONE': state.randint(8000000000, 8999999999, contracts).astype(str),
+                      'TTY': '711',
+                      'URL': _pick(state, ['anthem.com', 'amerigroup.com', 'empireblue.com'], contracts)})
+    return grid.drop_duplicates(['CMS CONTRACT', '2021 PBP', 'SOURCEGROUPNUMBER', 'SOURCESUBGRPNBR'])
+
+
+def grid_contracts(grid):
+    """ Full '-' joined contract keys of a grid from anthem_grid. """
+    parts = grid[['CMS CONTRACT', '2021 PBP', 'SOURCEGROUPNUMBER', 'SOURCESUBGRPNBR']].values.tolist()
+    return ['-'.join(p for p in row if p) for row in parts]
+
+
+def write_anthem_list(filename, grid, n, seed=0):
+    """
+    Mailing list whose 'List Contract Number' matches the grid at tier 4 or 3, or not at all for a few rows.
+    :param filename: output .csv
+    :param grid: DataFrame from anthem_grid
+    :param n: number of rows
+    :param seed: random seed
+    """
+    state = RandomState(seed)
+    contracts = array(grid_contracts(grid), dtype=object)
+    for start in range(0, n, CHUNK_SIZE):
+        rows = min(CHUNK_SIZE, n - start)
+        people = _people(state, rows)
+        listed = contracts[state.randint(0, len(contracts), rows)]
+        draw = state.random_sample(rows)
+        # An unknown subgroup resolves at a shorter tier; an unknown contract doesn't resolve.
+        listed = where(draw < .15, listed + '-X99', listed)
+        listed = where(draw > .98, 'H0000-000-G00000-S000', listed)
+        chunk = DataFrame({'First Name': people['First'], 'Last Name': people['Last'],
+                           'Address': people['Address'], 'City': people['City'], 'State': people['State'],
+                           'Zip': people['Zip'], 'List Contract Number': listed})
+        chunk.to_csv(filename, index=False, header=start == 0, mode='w' if start == 0 else 'a')
+
+
+def write_weekly_files(directory, n, weeks=4, job='12345678', seed=0):
+    """
+    W weekly billing workbooks ('12345678 W01A.xlsx', ...) sharing n orders.
+    :param directory: output folder
+    :param n: total number of orders
+    :param weeks: number of weekly files
+    :param job: job number at the start of each file name
+    :param seed: random seed
+    :return list: file paths
+    """
+    makedirs(directory, exist_ok=True)
+    state = RandomState(seed)
+    per_week = -(-n // weeks)
+    filenames = []
+    for week in range(weeks):
+        rows = min(per_week, n - week * per_week)
+        if rows <= 0:
+            break
+        people = _people(state, rows)
+        orders = DataFrame({'FULL NAME': people['First'] + ' ' + people['Last'], 'ADDRESS': people['Address'],
+                            'CITY': people['City'], 'STATE': people['State'], 'ZIP': people['Zip'],
+                            'PRODUCT CODE': _pick(state, BILLING_PRODUCTS, rows),
+                            'ORDER TYPE': _pick(state, BILLING_ORDER_TYPES, rows),
+                            'WEBTRENDSCAMPAIGNIDCODE': _pick(state, ['Prospect', 'Member', ''], rows)})
+        filenames.append(write_report(orders, path.join(directory, f'{job} W{week + 1:02}A.xlsx')))
+    return filenames
@@ -0,0 +1,58 @@
+# Python 3.7.2
+"""
+Benchmark the vectorized name/address cleanup against the applymap lambdas it replaced in remove_dupes, on
+object columns and on the Arrow-backed string columns the loaders produce (input_schema.STRING).
+"""
+import re
+from argparse import ArgumentParser
+from timeit import repeat
+
+from numpy.random import RandomState
+
+from bench_data import _people
+from input_schema import STRING
+from normalize import normalize_frame
+
+COLUMNS = ['Full Name', 'Address', 'City']
+
+
+def orders(n_rows, seed=0):
+    """ Seeded lower case names/addresses with doubled spaces and a test record now and then. """
+    state = RandomState(seed)
+    people = _people(state, n_rows)
+    frame = people.assign(**{'Full Name': (people['First'] + '  ' + people['Last']).str.lower(),
+                             'Address': people['Address'].str.lower()})[COLUMNS]
+    frame.loc[state.random_sample(n_rows) < .001, 'Full Name'] = 'test record'
+    return frame
+
+
+def normalize_applymap(frame):
+    """ The previous cleanup: two Python lambdas per cell and a str.contains scan. """
+    frame = frame.copy()
+    frame[COLUMNS] = frame[COLUMNS].applymap(lambda x: x.title())
+    frame[COLUMNS] = frame[COLUMNS].applymap(lambda x: re.sub(' +', ' ', x))
+    return frame[~frame['Full Name'].str.lower().str.contains('test')]
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='*', default=[10000, 100000, 1000000])
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'applymap (s)':>13} {'object (s)':>11} {'string (s)':>11} {'speedup':>8}")
+    for n_rows in args.rows:
+        frame = orders(n_rows)
+        strings = frame.astype(STRING)
+        expected = normalize_applymap(frame)
+        for df in (frame, strings):
+            result = normalize_frame(df.copy(), COLUMNS, test_column='Full Name').astype(object)
+            assert expected.equals(result), 'Vectorized cleanup differs from the applymap cleanup'
+        old = min(repeat(lambda: normalize_applymap(frame), number=1, repeat=args.repeat))
+        new = [min(repeat(lambda: normalize_frame(df.copy(), COLUMNS, test_column='Full Name'),
+                          number=1, repeat=args.repeat)) for df in (frame, strings)]
+        print(f'{n_rows:>9} {old:>13.4f} {new[0]:>11.4f} {new[1]:>11.4f} {old / new[1]:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# Python 3.7.2
+""" Benchmark the rate table against per product boolean masks, with and without extra product codes. """
+from argparse import ArgumentParser
+from timeit import repeat
+
+from numpy import nan, select, where
+from numpy.random import RandomState
+from pandas import DataFrame, concat
+
+from mmo_rates import ANY, BRE, CHARGE, DATA, DEFAULT_RATES, EFFECTIVE, CHARGE_COLUMNS, KEY_COLUMNS, RateTable
+
+ORDER_TYPES = ['BRE', 'WEB', 'Call Center', 'Customer Service']
+
+
+def product_rates(n_products, seed=0):
+    """
+    Postage Out rate of the current product codes plus generated ones up to n_products.
+    :return dict: {product code: rate}
+    """
+    rates = dict(DEFAULT_RATES.loc[DEFAULT_RATES['Product Code'] != ANY, ['Product Code', 'Postage Out']].values)
+    state = RandomState(seed)
+    for idx in range(len(rates), n_products):
+        rates[f'MMO PRODUCT {idx:02}'] = round(float(state.uniform(0.5, 10)), 2)
+    return rates
+
+
+def orders(n_rows, products, seed=0):
+    """ Seeded orders with a missing product code or order type now and then. """
+    state = RandomState(seed)
+    codes = list(products) + [None]
+    types = ORDER_TYPES + [None]
+    return DataFrame({'PRODUCT CODE': [codes[i] for i in state.randint(0, len(codes), n_rows)],
+                      'ORDER TYPE': [types[i] for i in state.randint(0, len(types), n_rows)]})
+
+
+def price_masks(df, products):
+    """ The previous pricing: a full column mask per product code and where() for BRE. """
+    conditions = [df['PRODUCT CODE'] == code for code in products]
+    priced = DataFrame(index=df.index)
+    priced['Postage In'] = where(df['ORDER TYPE'] == 'BRE', BRE, 0)
+    priced['Postage Out'] = select(conditions, list(products.values()))
+    priced['Data Entry'] = where(df['ORDER TYPE'] == 'BRE', DATA, 0)
+    priced['Fulfillment Charge'] = CHARGE
+    priced['TTL'] = (priced['Postage In'] + priced['Postage Out'] +
+                     priced['Data Entry'] + priced['Fulfillment Charge'])
+    return priced
+
+
+def rate_table(products):
+    extra = DataFrame([[code, ANY, EFFECTIVE, nan, rate, nan, nan] for code, rate in products.items()],
+                      columns=KEY_COLUMNS + CHARGE_COLUMNS)
+    return RateTable(concat([DEFAULT_RATES, extra], ignore_index=True))
+
+
+def main():
+    parser = ArgumentParser(description=__doc__)
+    parser.add_argument('--rows', type=int, nargs='*', default=[10000, 100000, 1000000])
+    parser.add_argument('--products', type=int, nargs='*', default=[5, 24, 60])
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'rows':>9} {'products':>9} {'masks (s)':>10} {'table (s)':>10} {'speedup':>8}")
+    for n_products in args.products:
+        products = product_rates(n_products)
+        table = rate_table(products)
+        for n_rows in args.rows:
+            df = orders(n_rows, products)
+            expected = price_masks(df, products)
+            result = table.price(df)
+            assert expected.equals(result), 'Rate table charges differ from the mask charges'
+            masks = min(repeat(lambda: price_masks(df, products), number=1, repeat=args.repeat))
+            lookup = min(repeat(lambda: table.price(df), number=1, repeat=args.repeat))
+            print(f'{n_rows:>9} {n_products:>9} {masks:>10.4f} {lookup:>10.4f} {masks / lookup:>7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,306 @@
+# Python 3.7.2
+"""
+Time the pipelines on seeded synthetic inputs at several sizes and save the results for later comparison.
+Generated inputs are kept in the data folder and reused, so only the first run at a size pays for them.
+Each case runs in its own scratch folder, with an empty input cache; only the pipeline call is timed, setup
+and copies are not.
+
+    python bench_suite.py --sizes 10000 100000 --cases xml_import eom
+"""
+import platform
+import subprocess
+from argparse import ArgumentParser
+from datetime import datetime
+from glob import glob
+from json import dump, load
+from os import chdir, getcwd, makedirs, path, rename
+from shutil import copy, copytree, rmtree
+from tempfile import mkdtemp
+from time import perf_counter
+
+import numpy
+import pandas
+
+import bench_data
+import input_cache
+from anthem_envelopes import split_envelopes, write_summary
+from anthem_grid import load_branding_grid
+from anthem_merge import initialize_mailing_list
+from anthem_proofs import select_proofs, write_with_proofs
+from duke_jobs import JobFolderIndex
+from duke_stream import STREAM_SIZE
+from duke_varfile import VarFile
+from instrument import start_run, stop_run
+from mmo_fulfillment_billing import run_eom
+from mmo_import_xml import XmlImport
+from mmo_process_data import ProcessFile
+from report_writer import write_report
+
+HERE = path.dirname(path.abspath(__file__))
+SIZES = [10000, 100000, 1000000]
+DATA_DIR = path.join(HERE, 'bench_inputs')
+RESULTS_DIR = path.join(HERE, 'bench_results')
+
+
+class Datasets:
+    def __init__(self, data_dir=DATA_DIR, seed=0):
+        """
+        Generated inputs, written once per size and seed and reused by later runs.
+        :param data_dir: folder the inputs are kept in
+        :param seed: random seed of the generators
+        """
+        self.data_dir = data_dir
+        self.seed = seed
+        self._orders = {}
+        makedirs(data_dir, exist_ok=True)
+
+    def _cached(self, name, build):
+        """
+        :param name: dataset folder name
+        :param build: function writing the dataset into the folder it is given
+        :return str: dataset folder
+        """
+        folder = path.join(self.data_dir, f'{name} seed{self.seed}')
+        if not path.exists(folder):
+            # Built under a temporary name so an interrupted run isn't mistaken for a finished dataset.
+            partial = folder + ' partial'
+            rmtree(partial, ignore_errors=True)
+            makedirs(partial)
+            build(partial)
+            rename(partial, folder)
+        return folder
+
+    def orders(self, n):
+        """ MMO orders keyed by XML tag, kept in memory. """
+        if n not in self._orders:
+            self._orders[n] = bench_data.mmo_orders(n, self.seed)
+        return self._orders[n]
+
+    def mmo_xml(self, n):
+        return self._cached(f'mmo xml {n}', lambda folder: bench_data.write_mmo_xml(self.orders(n), folder))
+
+    def bcc(self, n, ext='.csv'):
+        sep = '\t' if ext == '.txt' else ','
+        folder = self._cached(f'bcc {ext[1:]} {n}', lambda f: bench_data.write_bcc_file(
+            path.join(f, f'12345678 BCC Bench{ext}'), n, sep=sep, seed=self.seed))
+        return path.join(folder, f'12345678 BCC Bench{ext}')
+
+    def anthem(self, n):
+        """ :return tuple: (branding grid .xlsx, mailing list .csv) """
+        def build(folder):
+            grid = bench_data.anthem_grid(seed=self.seed)
+            write_report(grid, path.join(folder, 'Branding Grid.xlsx'))
+            bench_data.write_anthem_list(path.join(folder, 'Mailing List.csv'), grid, n, seed=self.seed)
+        folder = self._cached(f'anthem {n}', build)
+        return path.join(folder, 'Branding Grid.xlsx'), path.join(folder, 'Mailing List.csv')
+
+    def weekly(self, n):
+        return self._cached(f'weekly {n}', lambda folder: bench_data.write_weekly_files(folder, n, seed=self.seed))
+
+
+def branding_grid(grid_file):
+    """ Grid indexed by Contract Number, as the Anthem merge reads it (without the input cache). """
+    grid_df = load_branding_grid(grid_file, cache_dir='')
+    return grid_df.drop_duplicates(subset=['Contract Number']).set_index('Contract Number')
+
+
+def merge_list(grid_file, list_file):
+    """ The Anthem merge: resolve each List Contract Number and join the grid. """
+    grid_df = branding_grid(grid_file)
+    return initialize_mailing_list(list_file, grid_df).join(grid_df, on='Contract Number')
+
+
+# Each case has a setup (untimed) returning the arguments of its run (timed); runs return their output rows.
+def setup_xml_import(data, n, work, options):
+    xml_dir = path.join(work, 'xml')
+    copytree(data.mmo_xml(n), xml_dir)  # XmlImport archives the files it reads
+    return xml_dir, options.workers
+
+
+def run_xml_import(xml_dir, workers):
+    xml = XmlImport(xml_dir)
+    xml.parse_xml(stream=True, workers=workers)
+    return len(xml.df.index)
+
+
+def setup_process_file(data, n, work, options):
+    frame = data.orders(n).rename(columns=XmlImport('').header_dict)
+    frame.insert(0, 'BRC_ID', value='')
+    frame = frame.replace('', numpy.nan)
+    return frame, options.output_format
+
+
+def run_process_file(frame, output_format):
+    return len(ProcessFile(frame, output_format=output_format).df.index)
+
+
+def setup_varfile(ext):
+    def setup(data, n, work, options):
+        src = data.bcc(n, ext)
+        return (copy(src, path.join(work, path.basename(src))), )
+    return setup
+
+
+def run_varfile(filepath):
+    # No job share to search, so the lookup and copy cost nothing.
+    job = VarFile(filepath, stream=path.getsize(filepath) > STREAM_SIZE,
+                  folders=JobFolderIndex(roots=[], cache_file=None))
+    job.process_file()
+    job.output_files()
+    job.output_pdf()
+    return job.record_count
+
+
+def setup_anthem(data, n, work, options):
+    return data.anthem(n)
+
+
+def run_anthem_data(grid_file, list_file):
+    counts, _ = split_envelopes(list_file, branding_grid(grid_file), '{envelope} Envelope List.csv')
+    write_summary(counts, 'Anthem Merge Summary.xlsx')
+    return int(counts['Count'].sum())
+
+
+def run_anthem_merge(grid_file, list_file):
+    return len(merge_list(grid_file, list_file).index)
+
+
+def setup_proofs(data, n, work, options):
+    return (merge_list(*data.anthem(n)), )
+
+
+def run_proofs(merged_df):
+    proof_df = select_proofs(merged_df, n=2)
+    write_with_proofs(proof_df, merged_df, 'Bench Merged Variable.csv')
+    return len(proof_df.index)
+
+
+def setup_eom(data, n, work, options):
+    input_dir = path.join(work, 'weekly')
+    copytree(data.weekly(n), input_dir)
+    return input_dir, path.join(work, 'billing ledger.sqlite')
+
+
+def run_eom_case(input_dir, ledger_path):
+    return int(run_eom(100, input_dir=input_dir, ledger_path=ledger_path).totals['Count'])
+
+
+CASES = {'xml_import': (setup_xml_import, run_xml_import),
+         'process_file': (setup_process_file, run_process_file),
+         'varfile_csv': (setup_varfile('.csv'), run_varfile),
+         'varfile_txt': (setup_varfile('.txt'), run_varfile),
+         'anthem_data': (setup_anthem, run_anthem_data),
+         'anthem_merge': (setup_anthem, run_anthem_merge),
+         'proofs': (setup_proofs, run_proofs),
+         'eom': (setup_eom, run_eom_case)}
+
+
+def run_case(name, data, n, options):
+    """
+    Set up and time one case in a scratch folder, recording its instrumented stages.
+    :return dict: case result
+    """
+    setup, run = CASES[name]
+    work = mkdtemp(prefix=f'bench {name} ')
+    cwd = getcwd()
+    cache_dir = input_cache.CACHE_DIR
+    chdir(work)  # outputs are written to the current directory
+    input_cache.CACHE_DIR = path.join(work, 'input cache')  # the scratch copies would only fill the user's cache
+    try:
+        args = setup(data, n, work, options)
+        start_run(f'bench {name}', enabled=True, memory=False)
+        start = perf_counter()
+        try:
+            rows_out = run(*args)
+        finally:
+            seconds = perf_counter() - start
+            report = stop_run()
+    finally:
+        chdir(cwd)
+        input_cache.CACHE_DIR = cache_dir
+        if not options.keep:
+            rmtree(work, ignore_errors=True)
+    return {'case': name, 'rows': n, 'rows_out': rows_out, 'seconds': round(seconds, 4),
+            'rows_per_second': round(n / seconds) if seconds else None, 'stages': report.stages}
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def save_results(results, started, options):
+    """
+    :return str: results file, 'bench <date>.json' in the results folder
+    """
+    makedirs(options.results_dir, exist_ok=True)
+    filename = path.join(options.results_dir, f'bench {started:%Y-%m-%d %H%M%S}.json')
+    run = {'started': started.isoformat(),
+           'commit': git_commit(),
+           'seed': options.seed,
+           'python': platform.python_version(),
+           'platform': platform.platform(),
+           'pandas': pandas.__version__,
+           'numpy': numpy.__version__,
+           'results': results}
+    with open(filename, 'w') as f:
+        dump(run, f, indent=2, default=str)
+    return filename
+
+
+def previous_results(results_dir, exclude=None):
+    """
+    :return str: latest results file other than exclude, None when there is none
+    """
+    files = sorted(f for f in glob(path.join(results_dir, 'bench *.json')) if f != exclude)
+    return files[-1] if files else None
+
+
+def compare(results, filename):
+    """ Print each case's time next to the same case and size in an earlier results file. """
+    with open(filename) as f:
+        earlier = load(f)
+    before = {(r['case'], r['rows']): r['seconds'] for r in earlier['results']}
+    print(f"\nCompared with {path.basename(filename)} (commit {earlier.get('commit')})")
+    print(f"{'case':<14}{'rows':>10}{'seconds':>10}{'before':>10}{'ratio':>8}")
+    for r in results:
+        old = before.get((r['case'], r['rows']))
+        ratio = f'{r["seconds"] / old:.2f}x' if old else '-'
+        print(f"{r['case']:<14}{r['rows']:>10}{r['seconds']:>10.3f}{old if old else '-':>10}{ratio:>8}")
+
+
+def main():
+    parser = ArgumentParser(description='Time the Duke pipelines on seeded synthetic data')
+    parser.add_argument('--sizes', type=int, nargs='*', default=SIZES)
+    parser.add_argument('--cases', nargs='*', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--workers', type=int, default=1, help='XmlImport parse workers')
+    parser.add_argument('--output-format', choices=['csv', 'parquet'], default=None,
+                        help='ProcessFile list format, .xlsx when not given')
+    parser.add_argument('--data-dir', default=DATA_DIR, help='Generated inputs, reused between runs')
+    parser.add_argument('--results-dir', default=RESULTS_DIR)
+    parser.add_argument('--compare', help='Results file to compare with, defaults to the latest')
+    parser.add_argument('--keep', action='store_true', help='Keep the scratch folders with the outputs')
+    options = parser.parse_args()
+
+    started = datetime.now()
+    data = Datasets(options.data_dir, options.seed)
+    results = []
+    for n in options.sizes:
+        for name in options.cases:
+            result = run_case(name, data, n, options)
+            results.append(result)
+            print(f"{name:<14}{n:>10}{result['seconds']:>10.3f}s")
+
+    filename = save_results(results, started, options)
+    print(f'Saved {filename}')
+    earlier = options.compare or previous_results(options.results_dir, exclude=filename)
+    if earlier:
+        compare(results, earlier)
+
+
+if __name__ == '__main__':
+    main()
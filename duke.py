@@ -0,0 +1,185 @@
+# Python 3.7.2
+"""
+Command line entry point for the duke tools, for schedulers and batch wrappers that run them without a GUI.
+Only argparse is loaded at startup; each subcommand imports its pipeline (pandas, xlsxwriter, reportlab) when
+it runs, so --help and argument errors return straight away. Outputs are written to the current directory,
+or to the folder given with -C.
+
+    python duke.py mmo-import "//Xmf-server/duke/Inter Office Mail/MMO XML Orders/"
+    python duke.py -C "MMO Lists" mmo-watch "//Xmf-server/duke/Inter Office Mail/MMO XML Orders/" --polling
+    python duke.py -C "Job 12345678" qc --checklists pdf --combined-pdf "Variable Checklists.pdf"
+    python duke.py anthem-merge "Branding Grid.xlsx" "Mailing List 010121.csv" --purpose Merge --proofs 3
+    python duke.py eom 120 --input-dir "W Files"
+"""
+import sys
+from argparse import ArgumentParser, ArgumentTypeError
+from os import chdir, path
+
+# report_writer.FORMATS, repeated so the choices don't pull in the writers.
+OUTPUT_FORMATS = ('xlsx', 'csv', 'parquet')
+
+
+def existing_file(value):
+    if not path.isfile(value):
+        raise ArgumentTypeError(f'no such file: {value}')
+    return value
+
+
+def existing_dir(value):
+    if not path.isdir(value):
+        raise ArgumentTypeError(f'no such folder: {value}')
+    return value
+
+
+def existing_path(value):
+    if not path.exists(value):
+        raise ArgumentTypeError(f'no such file or folder: {value}')
+    return value
+
+
+def given(**kwargs):
+    """ Keyword arguments that were given, so the pipelines' own defaults apply to the rest. """
+    return {key: value for key, value in kwargs.items() if value is not None}
+
+
+def mmo_import(args):
+    from mmo_import_xml import import_orders
+
+    xml = import_orders(args.xml_dir, **given(ledger_path=args.ledger, workers=args.workers))
+    print(f'{len(xml.df.index)} new orders')
+
+
+def mmo_process(args):
+    from mmo_process_data import process_orders
+
+    job = process_orders(args.xml_dir, args.data_file, fuzzy=args.fuzzy, output_format=args.output_format,
+                         plan_year=args.plan_year, **given(workers=args.workers, ledger_path=args.ledger))
+    print(f'{len(job.df.index)} orders listed')
+
+
+def mmo_watch(args):
+    from mmo_watch import OrderWatcher
+
+    watcher = OrderWatcher(args.xml_dir, fuzzy=args.fuzzy, plan_year=args.plan_year, events=not args.polling,
+                           **given(ledger_path=args.ledger, window=args.window, poll=args.poll, workers=args.workers))
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+def qc(args):
+    from duke_batch import batch_files, run_batch
+
+    files = []
+    for p in args.paths or ['.']:
+        if path.isdir(p):
+            files.extend(path.join(p, f) for f in batch_files(p))
+        else:
+            files.append(p)
+    results = run_batch(files, args.checklists, args.workers, args.combined_pdf)
+    return int(any(job_status.status != 'OK' for job_status in results))
+
+
+def anthem_merge(args):
+    from anthem_merge import run_merge
+
+    run_merge(args.branding_grid, args.mailing_list, args.purpose, args.key_columns, args.proofs)
+
+
+def eom(args):
+    from mmo_fulfillment_billing import run_eom
+    from mmo_rates import RateTable
+
+    result = run_eom(args.junk_mail, args.input_dir, args.output, job=args.job, period=args.period, close=args.close,
+                     **given(ledger_path=args.ledger, rates=args.rates and RateTable.from_csv(args.rates)))
+    print(result)
+
+
+def build_parser():
+    parser = ArgumentParser(prog='duke', description='Duke data processing tools')
+    parser.add_argument('-C', '--directory', type=existing_dir, help='Write outputs to this folder')
+    parser.add_argument('--run-report', action='store_true',
+                        help='Save stage timings, row counts and peak memory as a JSON report')
+    parser.add_argument('--profile', action='store_true', help='Also save cProfile stats of the run')
+    subparsers = parser.add_subparsers(dest='command', metavar='command')
+    subparsers.required = True
+
+    sub = subparsers.add_parser('mmo-import', help='Parse new MMO XML orders into the daily order workbook')
+    sub.add_argument('xml_dir', type=existing_dir, help='MMO XML Orders drop folder')
+    sub.add_argument('--ledger', help='Ingest ledger of the files and orders already processed')
+    sub.add_argument('--workers', type=int, help='XML parse processes (default: number of CPUs)')
+    sub.set_defaults(func=mmo_import, run_name='MMO Import XML')
+
+    sub = subparsers.add_parser('mmo-process', help='Import new MMO orders and write the plan year list')
+    sub.add_argument('xml_dir', type=existing_dir, help='MMO XML Orders drop folder')
+    sub.add_argument('--data-file', type=existing_file, help='Data entry workbook with a STATUS column')
+    sub.add_argument('--fuzzy', action='store_true', help='Also remove near duplicate names/addresses')
+    sub.add_argument('--output-format', choices=OUTPUT_FORMATS, default='xlsx')
+    sub.add_argument('--ledger', help='Ingest ledger of the files and orders already processed')
+    sub.add_argument('--workers', type=int, help='XML parse processes (default: number of CPUs)')
+    sub.add_argument('--plan-year', help='Plan year of orders without one (default: the current year)')
+    sub.set_defaults(func=mmo_process, run_name='MMO Process Data')
+
+    sub = subparsers.add_parser('mmo-watch', help='Watch the MMO XML drop folder and process orders as they arrive')
+    sub.add_argument('xml_dir', type=existing_dir, help='MMO XML Orders drop folder')
+    sub.add_argument('--window', type=float, help='Seconds to collect files into one batch (default: 60)')
+    sub.add_argument('--poll', type=float, help='Seconds between folder listings (default: 10)')
+    sub.add_argument('--polling', action='store_true', help='Poll only, without folder events')
+    sub.add_argument('--once', action='store_true', help='Process the files in the folder and exit')
+    sub.add_argument('--fuzzy', action='store_true', help='Also remove near duplicate names/addresses')
+    sub.add_argument('--plan-year', help='Plan year of orders without one (default: the current year)')
+    sub.add_argument('--ledger', help='Ingest ledger of the files and orders already processed')
+    sub.add_argument('--workers', type=int, help='XML parse processes (default: 1)')
+    sub.set_defaults(func=mmo_watch, run_name='MMO Watch')
+
+    sub = subparsers.add_parser('qc', help='Clean variable data files and write their checklists')
+    sub.add_argument('paths', nargs='*', type=existing_path,
+                     help='.csv/.txt files or folders of them (default: the current directory)')
+    sub.add_argument('--checklists', nargs='+', choices=['xlsx', 'pdf'], default=['xlsx', 'pdf'])
+    sub.add_argument('--combined-pdf', help='Write the PDF checklists of all files into this one PDF')
+    sub.add_argument('--workers', type=int, help='Worker processes (default: number of CPUs)')
+    sub.set_defaults(func=qc, run_name='Duke QC')
+
+    sub = subparsers.add_parser('anthem-merge', help='Combine the branding grid with a processed mailing list')
+    sub.add_argument('branding_grid', type=existing_file, help='Branding Grid (.xlsx)')
+    sub.add_argument('mailing_list', type=existing_file, help='Mailing List (.csv)')
+    sub.add_argument('--purpose', nargs='+', choices=['Data', 'Merge'], default=['Data'])
+    sub.add_argument('--key-columns', nargs='+', help='Branding Grid Contract Number columns in order')
+    sub.add_argument('--proofs', type=int, default=2, help='Number of proofs per Contract Number (Merge)')
+    sub.set_defaults(func=anthem_merge, run_name='Anthem Merge')
+
+    sub = subparsers.add_parser('eom', help='End of month MMO fulfillment summary and billing workbook')
+    sub.add_argument('junk_mail', type=int, help='Total junk mail received')
+    sub.add_argument('--input-dir', type=existing_dir, help='Folder of the weekly (W) files')
+    sub.add_argument('--output', help="EOM workbook (default: '<job> EOM.xlsx' in the input folder)")
+    sub.add_argument('--ledger', help='Billing ledger location')
+    sub.add_argument('--job', help='Job number (default: from the weekly file names)')
+    sub.add_argument('--rates', type=existing_file, help='Rate table .csv (default: the standard MMO rates)')
+    sub.add_argument('--period', help="Billing period, YYYY-MM (default: from the weekly files' order dates)")
+    sub.add_argument('--close', action='store_true', help='Close the billing period after writing the EOM')
+    sub.set_defaults(func=eom, run_name='MMO EOM')
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Input paths are resolved before changing to the output folder.
+    for name in ('xml_dir', 'data_file', 'branding_grid', 'mailing_list', 'input_dir', 'ledger', 'output', 'rates'):
+        if getattr(args, name, None):
+            setattr(args, name, path.abspath(getattr(args, name)))
+    if getattr(args, 'paths', None):
+        args.paths = [path.abspath(p) for p in args.paths]
+    if args.directory:
+        chdir(args.directory)
+
+    from instrument import finish_run, start_run
+    start_run(args.run_name, enabled=args.run_report or args.profile or None, profile=args.profile or None)
+    try:
+        return args.func(args) or 0
+    finally:
+        finish_run()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
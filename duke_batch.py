@@ -0,0 +1,140 @@
+# Python 3.7.2
+""" Run the duke QC tools over every variable data file in a folder with a pool of worker processes. """
+from concurrent.futures import ProcessPoolExecutor
+from os import getcwd, listdir, path
+from time import perf_counter
+from typing import Dict, List
+
+from pandas import errors
+
+from duke_checklist import ChecklistRenderer
+from duke_jobs import CopyQueue
+from duke_stream import STREAM_SIZE
+from duke_varfile import VarFile
+from instrument import active, finish_run, stage, start_run, stop_run
+
+
+class JobStatus:
+    def __init__(self, filename):
+        """
+        Outcome of a single job: 'OK', 'Parse Error', 'Encoding Error' or the exception text.
+        """
+        self.filename = filename
+        self.status = 'OK'
+        self.timings: Dict[str, float] = {}
+        self.checklist = None
+        self.stages = []
+
+    def __str__(self):
+        stages = ', '.join(f'{stage} {seconds:.2f}s' for stage, seconds in self.timings.items())
+        return f'{self.filename}: {self.status} ({stages})'
+
+
+def run_job(filepath, checklists, combined=False, instrumented=False):
+    """
+    Process one file and write the requested checklists from the same parse.
+    :param filepath: path to .csv/.txt file
+    :param checklists: any of 'xlsx', 'pdf'
+    :param combined: return the PDF checklist data in JobStatus.checklist instead of writing the PDF
+    :param instrumented: record the job's stages in JobStatus.stages for the batch run report
+    :return JobStatus:
+    """
+    job_status = JobStatus(path.basename(filepath))
+    if not instrumented:
+        return _run_job(job_status, filepath, checklists, combined)
+    start_run(job_status.filename, enabled=True, profile=False)
+    try:
+        _run_job(job_status, filepath, checklists, combined)
+    finally:
+        job_status.stages = stop_run().stages
+    return job_status
+
+
+def _run_job(job_status, filepath, checklists, combined):
+    start = perf_counter()
+    with CopyQueue() as copies:
+        try:
+            job = VarFile(filepath, stream=path.getsize(filepath) > STREAM_SIZE, copy_queue=copies)
+            job_status.timings['read'] = perf_counter() - start
+            job.process_file()
+            job_status.timings['process'] = perf_counter() - start - job_status.timings['read']
+        except errors.ParserError:
+            job_status.status = 'Parse Error'
+            return job_status
+        except UnicodeEncodeError:
+            job_status.status = 'Encoding Error'
+            return job_status
+
+        # The copy to the job folder runs while the checklists are written.
+        checklist_start = perf_counter()
+        if 'xlsx' in checklists:
+            job.output_files()
+        if 'pdf' in checklists and combined:
+            job_status.checklist = job.checklist_data()
+        elif 'pdf' in checklists:
+            job.output_pdf()
+        job_status.timings['checklist'] = perf_counter() - checklist_start
+    job_status.timings['total'] = perf_counter() - start
+    return job_status
+
+
+def run_batch(files, checklists=('xlsx', 'pdf'), workers=None, combined_pdf=None):
+    """
+    Process files concurrently and report the status and timings of each.
+    Encoding failures write 'Process Error.txt' the same way the single file tools do.
+    :param files: list of .csv/.txt paths
+    :param checklists: any of 'xlsx', 'pdf'
+    :param workers: number of worker processes (defaults to the number of CPUs)
+    :param combined_pdf: write the PDF checklists of a batch of more than one file into this single PDF
+    :return list: JobStatus per file, in the order given
+    """
+    results: List[JobStatus] = []
+    combined = bool(combined_pdf) and 'pdf' in checklists and len(files) > 1
+    report = active()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(run_job, file, tuple(checklists), combined, report.enabled) for file in files]
+        for file, future in zip(files, futures):
+            try:
+                job_status = future.result()
+            except Exception as e:
+                job_status = JobStatus(path.basename(file))
+                job_status.status = f'{type(e).__name__}: {e}'
+            if job_status.status == 'Encoding Error':
+                with open("Process Error.txt", "w") as text_file:
+                    text_file.write('Encoding Error! Check for bad text in csv file\n')
+                    text_file.write('Example: (â€™) instead of standard apostrophe(\')')
+            print(job_status)
+            report.add(job_status.stages, prefix=f'{job_status.filename}: ')
+            results.append(job_status)
+
+    # One document for the printer queue, in the order the files were given.
+    if combined:
+        with stage('combined pdf checklist', rows_in=len(results)), ChecklistRenderer(combined_pdf) as renderer:
+            for job_status in results:
+                if job_status.checklist:
+                    renderer.add(job_status.checklist)
+        print(f'{combined_pdf}: {renderer.pages} pages')
+    return results
+
+
+def batch_files(folder=None):
+    """
+    Variable data files of a folder. A .txt file writes {name}.csv, so that .csv isn't processed at the same time.
+    :param folder: defaults to the current directory
+    :return list: .csv/.txt file names
+    """
+    files: List[str] = [p for p in listdir(folder or getcwd())
+                        if p.endswith(".csv") | p.endswith(".txt")]
+    txt_names = {p[:-4] for p in files if p.endswith(".txt")}
+    return [p for p in files if p.endswith(".txt") or p[:-4] not in txt_names]
+
+
+def main(checklists=('xlsx', 'pdf'), combined_pdf=None):
+    files = batch_files()
+    start_run('Duke QC')
+    run_batch(files, checklists, combined_pdf=combined_pdf)
+    finish_run()
+
+
+if __name__ == '__main__':
+    main()
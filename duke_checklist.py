@@ -0,0 +1,104 @@
+# Python 3.7.2
+""" PDF variable checklists. The static page furniture is drawn once per document as a form XObject. """
+from datetime import datetime
+
+from reportlab.lib.pagesizes import letter
+from reportlab.lib.units import inch
+from reportlab.pdfgen import canvas
+
+FORM = 'checklist'
+MARGIN = .5*inch
+WIDTH = 7.5*inch
+TOP_ROW = 8.5*inch
+COL_TWO = 3*inch  # Second Column
+SIZE = 10
+LEADING = SIZE*2
+ROWS_PER_PAGE = 27  # Rows from TOP_ROW down to just above the empty fields note at 1 inch
+
+
+class ChecklistRenderer:
+    def __init__(self, filename, pagesize=letter):
+        """
+        Checklist PDF of one or more jobs, each starting on a new page.
+        :param filename: output .pdf
+        :param pagesize: reportlab page size
+        """
+        self.filename = filename
+        self.c = canvas.Canvas(filename, pagesize=pagesize)
+        self.process_date = datetime.now().strftime('%x')
+        self.pages = 0
+        self._furniture()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.save()
+
+    def _furniture(self):
+        """ Header rule, title, labels, column titles and footer shared by every page. """
+        c = self.c
+        c.beginForm(FORM)
+        c.line(0, 9.375*inch, WIDTH, 9.375*inch)
+        c.setFont('Helvetica-Bold', 18)
+        c.drawCentredString(WIDTH/2, 9.96875*inch, 'Variable Checklist')
+        c.setFont('Helvetica-Bold', SIZE)
+        c.drawString(0, 9.5*inch, 'Database File:')
+        c.drawString(0, TOP_ROW + 20, 'FIELD')
+        c.line(0, TOP_ROW + 16, 1.375*inch, TOP_ROW + 16)
+        c.drawString(COL_TWO, TOP_ROW + 20, 'SAMPLE')
+        c.line(COL_TWO, TOP_ROW + 16, COL_TWO + 1.375*inch, TOP_ROW + 16)
+        c.setFont('Helvetica', 11)
+        c.drawString(0, 0, 'Data Processed by: _________________________')
+        c.drawRightString(WIDTH, 0, 'QC by: _________________________')
+        c.endForm()
+
+    def add(self, checklist):
+        """
+        Draw a job's checklist, continuing long field lists on as many pages as needed.
+        :param checklist: dict from VarFile.checklist_data
+        """
+        rows = list(zip(checklist['fields'], checklist['samples']))
+        pages = [rows[i:i + ROWS_PER_PAGE] for i in range(0, len(rows), ROWS_PER_PAGE)] or [[]]
+        for number, page_rows in enumerate(pages, 1):
+            # set 1/2 inch margins
+            self.c.translate(MARGIN, MARGIN)
+            self.c.doForm(FORM)
+            self._header(checklist)
+            self._column(0, [field for field, _ in page_rows])
+            self._column(COL_TWO, [sample for _, sample in page_rows])
+            if number == len(pages) and checklist['empty_columns']:
+                self._empty_fields(checklist['empty_columns'])
+            if len(pages) > 1:
+                self.c.setFont('Helvetica', 9)
+                self.c.drawCentredString(WIDTH/2, 0, f'Page {number} of {len(pages)}')
+            self.c.showPage()
+            self.pages += 1
+
+    def _header(self, checklist):
+        c = self.c
+        c.setFont('Helvetica', 14)
+        c.drawString(0, 10*inch, f"Job #: {checklist['job_number']}")
+        c.drawRightString(WIDTH, 10*inch, f"Count: {checklist['record_count']}")
+        c.setFont('Helvetica', SIZE)
+        c.drawString(1*inch, 9.5*inch, f"{checklist['job_name']}.csv")
+        c.drawRightString(WIDTH, 9.5*inch, f'Process Date: {self.process_date}')
+
+    def _column(self, x, values):
+        """ A column of values as a single text object. """
+        text = self.c.beginText(x, TOP_ROW)
+        text.setFont('Helvetica', SIZE)
+        text.setLeading(LEADING)
+        for value in values:
+            text.textLine(str(value))
+        self.c.drawText(text)
+
+    def _empty_fields(self, empty_columns):
+        c = self.c
+        c.setFont('Helvetica-Bold', SIZE)
+        c.drawString(0, 1*inch, 'Empty Fields (Removed):')
+        c.setFont('Helvetica', SIZE)
+        c.drawString(0, .75*inch, ', '.join(empty_columns))
+
+    def save(self):
+        self.c.save()
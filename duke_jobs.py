@@ -0,0 +1,141 @@
+# Python 3.7.2
+""" Cached index of the job folders on the Xmf-server share and background copies into them. """
+from concurrent.futures import ThreadPoolExecutor
+from json import dump, load
+from os import getpid, listdir, makedirs, path, replace
+from shutil import copy2
+from time import time
+
+WIN_PATH = '//Xmf-server/jobs'
+MAC_PATH = '/Volumes/JOBS'
+CACHE_FILE = path.join(path.expanduser('~'), '.duke_job_index.json')
+
+
+class JobFolderIndex:
+    def __init__(self, roots=(WIN_PATH, MAC_PATH), ttl=600, miss_ttl=30, cache_file=CACHE_FILE):
+        """
+        Job folders keyed by job number (first 8 characters of the folder name).
+        The listing of the first reachable root is cached in memory and on disk, so worker processes and
+        later runs share it until it is older than ttl seconds. A lookup that misses refreshes the listing
+        unless it is younger than miss_ttl seconds. Nothing is read until the first lookup. When no root
+        is reachable the share isn't tried again for miss_ttl seconds and the last listing is kept.
+        :param roots: job share locations, tried in order (Windows, then Mac)
+        :param ttl: maximum age of the listing in seconds
+        :param miss_ttl: minimum age of the listing before a miss triggers a refresh
+        :param cache_file: JSON file shared between processes, None to keep the cache in memory only
+        """
+        self.roots = list(roots)
+        self.ttl = ttl
+        self.miss_ttl = miss_ttl
+        self.cache_file = cache_file
+        self.folders = {}
+        self.listed = 0.0
+        self.unreachable = 0.0
+        self.loaded = False
+
+    def load(self):
+        """
+        Load the listing from cache_file if present and the roots match.
+        """
+        self.loaded = True
+        if not self.cache_file or not path.exists(self.cache_file):
+            return
+        try:
+            with open(self.cache_file) as f:
+                cache = load(f)
+        except (OSError, ValueError):
+            return
+        if cache.get('roots') == self.roots:
+            self.folders = cache['folders']
+            self.listed = cache['listed']
+
+    def save(self):
+        if not self.cache_file:
+            return
+        temp = f'{self.cache_file}.{getpid()}'
+        with open(temp, 'w') as f:
+            dump({'roots': self.roots, 'listed': self.listed, 'folders': self.folders}, f)
+        replace(temp, self.cache_file)
+
+    def refresh(self):
+        """
+        List the first reachable root and rebuild the index. The first folder listed for a job number wins.
+        If no root can be listed, the time is recorded in unreachable.
+        """
+        for root in self.roots:
+            try:
+                names = listdir(root)
+            except OSError:
+                continue
+            folders = {}
+            for name in names:
+                folders.setdefault(name[:8], f'{root}/{name}')
+            self.folders = folders
+            self.listed = time()
+            self.save()
+            return
+        self.unreachable = time()
+
+    def find(self, job_number):
+        """
+        :param job_number: 8 character job number
+        :return str: path to the job folder, None if there isn't one
+        """
+        if not self.loaded:
+            self.load()
+        now = time()
+        age = now - self.listed
+        stale = age > self.ttl or (job_number not in self.folders and age > self.miss_ttl)
+        if stale and now - self.unreachable > self.miss_ttl:
+            self.refresh()
+        return self.folders.get(job_number)
+
+
+def copy_to_data_folder(filename, job_folder):
+    """
+    Place a copy of the file in the job's Finals/Data folder.
+    :param filename: file to copy
+    :param job_folder: path to the job folder
+    """
+    if path.exists(job_folder):
+        data_folder = f'{job_folder}/Finals/Data'
+        makedirs(data_folder, exist_ok=True)
+        copy2(filename, data_folder)
+
+
+class CopyQueue:
+    def __init__(self, workers=2):
+        """
+        Copies to the job share run in background threads. Use as a context manager; leaving the block
+        waits for every copy and raises the first error.
+        :param workers: number of concurrent copies
+        """
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.futures = []
+
+    def submit(self, filename, job_folder):
+        self.futures.append(self.pool.submit(copy_to_data_folder, filename, job_folder))
+
+    def wait(self):
+        self.pool.shutdown(wait=True)
+        for future in self.futures:
+            future.result()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.wait()
+
+
+_shared_index = None
+
+
+def shared_index():
+    """
+    :return JobFolderIndex: index of the default job share locations, created on first use
+    """
+    global _shared_index
+    if _shared_index is None:
+        _shared_index = JobFolderIndex()
+    return _shared_index
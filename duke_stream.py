@@ -0,0 +1,141 @@
+# Python 3.7.2
+""" Constant-memory cleanup of BCC variable data files for the duke QC tools. """
+from csv import QUOTE_ALL, Sniffer, Error
+from math import inf
+from os import path, remove
+
+from pandas import read_csv
+
+CHUNK_SIZE = 100000
+STREAM_SIZE = 50 * 1024 * 1024  # Files larger than this (bytes) are streamed by the QC tools.
+MARKERS = ['###', '***']
+
+
+def sniff_delimiter(filepath, block_size=65536):
+    """
+    Sniff the delimiter (comma or tab) from the first block of the file.
+    :param filepath: path to .csv/.txt file
+    :param block_size: number of characters read
+    :return str:
+    """
+    with open(filepath, newline='', errors='replace') as f:
+        sample = f.read(block_size)
+    try:
+        return Sniffer().sniff(sample, delimiters=',\t').delimiter
+    except Error:
+        return ','
+
+
+def best_row(frame, marked=None):
+    """
+    Best sample row of a frame or chunk: the first fully populated row, otherwise the first row with the most
+    populated fields outside of the '###'/'***' (pkg/con) columns. Per-row populated counts are computed once,
+    which picks the same row as repeating dropna(thresh=...) with a decreasing threshold.
+    :param frame: cleaned, non-empty DataFrame
+    :param marked: boolean per column of the '###'/'***' columns, from the frame itself when None
+    :return tuple: (populated count, inf for a fully populated row; row position)
+    """
+    populated = frame.notna()
+    full = populated.all(axis=1).values
+    if full.any():
+        return inf, full.argmax()
+    if marked is None:
+        marked = frame.isin(MARKERS).any().values
+    counts = populated.loc[:, ~marked].sum(axis=1).values
+    return counts.max(), counts.argmax()
+
+
+def best_record(frame):
+    """
+    Sample record of a whole frame, see best_row.
+    :param frame: cleaned DataFrame
+    :return list: record values, missing values as ''
+    """
+    if frame.empty:
+        return []
+    _, position = best_row(frame)
+    return frame.iloc[position].fillna('').tolist()
+
+
+class StreamResult:
+    def __init__(self):
+        """
+        Summary of a streamed file: everything VarFile needs for the checklist without holding the data.
+        """
+        self.head_values = []
+        self.empty_columns = []
+        self.record = []
+        self.record_count = 0
+
+
+def _write(chunk, dst, first):
+    chunk.to_csv(dst,
+                 mode='w' if first else 'a',
+                 header=first,
+                 sep=',',
+                 quotechar='"',
+                 quoting=QUOTE_ALL,
+                 encoding='ISO-8859-1',
+                 index=False)
+
+
+def clean_csv_stream(src, dst, sep=None, chunksize=CHUNK_SIZE):
+    """
+    Clean a variable data file chunk by chunk, so memory is bounded by the chunk size.
+    1st pass: drop empty rows, strip whitespace, track populated and '###'/'***' columns, write every column.
+    2nd pass: re-read only the populated columns, pick the sample record and write the final file.
+    :param src: path to .csv/.txt file
+    :param dst: path of the cleaned .csv file
+    :param sep: delimiter, sniffed from the first block when None
+    :param chunksize: rows per chunk
+    :return StreamResult:
+    """
+    if sep is None:
+        sep = sniff_delimiter(src)
+    result = StreamResult()
+    temp = dst + '.tmp'
+
+    try:
+        # 1st pass
+        columns = None
+        populated = None
+        marked = None
+        for chunk in read_csv(src, quotechar='"', sep=sep, dtype=str, chunksize=chunksize):
+            first = columns is None
+            if first:
+                columns = chunk.columns
+                populated = chunk.notna().any()
+            else:
+                populated |= chunk.notna().any()
+            chunk = chunk.dropna(how='all')
+            if not chunk.empty:
+                chunk = chunk.apply(lambda x: x.str.strip())
+            marked = chunk.isin(MARKERS).any() if first else marked | chunk.isin(MARKERS).any()
+            result.record_count += len(chunk.index)
+            _write(chunk, temp, first)
+
+        result.empty_columns = columns[~populated].tolist()
+        result.head_values = columns[populated].values
+        marked = marked[result.head_values].values
+
+        # 2nd pass: the temporary file is read back as written, so only its empty fields are missing values.
+        best = []
+        best_count = -1
+        first = True
+        for chunk in read_csv(temp, quotechar='"', sep=',', dtype=str, chunksize=chunksize,
+                              usecols=list(result.head_values), encoding='ISO-8859-1',
+                              keep_default_na=False, na_values=['']):
+            chunk = chunk[result.head_values]
+            if best_count < inf and not chunk.empty:
+                count, position = best_row(chunk, marked)
+                if count > best_count:
+                    best_count = count
+                    best = chunk.iloc[position].fillna('').tolist()
+            _write(chunk, dst, first)
+            first = False
+    finally:
+        if path.exists(temp):
+            remove(temp)
+
+    result.record = [x[0:41] for x in best]
+    return result
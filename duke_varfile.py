@@ -0,0 +1,206 @@
+# Python 3.7.2
+""" Variable data file cleanup and checklist output shared by the duke QC tools. """
+from csv import QUOTE_ALL
+from datetime import datetime
+from os import path
+
+from pandas import read_csv, errors, DataFrame
+from xlsxwriter import Workbook
+
+from duke_checklist import ChecklistRenderer
+from duke_jobs import copy_to_data_folder, shared_index
+from duke_stream import best_record, clean_csv_stream
+from input_schema import STRING, VARIABLE_FILE
+from instrument import stage
+
+
+class VarFile:
+    """
+    PURPOSE: Import mailing list for cleanup and generate a job information sheet in Excel.
+    1. Remove completely empty Columns/Rows
+    2. Remove columns with no data.
+    3. Rename Header duplicates.
+    4. Remove leading/trailing whitespace in data
+    5. Get sample record with most populated fields.
+    6. Output data sheet to Excel and/or PDF with job information and sample record
+    7. Copy data file to xmf-server job folder if present (For Mac and PC Operating Systems).
+    """
+
+    def __init__(self, filepath, stream=False, folders=None, copy_queue=None):
+        """
+        :param filepath: path to .csv/.txt file
+        :param stream: clean the file chunk by chunk instead of loading it into memory
+        :param folders: duke_jobs.JobFolderIndex used to find the job folder (defaults to the shared index)
+        :param copy_queue: duke_jobs.CopyQueue to copy to the job folder in the background
+        """
+        # Set Job information
+        self._filepath = filepath
+        self._fileName = path.basename(filepath)
+        self._jobNumber = self._fileName[:8]
+        self._jobName = self._fileName[:-4]
+        self._jobExt = self._fileName[-4:]
+        self._folders = folders or shared_index()
+        self._copy_queue = copy_queue
+        self.stream = stream
+        self.record_count = 0
+        self.proof_count = 0
+        self.head_values = []
+        self.record = []
+        self.sample_dict = {}
+        self.df = DataFrame()
+        self.empty_columns = []
+
+        # Streamed files are read in process_file
+        if self.stream:
+            return
+
+        with stage('read') as s:
+            try:
+                self.df = read_csv(self._filepath,
+                                   engine='python',
+                                   quotechar='"',
+                                   sep=",",
+                                   dtype=STRING)  # text dtype to keep leading 0's
+            except errors.ParserError:
+                self.df = read_csv(self._filepath,
+                                   engine='python',
+                                   quotechar='"',
+                                   sep='\t',
+                                   dtype=STRING)  # text dtype to keep leading 0's
+            s.rows_out = len(self.df.index)
+
+        # Create list of empty columns that will be dropped
+        self.empty_columns = self.df.columns[self.df.isna().all()].tolist()
+
+    def process_file(self):
+        """
+        Cleanup data frame and generate sample data for excel sheet
+        """
+        with stage('clean', rows_in=len(self.df.index) if not self.stream else None) as s:
+            if self.stream:
+                self.clean_stream()
+            else:
+                self.clean_frame()
+            s.rows_out = self.record_count
+
+        self.sample_dict = dict(zip(self.head_values, self.record))
+
+        # Place copy of file in the Data folder on the server.
+        job_folder = self._folders.find(self._jobNumber)
+        if job_folder:
+            if self._copy_queue is not None:
+                self._copy_queue.submit(self._jobName + '.csv', job_folder)
+            else:
+                copy_to_data_folder(self._jobName + '.csv', job_folder)
+
+    def clean_frame(self):
+        """
+        Cleanup the in-memory data frame, get the sample record and write the new .csv file
+        """
+        self.df.dropna(how='all', inplace=True)
+        self.df.dropna(axis=1, how='all', inplace=True)
+        self.df = VARIABLE_FILE.apply(self.df.apply(lambda x: x.str.strip()))
+        self.head_values = self.df.columns.values
+        self.record_count = len(self.df.index)
+
+        # Get record with all fields populated for sample.
+        # If full record doesn't exist, get record with most populated fields minus pkg/con columns.
+        self.record = best_record(self.df)
+
+        # Cleanup record list for display in Excel (Limit chars to 40 to fit cells)
+        for x in range(len(self.record)):
+            self.record[x] = self.record[x][0:41]
+
+        # Create new .csv file
+        self.df.to_csv(self._jobName + '.csv',
+                       sep=',',
+                       quotechar='"',
+                       quoting=QUOTE_ALL,
+                       encoding='ISO-8859-1',
+                       index=False)
+
+    def clean_stream(self):
+        """
+        Cleanup the file chunk by chunk with memory bounded by the chunk size (see duke_stream)
+        """
+        result = clean_csv_stream(self._filepath, self._jobName + '.csv')
+        self.head_values = result.head_values
+        self.empty_columns = result.empty_columns
+        self.record = result.record
+        self.record_count = result.record_count
+
+    def output_files(self):
+        """
+        Create Excel checklist
+        """
+
+        # Create Excel sheet
+        with stage('xlsx checklist'), Workbook(f'{self._jobName} Checklist.xlsx') as wb:
+            ws = wb.add_worksheet()
+
+            # Formatting
+            now = datetime.now()
+            fmt_bold = wb.add_format({'bold': 1})
+            fmt_title = wb.add_format({'bottom': True,
+                                       'bold': 1,
+                                       'font_size': 13})
+            fmt_head_border = wb.add_format({'top': True})
+
+            # Print specifications
+            ws.fit_to_pages(1, 0)  # Fit to 1x1 pages.
+            ws.set_page_view()
+
+            # Worksheet Formatting
+            ws.hide_gridlines(2)
+            ws.set_column('A:E', 17)
+            ws.set_default_row(20)
+
+            # Header
+            ws.set_margins(top=1.125)
+            ws.set_header(f'&L&16Job #: {self._jobNumber}&11\n\n'
+                          f'&\"Calibri,Bold\"Database File: &\"Calibri,Regular\"{self._jobName}.csv'
+                          f'&C&\"Calibri,Bold\"&18Variable Checklist&R&16Count: '
+                          f'{str(self.record_count)}&11\n\nProcess Date: {now.strftime("%x")}')
+            ws.merge_range('A1:E1', '', fmt_head_border)
+
+            # Footer
+            ws.set_footer('&L&\"Calibri,Bold\"Data Processed by: _________________________'
+                          '&R&\"Calibri,Bold\"QC by: _________________________')
+
+            # Write data to worksheet
+            ws.write('A3', 'FIELD', fmt_title)
+            ws.write('C3', 'SAMPLE', fmt_title)
+            ws.write_column('A4', self.head_values)
+            ws.write_column('C4', self.record)
+
+            # List Removed Empty Columns if any.
+            if self.empty_columns:
+                start1 = 'A' + str(9 + len(self.head_values))
+                start2 = 'A' + str(10 + len(self.head_values))
+                ws.write(start1, 'Empty Fields (Removed):', fmt_bold)
+                ws.write(start2, ', '.join(self.empty_columns))
+
+    def checklist_data(self):
+        """
+        Job information and sample record drawn on the PDF checklist.
+        :return dict:
+        """
+        return {'job_number': self._jobNumber,
+                'job_name': self._jobName,
+                'record_count': self.record_count,
+                'fields': list(self.sample_dict),
+                'samples': list(self.sample_dict.values()),
+                'empty_columns': list(self.empty_columns)}
+
+    def output_pdf(self, renderer=None):
+        """
+        Create PDF checklist
+        :param renderer: duke_checklist.ChecklistRenderer to add the checklist to a combined PDF,
+                         None to write '{job name} Checklist.pdf'
+        """
+        with stage('pdf checklist'):
+            if renderer is not None:
+                renderer.add(self.checklist_data())
+                return
+            with ChecklistRenderer(f'{self._jobName} Checklist.pdf') as renderer:
+                renderer.add(self.checklist_data())
@@ -0,0 +1,190 @@
+# Python 3.7.2
+""" Fuzzy duplicate detection for mailing records, blocked by ZIP and name key. """
+import re
+from difflib import SequenceMatcher
+
+from numpy import arange, array
+from pandas import DataFrame, Series, factorize
+
+PUNCTUATION = re.compile(r'[^\w#\s]')
+
+# USPS standard suffix and directional abbreviations.
+ABBREVIATIONS = {'STREET': 'ST', 'AVENUE': 'AVE', 'AV': 'AVE', 'ROAD': 'RD', 'DRIVE': 'DR', 'LANE': 'LN',
+                 'COURT': 'CT', 'BOULEVARD': 'BLVD', 'PLACE': 'PL', 'CIRCLE': 'CIR', 'PARKWAY': 'PKWY',
+                 'TERRACE': 'TER', 'HIGHWAY': 'HWY', 'TRAIL': 'TRL', 'SQUARE': 'SQ', 'POINT': 'PT',
+                 'NORTH': 'N', 'SOUTH': 'S', 'EAST': 'E', 'WEST': 'W',
+                 'NORTHEAST': 'NE', 'NORTHWEST': 'NW', 'SOUTHEAST': 'SE', 'SOUTHWEST': 'SW'}
+UNIT_WORDS = {'APARTMENT', 'APT', 'UNIT', 'SUITE', 'STE', 'NO', '#'}
+NAME_SUFFIXES = {'JR', 'SR', 'II', 'III', 'IV'}
+SUFFIX_WORDS = {'JUNIOR': 'JR', 'SENIOR': 'SR'}
+
+
+def map_unique(series, func, missing):
+    """
+    Apply func to each unique value of a Series once and broadcast the results back with the factorized codes.
+    The standardize functions are plain Python, and names/addresses repeat, so this is cheaper than Series.map.
+    :param series: Series to transform
+    :param func: function applied to each unique non-null value
+    :param missing: result for null values
+    :return Series:
+    """
+    codes, uniques = factorize(series)
+    # Codes of -1 (null values) index the trailing missing value.
+    results = array([func(v) for v in uniques] + [missing], dtype=object)
+    return Series(results[codes], index=series.index, name=series.name)
+
+
+def standardize_address(value):
+    """
+    Upper case, strip punctuation, abbreviate suffixes/directionals and write every unit designator as '#'.
+    '123 Main Street Apt 4' and '123 Main St. #4' both become '123 MAIN ST #4'.
+    :param value: address
+    :return str:
+    """
+    if not isinstance(value, str):
+        return ''
+    address = []
+    unit = False
+    for token in PUNCTUATION.sub(' ', value.upper()).split():
+        if token in UNIT_WORDS:
+            unit = True
+        elif token.startswith('#'):
+            address.append(token)
+            unit = False
+        elif unit:
+            address.append('#' + token)
+            unit = False
+        else:
+            address.append(ABBREVIATIONS.get(token, token))
+    return ' '.join(address)
+
+
+def standardize_name(value):
+    """
+    Upper case letters only, with a generational suffix moved to the end and abbreviated.
+    'Smith, John Junior' isn't reordered, but 'John Smith Jr.' and 'John Jr Smith' both become 'JOHN SMITH JR'.
+    :param value: full name
+    :return str:
+    """
+    if not isinstance(value, str):
+        return ''
+    tokens = [SUFFIX_WORDS.get(t, t) for t in re.sub(r'[^A-Z ]', ' ', value.upper()).split()]
+    suffixes = [t for t in tokens if t in NAME_SUFFIXES]
+    return ' '.join([t for t in tokens if t not in NAME_SUFFIXES] + suffixes[:1])
+
+
+def name_parts(value):
+    """
+    :param value: standardized name
+    :return tuple: (first name, last name, generational suffix), '' where missing
+    """
+    tokens = value.split()
+    suffix = tokens.pop() if tokens and tokens[-1] in NAME_SUFFIXES else ''
+    if not tokens:
+        return '', '', suffix
+    return tokens[0], tokens[-1] if len(tokens) > 1 else '', suffix
+
+
+def address_unit(value):
+    """
+    :param value: standardized address
+    :return str: unit/apartment number ('#4'), '' without one
+    """
+    return next((t for t in value.split() if t.startswith('#')), '')
+
+
+def name_key(value):
+    """
+    Blocking key from a standardized name: first 3 letters of the last name.
+    :param value: standardized name
+    :return str:
+    """
+    return name_parts(value)[1][:3] or value[:3]
+
+
+def first_names_match(first1, first2):
+    """ Same first name, or one of them is just the other's initial. """
+    if first1 == first2:
+        return True
+    if len(first1) == 1 or len(first2) == 1:
+        return first1[:1] == first2[:1]
+    return False
+
+
+def similarity(name1, addr1, name2, addr2):
+    """
+    Average SequenceMatcher ratio of last name and address. Records never match with different house numbers,
+    unit numbers or generational suffixes, or first names that differ other than by an initial, so Jr/Sr,
+    Mary/Mark and Apt 4/Apt 5 stay separate records.
+    :param name1: standardized name
+    :param addr1: standardized address
+    :param name2: standardized name
+    :param addr2: standardized address
+    :return float:
+    """
+    if addr1.split(' ', 1)[0] != addr2.split(' ', 1)[0] or address_unit(addr1) != address_unit(addr2):
+        return 0.0
+    first1, last1, suffix1 = name_parts(name1)
+    first2, last2, suffix2 = name_parts(name2)
+    if suffix1 != suffix2 or not first_names_match(first1, first2):
+        return 0.0
+    return (SequenceMatcher(None, last1, last2).ratio() + SequenceMatcher(None, addr1, addr2).ratio()) / 2
+
+
+def find_clusters(frame, name='Full Name', address='Address', zip_code='Zip', threshold=0.88):
+    """
+    Assign a cluster number to every record. Records are only compared within blocks of the same
+    5-digit ZIP and name key, so cost stays near linear in the number of records.
+    :param frame: DataFrame of mailing records
+    :param name: name column
+    :param address: address column
+    :param zip_code: ZIP column
+    :param threshold: minimum similarity for two records to be considered the same
+    :return Series: cluster number per record, shared by matching records
+    """
+    names = map_unique(frame[name], standardize_name, '').values
+    addresses = map_unique(frame[address], standardize_address, '').values
+    blocks = DataFrame({'zip': frame[zip_code].astype(str).str[:5].values,
+                        'key': [name_key(n) for n in names]})
+
+    # Union-find over record positions
+    parent = arange(len(frame))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    for members in blocks.groupby(['zip', 'key']).indices.values():
+        if len(members) < 2:
+            continue
+        for x, i in enumerate(members):
+            for j in members[x + 1:]:
+                if similarity(names[i], addresses[i], names[j], addresses[j]) >= threshold:
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j:
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+
+    return Series([find(i) for i in range(len(frame))], index=frame.index, name='Cluster')
+
+
+def fuzzy_dedupe(frame, name='Full Name', address='Address', zip_code='Zip', threshold=0.88):
+    """
+    Remove fuzzy duplicates, keeping the first record of each cluster.
+    :param frame: DataFrame of mailing records
+    :param name: name column
+    :param address: address column
+    :param zip_code: ZIP column
+    :param threshold: minimum similarity for two records to be considered the same
+    :return tuple: (deduplicated DataFrame, DataFrame of every cluster with more than one record)
+    """
+    clusters = find_clusters(frame, name, address, zip_code, threshold)
+    keep = ~clusters.duplicated()
+    multiple = clusters.duplicated(keep=False)
+
+    report = frame.loc[multiple, [name, address, zip_code]].copy()
+    report.insert(0, 'Cluster', clusters[multiple])
+    report['Kept'] = keep[multiple]
+    report.sort_values(by=['Cluster'], kind='mergesort', inplace=True)
+    return frame[keep], report
@@ -0,0 +1,168 @@
+# Python 3.7.2
+"""
+Columnar (Parquet) cache of parsed inputs, so reruns skip the slow openpyxl read and the cleanup of the
+spreadsheet. Spreadsheets are keyed by path, modification time and read options (read_excel_cached); other
+loaders pass their own key to cached_frame. A frame Parquet can't hold (object columns mixing numbers, text
+and dates, as read with dtype=object) is pickled instead, which keeps every value's type. Without pyarrow,
+inputs are read as before without caching. The cache is kept in ~/.duke_input_cache, or in the folder given
+by the DUKE_INPUT_CACHE environment variable ('' turns it off).
+"""
+from hashlib import sha1
+from os import environ, getpid, listdir, makedirs, path, remove, replace, stat, utime
+from pickle import UnpicklingError
+from time import time
+
+from numpy import nan
+from pandas import read_excel, read_parquet, read_pickle
+
+from input_schema import STRING
+
+try:
+    from pyarrow import ArrowException
+except ImportError:  # No columnar cache
+    ArrowException = None
+
+CACHE_DIR = environ.get('DUKE_INPUT_CACHE', path.join(path.expanduser('~'), '.duke_input_cache'))
+CACHE_EXT = '.parquet'
+PICKLE_EXT = '.pkl'
+MAX_CACHE_BYTES = 2 * 1024 ** 3  # 2 GB
+MAX_AGE = 30 * 24 * 60 * 60  # 30 days
+
+
+def file_digest(filename, block_size=1 << 20):
+    """
+    SHA-1 of a file's contents, read in blocks.
+    :param filename: path to file
+    :param block_size: bytes read per block
+    :return str:
+    """
+    digest = sha1()
+    with open(filename, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def cache_location(cache_dir=None):
+    """
+    :param cache_dir: cache location, CACHE_DIR when None
+    :return str: cache location, '' when inputs aren't cached (cache_dir '' or no pyarrow)
+    """
+    if ArrowException is None:
+        return ''
+    return CACHE_DIR if cache_dir is None else cache_dir
+
+
+def cache_key(filename, **kwargs):
+    """
+    Key from the file's absolute path, modification time and size, plus the read options.
+    A file that is modified or replaced gets a new key.
+    :param filename: spreadsheet path
+    :return str:
+    """
+    info = stat(filename)
+    options = repr(sorted(kwargs.items()))
+    return sha1(f'{path.abspath(filename)}|{info.st_mtime_ns}|{info.st_size}|{options}'.encode('utf-8')).hexdigest()
+
+
+def _read(cache_file):
+    """
+    Read a cached frame with the dtypes it was written with: Parquet gives missing text as None and strings as
+    python-backed StringDtype, so those are set back to NaN and STRING.
+    """
+    if cache_file.endswith(PICKLE_EXT):
+        return read_pickle(cache_file, compression=None)
+    df = read_parquet(cache_file)
+    for column, dtype in df.dtypes.items():
+        if dtype == object:
+            df[column] = df[column].where(df[column].notna(), nan)
+        elif str(dtype) == 'string' and dtype != STRING:
+            df[column] = df[column].astype(STRING)
+    return df
+
+
+def _write(df, cache_file):
+    """
+    Write the frame as Parquet, or pickled when Parquet can't hold it.
+    :param cache_file: cache path without extension
+    """
+    temp = f'{cache_file}.{getpid()}'
+    try:
+        df.to_parquet(temp)
+        ext = CACHE_EXT
+    except (ArrowException, ValueError, TypeError):
+        df.to_pickle(temp, compression=None)
+        ext = PICKLE_EXT
+    replace(temp, cache_file + ext)
+
+
+def cached_frame(key, build, cache_dir=None):
+    """
+    Serve a DataFrame from the cache, or build and cache it on first use.
+    :param key: cache key, unique to the input and everything that changes the built frame
+    :param build: function returning the DataFrame
+    :param cache_dir: cache location, CACHE_DIR when None, '' to build without caching
+    :return DataFrame:
+    """
+    cache_dir = cache_location(cache_dir)
+    if not cache_dir:
+        return build()
+
+    for ext in (CACHE_EXT, PICKLE_EXT):
+        cache_file = path.join(cache_dir, key + ext)
+        if not path.exists(cache_file):
+            continue
+        try:
+            df = _read(cache_file)
+        except (OSError, ArrowException, UnpicklingError, EOFError):  # Unreadable, e.g. left by an older pyarrow.
+            continue
+        utime(cache_file)  # Mark as recently used for eviction.
+        return df
+
+    df = build()
+    makedirs(cache_dir, exist_ok=True)
+    _write(df, path.join(cache_dir, key))
+    evict(cache_dir)
+    return df
+
+
+def read_excel_cached(filename, cache_dir=None, **kwargs):
+    """
+    read_excel that stores the DataFrame on first read and serves later reads of the unchanged file
+    from the cache, with the same dtypes.
+    :param filename: spreadsheet path
+    :param cache_dir: cache location, CACHE_DIR when None, '' to read without caching
+    :param kwargs: passed to read_excel
+    :return DataFrame:
+    """
+    cache_dir = cache_location(cache_dir)
+    if not cache_dir:
+        return read_excel(filename, **kwargs)
+    return cached_frame(cache_key(filename, **kwargs), lambda: read_excel(filename, **kwargs), cache_dir)
+
+
+def evict(cache_dir=CACHE_DIR, max_bytes=MAX_CACHE_BYTES, max_age=MAX_AGE):
+    """
+    Remove cache files unused for max_age seconds, then the least recently used until the cache
+    fits in max_bytes.
+    :param cache_dir: cache location
+    :param max_bytes: maximum total size of the cache
+    :param max_age: maximum seconds since a file was last used
+    """
+    files = []
+    for name in listdir(cache_dir):
+        if not name.endswith((CACHE_EXT, PICKLE_EXT)):
+            continue
+        info = stat(path.join(cache_dir, name))
+        files.append((info.st_mtime, info.st_size, path.join(cache_dir, name)))
+
+    now = time()
+    total = sum(size for _, size, _ in files)
+    for used, size, filename in sorted(files):
+        if now - used <= max_age and total <= max_bytes:
+            break
+        try:
+            remove(filename)
+        except OSError:
+            continue
+        total -= size
@@ -0,0 +1,102 @@
+# Python 3.7.2
+"""
+Column dtypes per input type. Known low-cardinality columns (State, Product Code, Envelope, ...) are stored as
+categoricals and other text as Arrow-backed strings, instead of one Python object per cell. Without pyarrow
+(or with a pandas older than 1.3) text stays as str objects, as it was read before.
+Text is never parsed as numbers, so ZIPs keep their leading zeros.
+"""
+from numpy import array
+from pandas import Categorical, Series
+from pandas.api.types import infer_dtype, is_categorical_dtype
+
+
+def string_dtype():
+    """
+    :return: 'string[pyarrow]' dtype when pandas and pyarrow support it, otherwise str
+    """
+    try:
+        import pyarrow  # noqa: F401
+        from pandas import StringDtype
+        return StringDtype('pyarrow')
+    except (ImportError, TypeError, ValueError):
+        return str
+
+
+STRING = string_dtype()
+
+
+class Schema:
+    def __init__(self, categories=()):
+        """
+        :param categories: low-cardinality columns loaded as categoricals, matched case-insensitively
+        """
+        self.categories = {c.casefold() for c in categories}
+
+    def is_category(self, column):
+        return str(column).strip().casefold() in self.categories
+
+    def apply(self, df):
+        """
+        Convert the columns of a loaded frame: listed columns to categoricals and other all-text columns
+        to STRING. Columns holding numbers or dates (read_excel with dtype=object) are left as they are.
+        :param df: DataFrame with unique column names, changed in place
+        :return DataFrame: df
+        """
+        for column in df.columns:
+            series = df[column]
+            if self.is_category(column):
+                if not is_categorical_dtype(series):
+                    df[column] = series.astype('category')
+            elif STRING is not str and series.dtype == object and infer_dtype(series, skipna=True) == 'string':
+                df[column] = series.astype(STRING)
+        return df
+
+
+MMO_ORDERS = Schema(['State', 'Product Code', 'Order Type', 'Bill To Region', 'PlanYear'])
+ANTHEM_GRID = Schema(['Envelope'])
+ANTHEM_LIST = Schema(['State', 'Envelope', 'List Contract Number', 'Contract Number'])
+VARIABLE_FILE = Schema(['State', 'Envelope', 'Contract Number'])
+
+
+def _replace_categories(series, mapping, na_value):
+    """
+    Replace the values of a categorical by mapping its categories once and remapping the codes.
+    Categories mapped to the same value are merged and the result's categories are sorted, so sorting
+    by the column gives the same order as sorting the replaced text.
+    """
+    mapped = [mapping.get(c, c) for c in series.cat.categories]
+    values = {v for v in mapped if v == v}
+    if na_value is not None:
+        values.add(na_value)
+    categories = sorted(values, key=str)
+    position = {v: i for i, v in enumerate(categories)}
+    # Codes of -1 (missing values) index the trailing na_value position; values mapped to NaN get -1.
+    remap = array([position.get(v, -1) for v in mapped] + [position.get(na_value, -1)], dtype='int64')
+    codes = remap[series.cat.codes.values]
+    return Series(Categorical.from_codes(codes, categories), index=series.index, name=series.name)
+
+
+def replace_values(df, updates):
+    """
+    DataFrame.replace with a {column: {old: new}} mapping that also works on categoricals without comparing
+    every row. A NaN key replaces missing values. Replacements aren't chained, as with DataFrame.replace.
+    :param df: DataFrame, changed in place
+    :param updates: {column: {old value: new value}}
+    :return DataFrame: df
+    """
+    for column, mapping in updates.items():
+        if column not in df.columns:
+            continue
+        series = df[column]
+        na_value = next((new for old, new in mapping.items() if old != old), None)
+        mapping = {old: new for old, new in mapping.items() if old == old}
+        if is_categorical_dtype(series):
+            df[column] = _replace_categories(series, mapping, na_value)
+            continue
+        missing = series.isna() if na_value is not None else None
+        if mapping:
+            series = series.replace(mapping)
+        if missing is not None:
+            series = series.mask(missing, na_value)
+        df[column] = series
+    return df
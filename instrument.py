@@ -0,0 +1,240 @@
+# Python 3.7.2
+"""
+Run instrumentation: stage timers, row counts, peak memory per stage and an optional cProfile dump,
+saved as a JSON run report next to the outputs. Stages cost a single attribute check while no run is started.
+Scripts without a report option record one when the DUKE_RUN_REPORT (or DUKE_PROFILE) environment variable is set.
+
+    start_run('MMO Process')
+    with stage('remove dupes', rows_in=len(df)) as s:
+        ...
+        s.rows_out = len(df)
+    finish_run()
+"""
+import cProfile
+import platform
+import tracemalloc
+from datetime import datetime
+from json import dump
+from os import environ, getcwd, path
+from time import perf_counter
+
+
+class Stage:
+    def __init__(self, report, name, rows_in=None):
+        """
+        Timed section of a run. Set rows_out before the with block ends. Stages may be nested; the peak memory
+        of an outer stage includes its inner stages. A stage left by an exception is recorded with the error.
+        :param report: RunReport the stage is recorded in
+        :param name: stage name
+        :param rows_in: rows the stage started with
+        """
+        self.report = report
+        self.name = name
+        self.rows_in = rows_in
+        self.rows_out = None
+        self.seconds = 0.0
+        self.peak_memory = None
+        self.error = None
+        self._start = 0.0
+        self._memory_start = 0
+        self._traced_peak = 0
+
+    def __enter__(self):
+        if self.report.memory:
+            self._memory_start = self.report.reset_peak()
+        self.report.open_stages.append(self)
+        self._start = perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.seconds = perf_counter() - self._start
+        self.report.open_stages.remove(self)
+        if self.report.memory:
+            self._traced_peak = max(self._traced_peak, tracemalloc.get_traced_memory()[1])
+            self.peak_memory = max(self._traced_peak - self._memory_start, 0)
+        if exc_type is not None:
+            self.error = f'{exc_type.__name__}: {exc}'
+        self.report.stages.append(self.as_dict())
+
+    def as_dict(self):
+        return {'stage': self.name,
+                'seconds': round(self.seconds, 4),
+                'rows_in': self.rows_in,
+                'rows_out': self.rows_out,
+                'peak_memory_mb': None if self.peak_memory is None else round(self.peak_memory / 1024 ** 2, 2),
+                'error': self.error}
+
+
+class NullStage:
+    """ Stage of a run that isn't instrumented. Row counts set on it are ignored. """
+    rows_in = rows_out = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return None
+
+    def __setattr__(self, key, value):
+        pass
+
+
+NULL_STAGE = NullStage()
+
+
+class RunReport:
+    def __init__(self, name='run', enabled=True, memory=True, profile=False, output_dir=None):
+        """
+        :param name: run name, used for the report file name
+        :param enabled: record stages, a disabled report hands out NULL_STAGE
+        :param memory: trace peak memory per stage (tracemalloc slows allocation heavy code)
+        :param profile: also dump cProfile stats of the whole run
+        :param output_dir: folder of the report, defaults to the current directory
+        """
+        self.name = name
+        self.enabled = enabled
+        self.memory = enabled and memory
+        self.profile = enabled and profile
+        self.output_dir = output_dir or getcwd()
+        self.stages = []
+        self.open_stages = []
+        self.started = datetime.now()
+        self._start = perf_counter()
+        self._profiler = None
+
+    def start(self):
+        if self.memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def stop(self):
+        """ Stop profiling and memory tracing. """
+        if self._profiler is not None:
+            self._profiler.disable()
+        if self.memory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+
+    def reset_peak(self):
+        """
+        Reset the traced memory peak at the start of a stage. The peak so far is first kept by the stages
+        still open, so resetting it for an inner stage doesn't lose the outer stages' peak.
+        :return int: traced memory the stage's peak is measured from
+        """
+        current, peak = tracemalloc.get_traced_memory()
+        for outer in self.open_stages:
+            outer._traced_peak = max(outer._traced_peak, peak)
+        if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+            tracemalloc.reset_peak()
+            return current
+        if self.open_stages:
+            # Clearing the traces would drop the outer stages' blocks, so an inner stage's peak is measured
+            # from the outer stage's start: an upper bound.
+            return self.open_stages[-1]._memory_start
+        # Clearing the traces also clears the peak; earlier blocks are no longer counted.
+        tracemalloc.clear_traces()
+        return 0
+
+    def stage(self, name, rows_in=None):
+        """
+        :param name: stage name
+        :param rows_in: rows the stage started with
+        :return Stage: context manager timing the stage
+        """
+        if not self.enabled:
+            return NULL_STAGE
+        return Stage(self, name, rows_in)
+
+    def add(self, stages, prefix=''):
+        """
+        Add stages recorded elsewhere, e.g. by a worker process.
+        :param stages: list of Stage.as_dict
+        :param prefix: put in front of each stage name
+        """
+        if self.enabled:
+            self.stages.extend(dict(s, stage=prefix + s['stage']) for s in stages)
+
+    def save(self):
+        """
+        Stop profiling/tracing and write '{name} Run Report {date}.json' (and '.prof' when profiling).
+        :return str: report path, None when disabled
+        """
+        if not self.enabled:
+            return None
+        self.stop()
+        base = path.join(self.output_dir, f'{self.name} Run Report {self.started:%m-%d-%Y %H%M%S}')
+        if self._profiler is not None:
+            self._profiler.dump_stats(base + '.prof')
+
+        report = {'name': self.name,
+                  'started': self.started.isoformat(),
+                  'seconds': round(perf_counter() - self._start, 4),
+                  'python': platform.python_version(),
+                  'platform': platform.platform(),
+                  'profile': base + '.prof' if self._profiler is not None else None,
+                  'stages': self.stages}
+        with open(base + '.json', 'w') as f:
+            dump(report, f, indent=2, default=str)
+        return base + '.json'
+
+
+DISABLED = RunReport(enabled=False)
+_active = DISABLED
+
+
+def active():
+    """
+    :return RunReport: report of the current run, DISABLED when no run is started
+    """
+    return _active
+
+
+def start_run(name, enabled=None, memory=True, profile=None, output_dir=None):
+    """
+    Start recording the stages of a run. With enabled False this is a no-op.
+    :param name: run name
+    :param enabled: defaults to the DUKE_RUN_REPORT environment variable being set
+    :param memory: trace peak memory per stage
+    :param profile: dump cProfile stats, defaults to the DUKE_PROFILE environment variable being set
+    :param output_dir: folder of the report, defaults to the current directory
+    :return RunReport:
+    """
+    global _active
+    if profile is None:
+        profile = bool(environ.get('DUKE_PROFILE'))
+    if enabled is None:
+        enabled = bool(environ.get('DUKE_RUN_REPORT')) or profile
+    if enabled:
+        _active = RunReport(name, memory=memory, profile=profile, output_dir=output_dir).start()
+    return _active
+
+
+def stop_run():
+    """
+    Stop recording without saving, e.g. in a worker process that hands its stages back.
+    :return RunReport: the stopped run
+    """
+    global _active
+    report, _active = _active, DISABLED
+    report.stop()
+    return report
+
+
+def finish_run():
+    """
+    Save the current run's report and stop recording.
+    :return str: report path, None when no run was started
+    """
+    return stop_run().save()
+
+
+def stage(name, rows_in=None):
+    """
+    Stage of the current run.
+    :param name: stage name
+    :param rows_in: rows the stage started with
+    :return Stage:
+    """
+    return _active.stage(name, rows_in)
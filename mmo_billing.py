@@ -0,0 +1,272 @@
+# Python 3.7.2
+"""
+Month-to-date MMO fulfillment billing. Each weekly file is priced and summarized once and the totals stored
+under its billing period (YYYY-MM), so the EOM of a month only sees that month's weeks.
+"""
+import re
+import sqlite3
+from argparse import ArgumentParser
+from datetime import datetime
+from os import getcwd, listdir, path, stat
+
+from pandas import DataFrame, to_datetime
+
+from input_cache import file_digest, read_excel_cached
+from mmo_rates import RATES
+
+DEFAULT_BILLING_LEDGER = path.join(path.expanduser('~'), 'mmo_billing_ledger.sqlite')
+WEEK_FILE = re.compile(r'W\d{1,2}[A-E]')
+
+TOTAL_COLUMNS = ['Postage In', 'Postage Out', 'Data Entry', 'Fulfillment Charge', 'TTL', 'Count']
+KEY_COLUMNS = ['Product Code', 'Billed As', 'Order Type']
+# Display name of each stored column
+LEDGER_COLUMNS = {'period': 'Period', 'week': 'Week', 'product_code': 'Product Code', 'billed_as': 'Billed As',
+                  'order_type': 'Order Type', 'postage_in': 'Postage In', 'postage_out': 'Postage Out',
+                  'data_entry': 'Data Entry', 'fulfillment': 'Fulfillment Charge', 'ttl': 'TTL', 'count': 'Count'}
+
+
+def week_files(directory=None):
+    """
+    Weekly billing files (e.g. '12345678 W1A.xlsx') in a directory.
+    :param directory: defaults to the current directory
+    :return list:
+    """
+    directory = directory or getcwd()
+    return [path.join(directory, p) for p in listdir(directory) if WEEK_FILE.search(p)]
+
+
+def week_job(filename):
+    """ Job number at the start of a weekly file name. """
+    return path.basename(filename)[0:8]
+
+
+def week_label(filename):
+    """ Week of a weekly file name, e.g. 'W1A '. """
+    return path.basename(filename)[9:13]
+
+
+def week_date(df, filename):
+    """
+    Date the orders of a weekly file are priced at and billed in: the latest ORDER DATE of the orders, or the
+    file's modification date when the file has no order dates.
+    :param df: orders from the weekly file
+    :param filename: weekly file path
+    :return Timestamp:
+    """
+    if 'ORDER DATE' in df.columns:
+        dates = to_datetime(df['ORDER DATE'], errors='coerce').dropna()
+        if not dates.empty:
+            return dates.max().normalize()
+    return to_datetime(datetime.fromtimestamp(stat(filename).st_mtime).date())
+
+
+def price_orders(df, rates=RATES, as_of=None):
+    """
+    Add the Postage In, Postage Out, Data Entry, Fulfillment Charge, TTL and Count columns.
+    OSB orders from prospects are re-coded 'MMO OSB PROSPECT'. The frame is changed in place.
+    :param df: orders from a weekly file
+    :param rates: mmo_rates.RateTable
+    :param as_of: pricing date, defaults to today
+    :return DataFrame:
+    :raises ValueError: when no rate row applies to an order
+    """
+    # Determine OSB Prospect mailings
+    df.loc[(df['PRODUCT CODE'] == 'MMO OSB') &
+           (df['WEBTRENDSCAMPAIGNIDCODE'] == 'Prospect'),
+           'PRODUCT CODE'] = 'MMO OSB PROSPECT'
+
+    # Create calculated columns
+    priced = rates.price(df, as_of=as_of)
+    for idx, col in enumerate(priced.columns):
+        df.insert(idx, col, priced[col])
+    df.insert(5, 'Count', 1)
+    return df
+
+
+def summarize_week(df, as_of, rates=RATES):
+    """
+    Price a weekly file and total its charges and counts per product code and order type.
+    :param df: orders from a weekly file
+    :param as_of: pricing date of the week, see week_date
+    :param rates: mmo_rates.RateTable
+    :return DataFrame: KEY_COLUMNS and TOTAL_COLUMNS, 'Product Code' is the code as ordered and
+                       'Billed As' the code it was priced as
+    """
+    product_code = df['PRODUCT CODE'].fillna('')
+    priced = price_orders(df, rates, as_of)
+    keys = [product_code.rename('Product Code'),
+            priced['PRODUCT CODE'].fillna('').rename('Billed As'),
+            priced['ORDER TYPE'].fillna('').rename('Order Type')]
+    return priced.groupby(keys)[TOTAL_COLUMNS].sum().reset_index()
+
+
+def summary_frames(totals):
+    """
+    Product code counts of each week, as on the EOM Summary sheet.
+    :param totals: BillingLedger.week_totals
+    :return list: (week, DataFrame of 'Product Code' and 'Count' ending in a 'Grand Total' row)
+    """
+    frames = []
+    for week, frame in totals.groupby('Week', sort=False):
+        counts = frame.loc[frame['Product Code'] != ''].groupby('Product Code')['Count'].sum()
+        counts['Grand Total'] = counts.sum()
+        frames.append((week, counts.reset_index()))
+    return frames
+
+
+def billing_frame(totals):
+    """
+    Charges and counts per week, billed product code and order type, as on the EOM Billing sheet.
+    :param totals: BillingLedger.week_totals
+    :return DataFrame:
+    """
+    billing = totals.groupby(['Week', 'Billed As', 'Order Type'], sort=False)[TOTAL_COLUMNS].sum().reset_index()
+    billing = billing.rename(columns={'Billed As': 'Product Code'})
+    return billing[TOTAL_COLUMNS + ['Week', 'Product Code', 'Order Type']]
+
+
+class BillingLedger:
+    def __init__(self, db_path=DEFAULT_BILLING_LEDGER):
+        """
+        SQLite store of weekly billing totals by job and billing period. A weekly file is summarized once; it
+        is only read again if its contents change, and not at all once its period is closed. Files of the same
+        name in different periods (next month's 'W1A') are kept apart.
+        :param db_path: location of the SQLite database
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS weeks (job TEXT, period TEXT, filename TEXT, week TEXT, file_hash TEXT,
+                                              recorded TEXT, PRIMARY KEY (job, period, filename));
+            CREATE TABLE IF NOT EXISTS totals (job TEXT, period TEXT, filename TEXT, week TEXT, product_code TEXT,
+                                               billed_as TEXT, order_type TEXT, postage_in REAL,
+                                               postage_out REAL, data_entry REAL, fulfillment REAL,
+                                               ttl REAL, count INTEGER);
+            CREATE INDEX IF NOT EXISTS totals_job ON totals (job, period);
+            CREATE TABLE IF NOT EXISTS periods (job TEXT, period TEXT, closed TEXT, PRIMARY KEY (job, period));
+        ''')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def has_week(self, job, period, filename, file_hash):
+        """
+        :param period: billing period, None for any period
+        :return bool: True if these contents of the file are recorded
+        """
+        row = self.conn.execute('SELECT 1 FROM weeks WHERE job = ? AND (period = ? OR ? IS NULL) AND filename = ? '
+                                'AND file_hash = ?', (job, period, period, filename, file_hash)).fetchone()
+        return row is not None
+
+    def is_closed(self, job, period):
+        return self.conn.execute('SELECT 1 FROM periods WHERE job = ? AND period = ? AND closed IS NOT NULL',
+                                 (job, period)).fetchone() is not None
+
+    def close_period(self, job, period):
+        """
+        Close a billing period once its EOM is sent. Its totals are kept, but no weekly file is recorded
+        into it again.
+        :param job: job number
+        :param period: billing period, YYYY-MM
+        """
+        with self.conn:
+            self.conn.execute('INSERT OR REPLACE INTO periods VALUES (?, ?, ?)',
+                              (job, period, datetime.now().isoformat()))
+
+    def record_week(self, job, period, filename, file_hash, summary):
+        """
+        Store the totals of a weekly file, replacing any earlier totals of the same file in the period.
+        :param job: job number
+        :param period: billing period, YYYY-MM
+        :param filename: weekly file name
+        :param file_hash: file_digest of the file
+        :param summary: DataFrame from summarize_week
+        """
+        if self.is_closed(job, period):
+            raise ValueError(f'Billing period {period} of job {job} is closed, {filename} was not recorded')
+        week = week_label(filename)
+        # astype(object) gives Python numbers, which sqlite3 can bind.
+        rows = [[job, period, filename, week] + values for values in
+                summary[KEY_COLUMNS + TOTAL_COLUMNS].astype(object).values.tolist()]
+        with self.conn:
+            self.conn.execute('DELETE FROM totals WHERE job = ? AND period = ? AND filename = ?',
+                              (job, period, filename))
+            self.conn.executemany('INSERT INTO totals (job, period, filename, week, product_code, billed_as, '
+                                  'order_type, postage_in, postage_out, data_entry, fulfillment, ttl, count) '
+                                  'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                                  rows)
+            self.conn.execute('INSERT OR REPLACE INTO weeks VALUES (?, ?, ?, ?, ?, ?)',
+                              (job, period, filename, week, file_hash, datetime.now().isoformat()))
+
+    def week_totals(self, job, period):
+        """
+        Stored totals of every week of a job's billing period, in weekly file name order.
+        :param job: job number
+        :param period: billing period, YYYY-MM
+        :return DataFrame: 'Period', 'Week', KEY_COLUMNS and TOTAL_COLUMNS
+        """
+        rows = self.conn.execute(f'SELECT {", ".join(LEDGER_COLUMNS)} FROM totals WHERE job = ? AND period = ? '
+                                 f'ORDER BY filename, rowid', (job, period))
+        return DataFrame(rows.fetchall(), columns=list(LEDGER_COLUMNS.values()))
+
+    def latest_job(self):
+        """
+        :return str: job of the most recently recorded week, None if there is none
+        """
+        row = self.conn.execute('SELECT job FROM weeks ORDER BY recorded DESC LIMIT 1').fetchone()
+        return row[0] if row else None
+
+    def latest_period(self, job):
+        """
+        :param job: job number
+        :return str: latest billing period with recorded weeks, None if there is none
+        """
+        row = self.conn.execute('SELECT MAX(period) FROM weeks WHERE job = ?', (job,)).fetchone()
+        return row[0]
+
+    def update(self, filenames, period=None, rates=RATES):
+        """
+        Summarize and store the weekly files that are new or changed since they were recorded.
+        :param filenames: weekly file paths
+        :param period: billing period (YYYY-MM) of the files, from each file's week_date when None
+        :param rates: mmo_rates.RateTable the weeks are priced with
+        :return list: file names that were summarized
+        """
+        recorded = []
+        for filename in filenames:
+            job, name, digest = week_job(filename), path.basename(filename), file_digest(filename)
+            if self.has_week(job, period, name, digest):
+                continue
+            df = read_excel_cached(filename)
+            as_of = week_date(df, filename)
+            week_period = period or as_of.strftime('%Y-%m')
+            self.record_week(job, week_period, name, digest, summarize_week(df, as_of, rates))
+            recorded.append(name)
+        return recorded
+
+
+def main():
+    """ Record the weekly files in the current directory as they arrive, or close a billing period. """
+    parser = ArgumentParser(description='Record weekly MMO billing files in the billing ledger')
+    parser.add_argument('--period', help='Billing period (YYYY-MM) of the files (default: from the order dates)')
+    parser.add_argument('--close', metavar='JOB', help="Close the job's billing period instead (--period, "
+                                                      'default: its latest period)')
+    parser.add_argument('--ledger', default=DEFAULT_BILLING_LEDGER, help='Billing ledger location')
+    args = parser.parse_args()
+
+    ledger = BillingLedger(args.ledger)
+    try:
+        if args.close:
+            period = args.period or ledger.latest_period(args.close)
+            ledger.close_period(args.close, period)
+            print(f'Closed {args.close} {period}')
+        else:
+            for name in ledger.update(week_files(), args.period):
+                print(f'Recorded {name}')
+    finally:
+        ledger.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,26 +1,49 @@
 # Python 3.7.2
-import re
 from datetime import datetime
 
 from numpy import NaN
-from pandas import set_option, read_excel, ExcelWriter
+from pandas import set_option, ExcelWriter, DataFrame
+
+from fuzzy_dedupe import fuzzy_dedupe
+from input_cache import read_excel_cached
+from input_schema import MMO_ORDERS, STRING, replace_values
+from instrument import finish_run, stage, start_run
+from normalize import normalize_frame
+from report_writer import write_report
 
 
 class ProcessFile:
-    def __init__(self, frame):
-        set_option('precision', 0)
-        self.df = frame
+    def __init__(self, frame, fuzzy=False, output_format=None):
+        """
+        :param frame: DataFrame of orders
+        :param fuzzy: also remove fuzzy name/address duplicates and output the match clusters
+        :param output_format: 'csv' or 'parquet' to write the lists without Excel, None for .xlsx
+        """
+        set_option('display.precision', 0)
+        # Low-cardinality columns as categoricals, other text as compact strings
+        self.df = MMO_ORDERS.apply(frame)
         self.updates = {}
+        self.fuzzy = fuzzy
+        self.output_format = output_format
+        self.clusters = DataFrame()
 
         # Find and remove empty data
-        self.df.replace(' ', NaN, inplace=True)
-        self.df.dropna(subset=['Full Name'], inplace=True)
-        self.df.dropna(subset=['Address'], inplace=True)
+        with stage('drop empty', rows_in=len(self.df.index)) as s:
+            replace_values(self.df, {column: {' ': NaN} for column in self.df.columns})
+            self.df.dropna(subset=['Full Name'], inplace=True)
+            self.df.dropna(subset=['Address'], inplace=True)
+            s.rows_out = len(self.df.index)
 
         # Process data
-        self.update()
-        self.remove_dupes()
-        self.separate_by_year()
+        with stage('update', rows_in=len(self.df.index)):
+            self.update()
+        with stage('remove dupes', rows_in=len(self.df.index)) as s:
+            self.remove_dupes()
+            s.rows_out = len(self.df.index)
+        if self.fuzzy:
+            self.output_clusters()
+        with stage('output lists', rows_in=len(self.df.index)):
+            self.separate_by_year()
 
     def update(self):
         """
@@ -44,7 +67,7 @@ class ProcessFile:
                         'PlanYear': {NaN: datetime.now().year}
                         }
 
-        self.df.replace(self.updates, inplace=True)
+        replace_values(self.df, self.updates)
 
     def remove_dupes(self):
         """
@@ -52,42 +75,49 @@ class ProcessFile:
         Reset index and sort by 'Product Code'
         :return: N/A
         """
+        # Normalize names/addresses and remove test records
         fix_cols = ['Full Name', 'Address', 'City']
-        self.df[fix_cols] = self.df[fix_cols].applymap(lambda x: x.title())
-        self.df[fix_cols] = self.df[fix_cols].applymap(lambda x: re.sub(' +', ' ', x))
+        self.df = normalize_frame(self.df, fix_cols, test_column='Full Name')
         self.df.drop_duplicates(['Full Name', 'Address'], inplace=True)
 
-        # Remove test records
-        self.df = self.df[~self.df['Full Name'].str.lower().str.contains('test')]
+        # Optionally catch near duplicates ('123 Main St' vs '123 Main Street', 'Apt 4' vs '#4')
+        if self.fuzzy:
+            self.df, self.clusters = fuzzy_dedupe(self.df)
 
         # Start the index at 1 and sort by 'Product Code'
         self.df.reset_index(drop=True, inplace=True)
         self.df.index += 1
         self.df.sort_values(by='Product Code', inplace=True)
 
+    def output_clusters(self):
+        """
+        Output fuzzy match clusters for review. 'Kept' marks the record that stays on the list.
+        :return: N/A
+        """
+        if not self.clusters.empty:
+            writer = ExcelWriter(f'MMO Fuzzy Matches {datetime.now():%m-%d-%Y}.xlsx')
+            self.clusters.to_excel(writer, index=False, header=True)
+            writer.save()
+
     def separate_by_year(self):
         """
         Split DataFrame into 2 output files, grouped by 'PlanYear'
         :return:
         """
-        df_dict = dict(tuple(self.df.groupby(['PlanYear'])))
-        df_list = [df_dict[x] for x in df_dict]
-        for idx, frame in enumerate(df_list):
-            writer = ExcelWriter(str(df_list[idx].iloc[0]['PlanYear']) + ' list.xlsx')
-            df_list[idx].to_excel(writer, index=False, header=True)
-            wb = writer.book
-            ws = writer.sheets['Sheet1']
-            rows = int(len(df_list[idx].index))
-            df_list[idx].columns = map(str.upper, df_list[idx].columns)
-            ws.write_row(0, 0, df_list[idx].columns.values)
-            writer.save()
+        header = [c.upper() for c in self.df.columns]
+        for year, frame in self.df.groupby('PlanYear', observed=True):
+            write_report(frame, f'{year} list.xlsx', self.output_format, header=header)
 
 
 def main():
     now = datetime.now()
     filename = f'//Xmf-server/duke/Inter Office Mail/Medical Mutual Spreadsheets/MMO Fulfillment/_IN PROCESS/MMO_XML_ORDER {now:%m-%d-%Y}.xlsx'
-    xml_df = read_excel(filename, dtype=str)
+    start_run('MMO Fix Data')
+    with stage('read orders') as s:
+        xml_df = read_excel_cached(filename, dtype=STRING)
+        s.rows_out = len(xml_df.index)
     job = ProcessFile(xml_df)
+    finish_run()
 
 
 if __name__ == '__main__':
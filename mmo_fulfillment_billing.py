@@ -4,39 +4,20 @@
 # -- Imports/Functions --
 # -----------------------
 # Test information
-from os import getcwd, listdir
-from re import search
-
-from numpy import select, where, ceil
-from pandas import ExcelWriter, read_excel, pivot_table, DataFrame, concat
-
-# Package Postage Cost
-PEK: float = 8.30
-MAG: float = 1.84
-OSB: float = 2.05
-OSB_PRS: float = 2.68
-UMG: float = 1.84
-
-# Reply Envelope Postage
-BRE: float = 0.64
-# Data Entry Charge
-DATA: float = 0.20
-# Fulfillment Charge
-CHARGE: float = 0.52
-
-
-def job_summary(job_frame):
-    """ Pivot Job to Count Product Codes """
-    job_frame = pivot_table(job_frame,
-                            index=['PRODUCT CODE'],
-                            values=['ADDRESS'],
-                            aggfunc=len,
-                            margins=True)
-    job_frame.reset_index(inplace=True)
-    job_frame.columns = ['Product Code', 'Count']
-    job_frame['Product Code'].replace(to_replace=['All'],
-                                      value='Grand Total', inplace=True)
-    return job_frame
+from argparse import ArgumentParser
+from os import getcwd, path
+from time import perf_counter
+from typing import Dict
+
+from numpy import ceil
+from pandas import DataFrame, ExcelWriter, Series, Timestamp, concat
+from pandas.tseries.offsets import MonthEnd
+
+from instrument import finish_run, stage, start_run
+from mmo_billing import (DEFAULT_BILLING_LEDGER, TOTAL_COLUMNS, BillingLedger, billing_frame, summary_frames,
+                         week_files, week_job)
+from mmo_rates import RATES, RateTable
+from report_writer import write_frame
 
 
 def get_col(i):
@@ -62,140 +43,181 @@ def get_row(current_idx):
     current_row = start_row * max_height + spacer
     return current_row
 
-# -----------------------------------
-# -- Retrieve Files for Processing --
-# -----------------------------------
-
-
-file = []
-for p in listdir(getcwd()):
-    if search(r'W\d{1,2}[A-E]', p):
-        file.append(p)
-job_num = file[0][0:8]
-
-# ------------------------------------
-# -- Workbook & Worksheet Formatting --
-# ------------------------------------
-
-writer = ExcelWriter(f'{job_num} EOM.xlsx', engine='xlsxwriter')
-wb = writer.book
-
-# Formatting for Excel worksheets
-fmt_breakdown = wb.add_format({'align': 'center', 'italic': True})
-fmt_center = wb.add_format({'align': 'center'})
-fmt_currency = wb.add_format({'num_format': '$#,##0.00'})
-fmt_header = wb.add_format({'bold': True, 'border': 1})
-fmt_sum_head = wb.add_format({'align': 'center', 'border': 1,
-                              'num_format': '$#,##0.00'})
-fmt_sum_count = wb.add_format({'align': 'center', 'border': 1})
-fmt_ttl = wb.add_format({'bold': True, 'align': 'right'})
-fmt_sub_ttl = wb.add_format({'bold': True, 'top': 1})
-# Orange hex color: 'ffc000'
-
-# ------------------
-# -- Process Data --
-# ------------------
-
-df = DataFrame()
-
-# Loop through files to generate summary and append to billing.
-
-for idx, item in enumerate(file):
-    temp = read_excel(item)
-    col = get_col(idx)
-    row = get_row(idx)
-    df_sum = job_summary(temp)
-    df_sum.to_excel(writer,
-                    sheet_name='Summary',
-                    header=False,
-                    startcol=col,
-                    startrow=row,
-                    index=False)
-    heads = list(df_sum.columns.values)
-    sub_ttl = row + len(df_sum.index) - 1
-    ws_summary = writer.sheets['Summary']
-    ws_summary.merge_range(row - 3, col, row - 3, col + 1,
-                           item[9:13] + ' Breakdown',
-                           fmt_breakdown)
-    ws_summary.write(row - 1, col + 1,
-                     'Total',
-                     fmt_ttl)
-    ws_summary.conditional_format(sub_ttl, col, sub_ttl, col + 1,
-                                  {'type': 'no_blanks',
-                                   'format': fmt_sub_ttl})
-    df = concat([df, temp], ignore_index=True, sort=False)
-
-# Determine OSB Prospect mailings
-df.loc[(df['PRODUCT CODE'] == 'MMO OSB') &
-       (df['WEBTRENDSCAMPAIGNIDCODE'] == 'Prospect'),
-       'PRODUCT CODE'] = 'MMO OSB PROSPECT'
-
-# Assign values to product codes
-CONDITIONS = [
-    (df['PRODUCT CODE'] == 'PEK'),
-    (df['PRODUCT CODE'] == 'MMO MAG'),
-    (df['PRODUCT CODE'] == 'MMO OSB'),
-    (df['PRODUCT CODE'] == 'MMO OSB PROSPECT'),
-    (df['PRODUCT CODE'] == 'UMG')]
-CHOICES = [PEK, MAG, OSB, OSB_PRS, UMG]
-
-# Create calculated columns
-df.insert(0, 'Postage In', where(df['ORDER TYPE'] == 'BRE', BRE, 0))
-df.insert(1, 'Postage Out', select(CONDITIONS, CHOICES))
-df.insert(2, 'Data Entry', where(df['ORDER TYPE'] == 'BRE', DATA, 0))
-df.insert(3, 'Fulfillment Charge', CHARGE)
-df.insert(4, 'TTL', df['Postage In'] + df['Postage Out'] +
-          df['Data Entry'] + df['Fulfillment Charge'])
-df.insert(5, 'Count', 1)
-
-# Add BRE Junk Envelopes Received
-junk_mail = int(input("Total Junk Mail received: "))
-junk_post_in = junk_mail * BRE
-df = df.append({'Postage In': junk_post_in, 'TTL': junk_post_in, 'Count': junk_mail},
-               ignore_index=True, sort=False)
-
-# Get column totals for placement at top of worksheet
-sum_row = df[['Postage In', 'Postage Out', 'Data Entry', 'Fulfillment Charge',
-              'TTL', 'Count']].sum()
-df_sum = DataFrame(data=sum_row).T
-df_sum = df_sum.reindex(columns=df.columns)
-sums = df_sum.iloc[[0][0:6]].values.flatten().tolist()
-
-# --------------------------------
-# -- Output/Format Billing Data --
-# --------------------------------
-
-ws_summary.set_column('A:A', 20)
-ws_summary.set_column('E:E', 20)
-
-df.to_excel(writer, sheet_name='Billing', startrow=4,
-            header=False, index=False)
-ws_billing = writer.sheets['Billing']
-ws_billing.set_column('A:E', 18, fmt_currency)
-
-heads = list(df.columns.values)
-for idx, item in enumerate(heads):
-    ws_billing.write(3, idx, item, fmt_center)
-
-ws_billing.conditional_format('A4:F4', {'type': 'no_blanks',
-                                        'format': fmt_header})
-
-ws_billing.write_row(2, 0, sums[0:5], fmt_sum_head)
-ws_billing.write(2, 5, sums[5], fmt_sum_count)
-ws_billing.write('E1', 'Total Junk Mail:')
-ws_billing.write('F1', junk_mail)
-ws_billing.write_formula('F2', '=F3-F1')
-
-wb.close()
-© 2021 GitHub, Inc.
-Terms
-Privacy
-Security
-Status
-Docs
-Contact GitHub
-Pricing
-API
-Training
-Blog
-About
+
+class EomResult:
+    def __init__(self, filename, totals):
+        """
+        Outcome of an end of month run.
+        :param filename: EOM workbook written
+        :param totals: Series of the Billing sheet column totals, junk mail included
+        """
+        self.filename = filename
+        self.totals: Series = totals
+        self.timings: Dict[str, float] = {}
+
+    def __str__(self):
+        stages = ', '.join(f'{stage} {seconds:.2f}s' for stage, seconds in self.timings.items())
+        return f'{self.filename}: TTL {self.totals["TTL"]:,.2f}, Count {self.totals["Count"]:,.0f} ({stages})'
+
+
+def write_summary(writer, totals):
+    """
+    Product code breakdown of each week, two weeks per row.
+    :param writer: ExcelWriter (xlsxwriter engine)
+    :param totals: BillingLedger.week_totals
+    """
+    wb = writer.book
+    fmt_breakdown = wb.add_format({'align': 'center', 'italic': True})
+    fmt_ttl = wb.add_format({'bold': True, 'align': 'right'})
+    fmt_sub_ttl = wb.add_format({'bold': True, 'top': 1})
+
+    for idx, (week, df_sum) in enumerate(summary_frames(totals)):
+        col = get_col(idx)
+        row = get_row(idx)
+        df_sum.to_excel(writer,
+                        sheet_name='Summary',
+                        header=False,
+                        startcol=col,
+                        startrow=row,
+                        index=False)
+        sub_ttl = row + len(df_sum.index) - 1
+        ws_summary = writer.sheets['Summary']
+        ws_summary.merge_range(row - 3, col, row - 3, col + 1,
+                               week + ' Breakdown',
+                               fmt_breakdown)
+        ws_summary.write(row - 1, col + 1,
+                         'Total',
+                         fmt_ttl)
+        ws_summary.conditional_format(sub_ttl, col, sub_ttl, col + 1,
+                                      {'type': 'no_blanks',
+                                       'format': fmt_sub_ttl})
+
+    if 'Summary' in writer.sheets:
+        writer.sheets['Summary'].set_column('A:A', 20)
+        writer.sheets['Summary'].set_column('E:E', 20)
+
+
+def write_billing(wb, totals, junk_mail, rates=RATES, period=None):
+    """
+    Charges per week, product code and order type with the column totals at the top.
+    :param wb: xlsxwriter Workbook
+    :param totals: BillingLedger.week_totals
+    :param junk_mail: number of BRE junk envelopes received
+    :param rates: mmo_rates.RateTable of the BRE postage of junk mail
+    :param period: billing period (YYYY-MM), junk mail is priced at its last day (today when None)
+    :return Series: column totals
+    """
+    fmt_center = wb.add_format({'align': 'center'})
+    fmt_currency = wb.add_format({'num_format': '$#,##0.00'})
+    fmt_header = wb.add_format({'bold': True, 'border': 1})
+    fmt_sum_head = wb.add_format({'align': 'center', 'border': 1,
+                                  'num_format': '$#,##0.00'})
+    fmt_sum_count = wb.add_format({'align': 'center', 'border': 1})
+    # Orange hex color: 'ffc000'
+
+    df = billing_frame(totals)
+
+    # Add BRE Junk Envelopes Received
+    as_of = Timestamp(period) + MonthEnd(0) if period else None
+    junk_post_in = junk_mail * rates.charges(order_type='BRE', as_of=as_of)['Postage In']
+    junk = DataFrame([{'Postage In': junk_post_in, 'TTL': junk_post_in, 'Count': junk_mail}])
+    df = concat([df, junk], ignore_index=True, sort=False)
+
+    # Get column totals for placement at top of worksheet
+    sums = df[TOTAL_COLUMNS].sum()
+
+    ws_billing = wb.add_worksheet('Billing')
+    ws_billing.set_column('A:E', 18, fmt_currency)
+    write_frame(ws_billing, df, start_row=3, header_format=fmt_center)
+
+    ws_billing.conditional_format('A4:F4', {'type': 'no_blanks',
+                                            'format': fmt_header})
+
+    ws_billing.write_row(2, 0, sums.tolist()[0:5], fmt_sum_head)
+    ws_billing.write(2, 5, sums['Count'], fmt_sum_count)
+    ws_billing.write('E1', 'Total Junk Mail:')
+    ws_billing.write('F1', junk_mail)
+    ws_billing.write_formula('F2', '=F3-F1')
+    return sums
+
+
+def run_eom(junk_mail, input_dir=None, output=None, ledger_path=DEFAULT_BILLING_LEDGER, job=None, rates=RATES,
+            period=None, close=False):
+    """
+    Summarize new weekly files into the billing ledger and write the EOM workbook from the stored totals.
+    :param junk_mail: number of BRE junk envelopes received
+    :param input_dir: folder of the weekly files, defaults to the current directory
+    :param output: EOM workbook, defaults to '<job> EOM.xlsx' in input_dir
+    :param ledger_path: billing ledger location
+    :param job: job number, taken from the weekly file names (or the latest ledger job) when None
+    :param rates: mmo_rates.RateTable the weeks and junk mail are priced with
+    :param period: billing period (YYYY-MM) of the new weekly files and the EOM, when None each file's
+                   period comes from its order dates and the EOM is of the job's latest period
+    :param close: close the billing period once the workbook is written
+    :return EomResult:
+    """
+    input_dir = input_dir or getcwd()
+    timings: Dict[str, float] = {}
+    start = perf_counter()
+
+    # Summarize weeks not already in the billing ledger; earlier weeks come from the stored totals.
+    files = week_files(input_dir)
+    ledger = BillingLedger(ledger_path)
+    try:
+        with stage('summarize weeks', rows_in=len(files)) as s:
+            s.rows_out = len(ledger.update(files, period, rates))
+        timings['summarize'] = perf_counter() - start
+        job = job or (week_job(files[0]) if files else ledger.latest_job())
+        if job is None:
+            raise FileNotFoundError(f'No weekly billing files in {input_dir}')
+        period = period or ledger.latest_period(job)
+        totals = ledger.week_totals(job, period)
+
+        output = output or path.join(input_dir, f'{job} EOM.xlsx')
+        write_start = perf_counter()
+        with stage('write eom', rows_in=len(totals.index)):
+            writer = ExcelWriter(output, engine='xlsxwriter')
+            write_summary(writer, totals)
+            sums = write_billing(writer.book, totals, junk_mail, rates, period)
+            writer.book.close()
+        timings['write'] = perf_counter() - write_start
+        if close and period:
+            ledger.close_period(job, period)
+    finally:
+        ledger.close()
+    timings['total'] = perf_counter() - start
+
+    result = EomResult(output, sums)
+    result.timings = timings
+    return result
+
+
+def main():
+    parser = ArgumentParser(description='End of month MMO fulfillment summary and billing workbook')
+    parser.add_argument('junk_mail', type=int, help='Total junk mail received')
+    parser.add_argument('--input-dir', default=getcwd(), help='Folder of the weekly (W) files')
+    parser.add_argument('--output', help="EOM workbook (default: '<job> EOM.xlsx' in the input folder)")
+    parser.add_argument('--ledger', default=DEFAULT_BILLING_LEDGER, help='Billing ledger location')
+    parser.add_argument('--job', help='Job number (default: from the weekly file names)')
+    parser.add_argument('--rates', help='Rate table .csv (default: the standard MMO rates)')
+    parser.add_argument('--period', help="Billing period, YYYY-MM (default: from the weekly files' order dates)")
+    parser.add_argument('--close', action='store_true', help='Close the billing period after writing the EOM')
+    parser.add_argument('--timings', action='store_true', help='Print the time of each stage')
+    parser.add_argument('--run-report', action='store_true', help='Save a JSON run report next to the workbook')
+    parser.add_argument('--profile', action='store_true', help='Also save cProfile stats of the run')
+    args = parser.parse_args()
+
+    start_run('MMO EOM', enabled=args.run_report or args.profile or None, profile=args.profile or None,
+              output_dir=path.dirname(path.abspath(args.output)) if args.output else args.input_dir)
+    rates = RateTable.from_csv(args.rates) if args.rates else RATES
+    result = run_eom(args.junk_mail, args.input_dir, args.output, args.ledger, args.job, rates, args.period,
+                     args.close)
+    finish_run()
+    if args.timings:
+        print(result)
+    else:
+        print(f'{result.filename}: TTL {result.totals["TTL"]:,.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,28 @@
 # Python 3.7.2
-from os import path, listdir, mkdir, rename
+from os import path, listdir, mkdir, rename, cpu_count
 from xml.etree.ElementTree import parse
 from datetime import datetime
-from pandas import ExcelWriter, DataFrame
+from pandas import DataFrame
+
+from input_cache import file_digest
+from instrument import finish_run, stage, start_run
+from mmo_ledger import DEFAULT_LEDGER, IngestLedger
+from mmo_xml_stream import OrderBuffer, iter_orders, iter_parsed, parse_files
+from report_writer import write_report
 
 now = datetime.now()
+XML_DIR = '//Xmf-server/duke/Inter Office Mail/MMO XML Orders/'
 
 
 class XmlImport:
-    def __init__(self, xml_dir):
+    def __init__(self, xml_dir, ledger=None):
         """
         Parses xml data received from Medical Mutual of Ohio online information request site.
         :rtype: object
         """
         self.xml_dir = xml_dir
+        self.ledger = ledger
+        self.run_id = None
         self.total_orders = []
         self.order = []
         self.df = DataFrame()
@@ -25,7 +34,19 @@ class XmlImport:
                             'PlanType': 'PlanType', 'MemberType': 'MemberType',
                             'WebtrendscampaignIDcode': 'WebtrendscampaignIDcode'}
 
-    def parse_xml(self):
+    def parse_xml(self, stream=False, workers=1):
+        with stage('parse xml') as s:
+            if self.ledger is not None:
+                self.parse_xml_incremental(workers)
+            elif workers > 1:
+                self.parse_xml_parallel(workers)
+            elif stream:
+                self.parse_xml_stream()
+            else:
+                self.parse_xml_tree()
+            s.rows_out = len(self.df.index)
+
+    def parse_xml_tree(self):
         for filename in listdir(self.xml_dir):
             if not filename.endswith('.xml'):
                 continue
@@ -46,42 +67,90 @@ class XmlImport:
         self.df = DataFrame(self.total_orders, columns=self.header_dict.values())
         self.df.insert(0, 'BRC_ID', value='')
 
-        if not self.df.empty:
+        self.archive_xml()
+
+    def parse_xml_stream(self):
+        buffer = OrderBuffer(self.header_dict)
+        for filename in listdir(self.xml_dir):
+            if not filename.endswith('.xml'):
+                continue
+            for values in iter_orders(path.join(self.xml_dir, filename), self.header_dict):
+                buffer.add(values)
+
+        self.df = buffer.to_frame()
+        self.df.insert(0, 'BRC_ID', value='')
+        self.archive_xml()
+
+    def parse_xml_parallel(self, workers):
+        filenames = [path.join(self.xml_dir, f) for f in listdir(self.xml_dir) if f.endswith('.xml')]
+        buffer, parsed = parse_files(filenames, self.header_dict, workers)
+
+        self.df = buffer.to_frame()
+        self.df.insert(0, 'BRC_ID', value='')
+        self.archive_xml([path.basename(f) for f in parsed])
+
+    def parse_xml_incremental(self, workers=1):
+        self.run_id = self.ledger.start_run()
+        buffer = OrderBuffer(self.header_dict)
+        archive = []
+        digests = {}
+        for f in sorted(listdir(self.xml_dir)):
+            if not f.endswith('.xml'):
+                continue
+            digest = file_digest(path.join(self.xml_dir, f))
+            if self.ledger.has_file(digest):
+                archive.append(f)
+            else:
+                digests[path.join(self.xml_dir, f)] = digest
+
+        for filename, data in iter_parsed(list(digests), list(self.header_dict), workers):
+            if data is None:
+                continue
+            buffer.extend(self.ledger.record_file(self.run_id, filename, digests[filename], data))
+            archive.append(path.basename(filename))
+
+        self.df = buffer.to_frame()
+        self.df.insert(0, 'BRC_ID', value='')
+        if archive:
+            self.archive_xml(archive, force=True)
+
+    def archive_xml(self, filenames=None, force=False):
+        if force or not self.df.empty:
             folder = f'{self.xml_dir}/XML {now:%m%d%y}'
             if not path.exists(folder):
                 mkdir(folder)
-            for f in listdir(self.xml_dir):
-                if f.endswith('.xml'):
-                    rename(f'{self.xml_dir}/{f}', f'{folder}/{f}')
+            if filenames is None:
+                filenames = [f for f in listdir(self.xml_dir) if f.endswith('.xml')]
+            for f in filenames:
+                rename(f'{self.xml_dir}/{f}', f'{folder}/{f}')
 
     def xml_to_xlsx(self):
         if not self.df.empty:
-            xml_filename = f'MMO_XML_ORDER {now:%m-%d-%Y}.xlsx'
-            writer = ExcelWriter(xml_filename, engine='xlsxwriter')
-            self.df.to_excel(writer, sheet_name='Sheet1', startrow=1, header=False, index=False)
-            wb = writer.book
-            ws = writer.sheets['Sheet1']
-            ws.set_column('A:R', 18)
-            rows = int(len(self.df.index))
-            ws.add_table(0, 0, rows, 17,
-                         {'columns': [{'header': 'BRC_ID'}, {'header': 'Full Name'}, {'header': 'Address'},
-                                      {'header': 'City'}, {'header': 'State'}, {'header': 'Zip'},
-                                      {'header': 'Zone'}, {'header': 'Product Code'},
-                                      {'header': 'Product Desc'}, {'header': 'Drop Date'},
-                                      {'header': 'Order Type'}, {'header': 'Order Date'},
-                                      {'header': 'Email'}, {'header': 'Phone'},
-                                      {'header': 'Bill To Region'}, {'header': 'PlanYear'},
-                                      {'header': 'PlanType'}, {'header': 'MemberType'},
-                                      {'header': 'WebtrendscampaignIDcode'},
-                                      ]})
-            writer.save()
+            with stage('write xml orders', rows_in=len(self.df.index)):
+                write_report(self.df, f'MMO_XML_ORDER {now:%m-%d-%Y}.xlsx', column_width=18, table=True)
 
 
-def main():
-    xml_dir = '//Xmf-server/duke/Inter Office Mail/MMO XML Orders/'
-    xml_df = XmlImport(xml_dir)
-    xml_df.parse_xml()
+def import_orders(xml_dir=XML_DIR, ledger_path=DEFAULT_LEDGER, workers=None):
+    """
+    Parse the new order files of xml_dir into 'MMO_XML_ORDER <date>.xlsx' in the current directory.
+    :param xml_dir: folder the MMO order files are dropped in
+    :param ledger_path: ingest ledger location
+    :param workers: parse processes, defaults to the number of CPUs
+    :return XmlImport:
+    """
+    ledger = IngestLedger(ledger_path)
+    xml_df = XmlImport(xml_dir, ledger)
+    xml_df.parse_xml(stream=True, workers=workers or cpu_count())
     xml_df.xml_to_xlsx()
+    ledger.complete_run(xml_df.run_id)
+    ledger.close()
+    return xml_df
+
+
+def main():
+    start_run('MMO Import XML')
+    import_orders()
+    finish_run()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,125 @@
+# Python 3.7.2
+""" Persistent record of the MMO XML files and orders that have already been ingested. """
+import sqlite3
+from datetime import datetime
+from hashlib import sha1
+from json import dumps, loads
+from os import path
+
+from pandas import DataFrame
+
+DEFAULT_LEDGER = path.join(path.expanduser('~'), 'mmo_ingest_ledger.sqlite')
+
+
+def order_key(values):
+    """
+    Order identity, taken from the hash of every header value of the order.
+    :param values: tag values of a single order
+    :return str:
+    """
+    return sha1('\x1f'.join('' if v is None else str(v) for v in values).encode('utf-8')).hexdigest()
+
+
+class IngestLedger:
+    def __init__(self, db_path=DEFAULT_LEDGER):
+        """
+        SQLite ledger of ingested XML files (keyed by content hash) and orders (keyed by order_key).
+        Each call to start_run opens a run; a run is only considered done once complete_run is called,
+        so orders from a run that crashed are still returned by pending_orders.
+        :param db_path: location of the SQLite database
+        """
+        self.db_path = db_path
+        self.conn = sqlite3.connect(db_path)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS runs (run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                                             started TEXT, completed TEXT);
+            CREATE TABLE IF NOT EXISTS files (file_hash TEXT PRIMARY KEY, filename TEXT, run_id INTEGER);
+            CREATE TABLE IF NOT EXISTS orders (order_key TEXT PRIMARY KEY, run_id INTEGER,
+                                               file_hash TEXT, data TEXT);
+            CREATE INDEX IF NOT EXISTS orders_run ON orders (run_id);
+            CREATE TABLE IF NOT EXISTS emitted (day TEXT, record_key TEXT, PRIMARY KEY (day, record_key));
+        ''')
+        self.conn.commit()
+
+    def close(self):
+        self.conn.close()
+
+    def start_run(self):
+        """
+        :return int: id of the new run
+        """
+        with self.conn:
+            cur = self.conn.execute('INSERT INTO runs (started) VALUES (?)', (datetime.now().isoformat(),))
+        return cur.lastrowid
+
+    def complete_run(self, run_id):
+        with self.conn:
+            self.conn.execute('UPDATE runs SET completed = ? WHERE run_id = ?', (datetime.now().isoformat(), run_id))
+
+    def last_completed_run(self):
+        """
+        :return int: id of the most recent completed run, 0 if there is none
+        """
+        row = self.conn.execute('SELECT MAX(run_id) FROM runs WHERE completed IS NOT NULL').fetchone()
+        return row[0] or 0
+
+    def has_file(self, file_hash):
+        return self.conn.execute('SELECT 1 FROM files WHERE file_hash = ?', (file_hash,)).fetchone() is not None
+
+    def record_file(self, run_id, filename, file_hash, data):
+        """
+        Record a parsed file and its orders in a single transaction.
+        :param run_id: id from start_run
+        :param filename: XML file name
+        :param file_hash: file_digest of the file
+        :param data: column lists, as returned by mmo_xml_stream.parse_file
+        :return list: column lists of the orders that were not already in the ledger
+        """
+        new = [[] for _ in data]
+        with self.conn:
+            for values in zip(*data):
+                key = order_key(values)
+                if self.conn.execute('SELECT 1 FROM orders WHERE order_key = ?', (key,)).fetchone():
+                    continue
+                self.conn.execute('INSERT INTO orders VALUES (?, ?, ?, ?)',
+                                  (key, run_id, file_hash, dumps(values)))
+                for column, value in zip(new, values):
+                    column.append(value)
+            self.conn.execute('INSERT OR IGNORE INTO files VALUES (?, ?, ?)',
+                              (file_hash, path.basename(filename), run_id))
+        return new
+
+    def emitted_keys(self, day):
+        """
+        :param day: ISO date, or '<ISO date> orders' for the raw order files of mmo_watch
+        :return set: record keys already written to that day's lists
+        """
+        return {key for key, in self.conn.execute('SELECT record_key FROM emitted WHERE day = ?', (day,))}
+
+    def record_emitted(self, day, keys):
+        """
+        :param day: ISO date, or '<ISO date> orders' for the raw order files of mmo_watch
+        :param keys: record keys written to that day's lists (see order_key)
+        """
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO emitted VALUES (?, ?)', [(day, key) for key in keys])
+
+    def orders_since(self, run_id, columns):
+        """
+        Orders recorded by runs after run_id, in the order they were ingested.
+        :param run_id: id of the last run already handled
+        :param columns: column names of the order values (XmlImport.header_dict values)
+        :return DataFrame:
+        """
+        rows = self.conn.execute('SELECT data FROM orders WHERE run_id > ? ORDER BY rowid', (run_id,))
+        df = DataFrame([loads(data) for data, in rows], columns=list(columns))
+        df.insert(0, 'BRC_ID', value='')
+        return df
+
+    def pending_orders(self, columns):
+        """
+        Orders recorded since the last completed run.
+        :param columns: column names of the order values (XmlImport.header_dict values)
+        :return DataFrame:
+        """
+        return self.orders_since(self.last_completed_run(), columns)
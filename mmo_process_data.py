@@ -1,25 +1,37 @@
-import re
 from datetime import datetime
-from os import path, listdir, mkdir, rename
+from os import path, listdir, mkdir, rename, cpu_count
 from xml.etree.ElementTree import parse
 
-from gooey import Gooey, GooeyParser
 from numpy import NaN
-from pandas import ExcelWriter, DataFrame, read_excel, concat, set_option
+from pandas import ExcelWriter, DataFrame, concat, set_option
+from xlsxwriter import Workbook
+
+from fuzzy_dedupe import fuzzy_dedupe
+from input_cache import file_digest, read_excel_cached
+from input_schema import MMO_ORDERS, replace_values
+from instrument import finish_run, stage, start_run
+from mmo_ledger import DEFAULT_LEDGER, IngestLedger
+from mmo_xml_stream import OrderBuffer, iter_orders, iter_parsed, parse_files
+from normalize import normalize_frame
+from report_writer import FORMATS, write_frame, write_report
 
 now = datetime.now()
+XML_DIR = '//Xmf-server/duke/Inter Office Mail/MMO XML Orders/'
 
 # -------------- Class Definitions -----------------------
 
 
 class XmlImport:
-    def __init__(self, xml_dir):
+    def __init__(self, xml_dir, ledger=None):
         """
         Parses xml data received from Medical Mutual of Ohio online information request site.
+        :param ledger: optional mmo_ledger.IngestLedger, only new files and orders are parsed when given
         :rtype: object
         """
         # Initialization of variables
         self.xml_dir = xml_dir
+        self.ledger = ledger
+        self.run_id = None
         self.total_orders = []
         self.order = []
         self.df = DataFrame()
@@ -33,9 +45,27 @@ class XmlImport:
                             'PlanType': 'PlanType', 'MemberType': 'MemberType',
                             'WebtrendscampaignIDcode': 'WebtrendscampaignIDcode'}
 
-    def parse_xml(self):
+    def parse_xml(self, stream=False, workers=1):
         """
         Open XML File and convert orders into a Dataframe.
+        :param stream: parse incrementally with parse_xml_stream
+        :param workers: parse files in parallel with parse_xml_parallel when more than 1
+        (ledger imports always go through parse_xml_incremental)
+        """
+        with stage('parse xml') as s:
+            if self.ledger is not None:
+                self.parse_xml_incremental(workers)
+            elif workers > 1:
+                self.parse_xml_parallel(workers)
+            elif stream:
+                self.parse_xml_stream()
+            else:
+                self.parse_xml_tree()
+            s.rows_out = len(self.df.index)
+
+    def parse_xml_tree(self):
+        """
+        Parse each XML file into a tree and look up every header tag per Order.
         """
         for filename in listdir(self.xml_dir):
             if not filename.endswith('.xml'):
@@ -57,49 +87,128 @@ class XmlImport:
         self.df = DataFrame(self.total_orders, columns=self.header_dict.values())
         self.df.insert(0, 'BRC_ID', value='')
 
-        # Check to see if files were processed, and if so, put them in a dated folder.
-        if not self.df.empty:
-            folder = f'{self.xml_dir}/XML {now:%m%d%y}'
+        self.archive_xml()
+
+    def parse_xml_stream(self):
+        """
+        Incrementally parse XML files into a columnar buffer, clearing each Order once it is read.
+        All header tags are resolved in a single pass per Order, so memory stays flat
+        regardless of how many orders are in the folder.
+        """
+        buffer = OrderBuffer(self.header_dict)
+        for filename in listdir(self.xml_dir):
+            if not filename.endswith('.xml'):
+                continue
+            for values in iter_orders(path.join(self.xml_dir, filename), self.header_dict):
+                buffer.add(values)
+
+        self.df = buffer.to_frame()
+        self.df.insert(0, 'BRC_ID', value='')
+        self.archive_xml()
+
+    def parse_xml_parallel(self, workers):
+        """
+        Parse XML files across a pool of worker processes. Rows are merged in filename order,
+        and only files that parsed successfully are archived.
+        :param workers: number of worker processes
+        """
+        filenames = [path.join(self.xml_dir, f) for f in listdir(self.xml_dir) if f.endswith('.xml')]
+        buffer, parsed = parse_files(filenames, self.header_dict, workers)
+
+        self.df = buffer.to_frame()
+        self.df.insert(0, 'BRC_ID', value='')
+        self.archive_xml([path.basename(f) for f in parsed])
+
+    def parse_xml_incremental(self, workers=1):
+        """
+        Parse only files and orders that are not already in the ledger. Files already in the ledger
+        are archived without being parsed, so reruns after a crash are cheap and idempotent.
+        :param workers: number of worker processes
+        """
+        self.run_id = self.ledger.start_run()
+        buffer = OrderBuffer(self.header_dict)
+        archive = []
+        digests = {}
+        for f in sorted(listdir(self.xml_dir)):
+            if not f.endswith('.xml'):
+                continue
+            digest = file_digest(path.join(self.xml_dir, f))
+            if self.ledger.has_file(digest):
+                archive.append(f)
+            else:
+                digests[path.join(self.xml_dir, f)] = digest
+
+        for filename, data in iter_parsed(list(digests), list(self.header_dict), workers):
+            if data is None:
+                continue
+            buffer.extend(self.ledger.record_file(self.run_id, filename, digests[filename], data))
+            archive.append(path.basename(filename))
+
+        self.df = buffer.to_frame()
+        self.df.insert(0, 'BRC_ID', value='')
+        if archive:
+            self.archive_xml(archive, force=True)
+
+    def archive_xml(self, filenames=None, force=False):
+        """
+        Check to see if files were processed, and if so, put them in a dated folder.
+        :param filenames: only archive these files (defaults to every .xml file in xml_dir)
+        :param force: archive even when no new orders were found
+        """
+        if force or not self.df.empty:
+            # Today's date rather than the import time, for long-running services (mmo_watch)
+            folder = f'{self.xml_dir}/XML {datetime.now():%m%d%y}'
             if not path.exists(folder):
                 mkdir(folder)
-            for f in listdir(self.xml_dir):
-                if f.endswith('.xml'):
-                    rename(f'{self.xml_dir}/{f}', f'{folder}/{f}')
+            if filenames is None:
+                filenames = [f for f in listdir(self.xml_dir) if f.endswith('.xml')]
+            for f in filenames:
+                rename(f'{self.xml_dir}/{f}', f'{folder}/{f}')
 
     def xml_to_xlsx(self):
         """
         Convert xml file into a spreadsheet.
         """
         if not self.df.empty:
-            xml_filename = f'MMO_XML_ORDER {now:%m-%d-%Y}.xlsx'
-            writer = ExcelWriter(xml_filename, engine='xlsxwriter')
-            self.df.to_excel(writer, sheet_name='Sheet1', startrow=1, header=False, index=False)
-            ws = writer.sheets['Sheet1']
-            ws.set_column('A:R', 18)
-            rows = int(len(self.df.index))
-            table_headers = []
-            for idx, val in enumerate(self.df.columns.values):
-                table_headers.append(dict(header=val))
-            ws.add_table(0, 0, rows, 17,
-                         {'columns': table_headers})
-            writer.save()
+            with stage('write xml orders', rows_in=len(self.df.index)):
+                write_report(self.df, f'MMO_XML_ORDER {now:%m-%d-%Y}.xlsx', column_width=18, table=True)
 
 
 class ProcessFile:
-    def __init__(self, frame):
-        set_option('precision', 0)
-        self.df = frame
+    def __init__(self, frame, fuzzy=False, output_format=None, plan_year=None, output=True):
+        """
+        :param frame: DataFrame of orders
+        :param fuzzy: also remove fuzzy name/address duplicates and output the match clusters
+        :param output_format: 'csv' or 'parquet' to write the lists without Excel, None for .xlsx
+        :param plan_year: plan year of orders without one, defaults to the current year
+        :param output: write the plan year list, False to only clean the orders (see mmo_watch)
+        """
+        set_option('display.precision', 0)
+        self.plan_year = str(plan_year or datetime.now().year)
+        # Low-cardinality columns as categoricals, other text as compact strings
+        self.df = MMO_ORDERS.apply(frame)
         self.updates = {}
+        self.fuzzy = fuzzy
+        self.output_format = output_format
+        self.clusters = DataFrame()
 
         # Find and remove empty data
-        self.df.replace(' ', NaN, inplace=True)
-        self.df.dropna(subset=['Full Name', 'Address'], inplace=True)
+        with stage('drop empty', rows_in=len(self.df.index)) as s:
+            replace_values(self.df, {column: {' ': NaN} for column in self.df.columns})
+            self.df.dropna(subset=['Full Name', 'Address'], inplace=True)
+            s.rows_out = len(self.df.index)
 
         # Process data
-        self.update()
-        self.remove_dupes()
-        self.output_single_year()
-        # self.separate_by_year()
+        with stage('update', rows_in=len(self.df.index)):
+            self.update()
+        with stage('remove dupes', rows_in=len(self.df.index)) as s:
+            self.remove_dupes()
+            s.rows_out = len(self.df.index)
+        if self.fuzzy:
+            self.output_clusters()
+        if output:
+            with stage('output lists', rows_in=len(self.df.index)):
+                self.separate_by_year()
 
     def update(self):
         """
@@ -125,11 +234,10 @@ class ProcessFile:
                                            'Region 2': '2',
                                            NaN: '2',
                                            '': '2'},
-                        # 'PlanYear': {NaN: str(datetime.now().year), '': str(datetime.now().year)},
-                        'PlanYear': {NaN: '2020', '': '2020', '2019': '2020'}
+                        'PlanYear': {NaN: self.plan_year, '': self.plan_year}
                         }
 
-        self.df.replace(self.updates, inplace=True)
+        replace_values(self.df, self.updates)
 
     def remove_dupes(self):
         """
@@ -137,84 +245,82 @@ class ProcessFile:
         Reset index and sort by 'Product Code'
         :return: N/A
         """
+        # Normalize names/addresses and remove test records
         fix_cols = ['Full Name', 'Address', 'City']
-        self.df[fix_cols] = self.df[fix_cols].applymap(lambda x: x.title())
-        self.df[fix_cols] = self.df[fix_cols].applymap(lambda x: re.sub(' +', ' ', x))
+        self.df = normalize_frame(self.df, fix_cols, test_column='Full Name')
         self.df.drop_duplicates(subset=['Full Name', 'Address'], inplace=True)
 
-        # Remove test records
-        self.df = self.df[~self.df['Full Name'].str.lower().str.contains('test')]
+        # Optionally catch near duplicates ('123 Main St' vs '123 Main Street', 'Apt 4' vs '#4')
+        if self.fuzzy:
+            self.df, self.clusters = fuzzy_dedupe(self.df)
 
         # Start the index at 1 and sort by 'Product Code'
         self.df.reset_index(drop=True, inplace=True)
         self.df.index += 1
         self.df = self.df.sort_values(by='Product Code')
 
-    def output_single_year(self):
-        writer = ExcelWriter(str(self.df.iloc[0]['PlanYear']) + ' list.xlsx')
-        self.df.to_excel(writer, index=False, header=True)
-        ws = writer.sheets['Sheet1']
-        # rows = int(len(df_list[idx].index))
-        self.df.columns = map(str.upper, self.df.columns)
-        ws.write_row(0, 0, self.df.columns.values)
-        writer.save()
+    def output_clusters(self):
+        """
+        Output fuzzy match clusters for review. 'Kept' marks the record that stays on the list.
+        :return: N/A
+        """
+        if not self.clusters.empty:
+            writer = ExcelWriter(f'MMO Fuzzy Matches {now:%m-%d-%Y}.xlsx')
+            self.clusters.to_excel(writer, index=False, header=True)
+            writer.save()
 
     def separate_by_year(self):
         """
-        Split DataFrame into 2 output files, grouped by 'PlanYear'
+        Split DataFrame into one output file per 'PlanYear'
         :return:
         """
-        df_dict = dict(tuple(self.df.groupby(['PlanYear'])))
-        df_list = [df_dict[x] for x in df_dict]
-        for idx, frame in enumerate(df_list):
-            writer = ExcelWriter(str(df_list[idx].iloc[0]['PlanYear']) + ' list.xlsx')
-            df_list[idx].to_excel(writer, index=False, header=True)
-            ws = writer.sheets['Sheet1']
-            # rows = int(len(df_list[idx].index))
-            df_list[idx].columns = map(str.upper, df_list[idx].columns)
-            ws.write_row(0, 0, df_list[idx].columns.values)
-            writer.save()
+        header = [c.upper() for c in self.df.columns]
+        for year, frame in self.df.groupby('PlanYear', observed=True):
+            write_report(frame, f'{year} list.xlsx', self.output_format, header=header)
 
 
 # -------------- Functions ---------------------------
 
 def output_contact_dnc(contact_df, dnc_df):
     filename = f'MMO CONTACT & DO NOT MAIL {now:%m-%d-%Y}.xlsx'
-    writer = ExcelWriter(filename, engine='xlsxwriter')
-    contact_df.to_excel(writer, sheet_name='Sheet1', startrow=2, header=False, index=False)
-    ws = writer.sheets['Sheet1']
-    ws.set_column('A:H', 20)
-    ws.write('A1', f'{now:%m/%d/%Y}')
-    contact_df.columns = map(str.upper, contact_df.columns)
-    ws.write_row('A2', list(contact_df.columns.values))
-    if not dnc_df.empty:
-        dnc_row = len(contact_df.index) + 4
-        ws.write(dnc_row, 0, 'DO NOT MAIL')
-        dnc_df.to_excel(writer, sheet_name='Sheet1', startrow=dnc_row + 1, header=False, index=False)
-    contact_df.columns = map(str.title, contact_df.columns)
-    writer.save()
-
-
-@Gooey
-def main():
-    parser = GooeyParser()
-    parser.add_argument('-Data_File',
-                        help="Select data entry file",
-                        widget="FileChooser")
-    args = parser.parse_args()
-
-    # Process XML file
-    xml_dir = '//Xmf-server/duke/Inter Office Mail/MMO XML Orders/'
-    mmo_xml = XmlImport(xml_dir)
-    mmo_xml.parse_xml()
+    with Workbook(filename, {'constant_memory': True}) as wb:
+        ws = wb.add_worksheet('Sheet1')
+        ws.set_column('A:H', 20)
+        ws.write('A1', f'{now:%m/%d/%Y}')
+        row = write_frame(ws, contact_df, start_row=1, header=[c.upper() for c in contact_df.columns])
+        if not dnc_df.empty:
+            dnc_row = row + 2
+            ws.write(dnc_row, 0, 'DO NOT MAIL')
+            write_frame(ws, dnc_df, start_row=dnc_row + 1, header=False)
+
+
+def process_orders(xml_dir=XML_DIR, data_file=None, workers=None, fuzzy=False, ledger_path=DEFAULT_LEDGER,
+                   output_format='xlsx', plan_year=None):
+    """
+    Import the new MMO orders, add the data entry file and write the plan year list to the current directory.
+    :param xml_dir: folder the MMO order files are dropped in
+    :param data_file: optional data entry workbook with a STATUS column (CONTACT, DNC or LIST)
+    :param workers: XML parse processes, defaults to the number of CPUs
+    :param fuzzy: also remove near duplicate names/addresses and output the match clusters
+    :param ledger_path: ingest ledger location
+    :param output_format: 'xlsx', 'csv' or 'parquet'
+    :param plan_year: plan year of orders without one, defaults to the current year
+    :return ProcessFile:
+    """
+    # Process XML file, skipping files and orders already in the ledger
+    ledger = IngestLedger(ledger_path)
+    mmo_xml = XmlImport(xml_dir, ledger)
+    mmo_xml.parse_xml(stream=True, workers=workers or cpu_count())
     mmo_xml.xml_to_xlsx()
 
-    # Create main working DataFrame
-    mmo_df = mmo_xml.df
+    # Create main working DataFrame from every order since the last completed run
+    mmo_df = ledger.pending_orders(mmo_xml.header_dict.values())
 
     # Process Data Entry file if present
-    if args.Data_File:
-        data_entry_df = read_excel(args.Data_File, dtype=object)
+    if data_file:
+        with stage('read data entry') as s:
+            data_entry_df = read_excel_cached(data_file, dtype=object)
+            s.rows_out = len(data_entry_df.index)
         df_contact = data_entry_df.loc[data_entry_df['STATUS'] == 'CONTACT'].drop(columns=['STATUS']).reset_index(drop=True)
         df_dnc = data_entry_df.loc[data_entry_df['STATUS'] == 'DNC'].drop(columns=['STATUS']).reset_index(drop=True)
         df_data = data_entry_df.loc[data_entry_df['STATUS'] == 'LIST'].drop(columns=['STATUS']).reset_index(drop=True)
@@ -226,8 +332,51 @@ def main():
         mmo_df = concat([mmo_df, df_contact, df_data],
                         ignore_index=True, sort=False).drop(columns=['Check Box']).fillna('')
 
-    job = ProcessFile(mmo_df)
+    job = ProcessFile(mmo_df, fuzzy=fuzzy, output_format=output_format, plan_year=plan_year)
+    ledger.complete_run(mmo_xml.run_id)
+    ledger.close()
+    return job
+
+
+def main():
+    # Imported here so the pipeline above can run headless (duke.py) without Gooey installed.
+    from gooey import GooeyParser
+
+    parser = GooeyParser()
+    parser.add_argument('-Data_File',
+                        help="Select data entry file",
+                        widget="FileChooser")
+    parser.add_argument('-Workers',
+                        help="Number of processes used to parse XML orders",
+                        type=int,
+                        default=cpu_count())
+    parser.add_argument('-Fuzzy_Dedupe',
+                        help="Also remove near duplicate names/addresses and output the match clusters",
+                        action="store_true")
+    parser.add_argument('-Ledger',
+                        help="Ledger of XML files and orders already processed",
+                        widget="FileSaver",
+                        default=DEFAULT_LEDGER)
+    parser.add_argument('-Output_Format',
+                        help="Write the plan year lists as Excel, CSV or Parquet",
+                        choices=FORMATS,
+                        default='xlsx')
+    parser.add_argument('-Plan_Year',
+                        help="Plan year of orders without one (default: the current year)")
+    parser.add_argument('-Run_Report',
+                        help="Save stage timings, row counts and peak memory as a JSON report",
+                        action="store_true")
+    parser.add_argument('-Profile',
+                        help="Also save cProfile stats of the run",
+                        action="store_true")
+    args = parser.parse_args()
+    start_run('MMO Process Data', enabled=args.Run_Report or args.Profile or None,
+              profile=args.Profile or None)
+    process_orders(XML_DIR, args.Data_File, args.Workers, args.Fuzzy_Dedupe, args.Ledger, args.Output_Format,
+                   args.Plan_Year)
+    finish_run()
 
 
 if __name__ == '__main__':
-    main()
+    from gooey import Gooey
+    Gooey(main)()
@@ -0,0 +1,134 @@
+# Python 3.7.2
+""" Table driven MMO fulfillment rates, keyed by product code, order type and effective date. """
+from numpy import array, isnan, nan
+from pandas import DataFrame, read_csv, to_datetime
+
+# Package Postage Cost
+PEK: float = 8.30
+MAG: float = 1.84
+OSB: float = 2.05
+OSB_PRS: float = 2.68
+UMG: float = 1.84
+
+# Reply Envelope Postage
+BRE: float = 0.64
+# Data Entry Charge
+DATA: float = 0.20
+# Fulfillment Charge
+CHARGE: float = 0.52
+
+ANY = '*'
+EFFECTIVE = '2020-01-01'
+KEY_COLUMNS = ['Product Code', 'Order Type', 'Effective']
+CHARGE_COLUMNS = ['Postage In', 'Postage Out', 'Data Entry', 'Fulfillment Charge']
+
+# A blank charge is left to the less specific rows: the exact product and order type is used first,
+# then the product for any order type, then the order type for any product, then the '*' '*' default.
+DEFAULT_RATES = DataFrame([[ANY, ANY, EFFECTIVE, 0, 0, 0, CHARGE],
+                           [ANY, 'BRE', EFFECTIVE, BRE, nan, DATA, nan],
+                           ['PEK', ANY, EFFECTIVE, nan, PEK, nan, nan],
+                           ['MMO MAG', ANY, EFFECTIVE, nan, MAG, nan, nan],
+                           ['MMO OSB', ANY, EFFECTIVE, nan, OSB, nan, nan],
+                           ['MMO OSB PROSPECT', ANY, EFFECTIVE, nan, OSB_PRS, nan, nan],
+                           ['UMG', ANY, EFFECTIVE, nan, UMG, nan, nan]],
+                          columns=KEY_COLUMNS + CHARGE_COLUMNS)
+
+
+class RateTable:
+    def __init__(self, rates=None):
+        """
+        Fulfillment charges by product code, order type and effective date.
+        :param rates: DataFrame of KEY_COLUMNS and CHARGE_COLUMNS ('*' matches any product code or
+                      order type, 'Effective' as YYYY-MM-DD), DEFAULT_RATES when None
+        """
+        self.rates = DEFAULT_RATES if rates is None else rates
+        self.rates = self.rates.assign(Effective=self.rates['Effective'].astype(str).str[:10])
+
+    @classmethod
+    def from_csv(cls, filename):
+        """
+        Rate table from a .csv with the KEY_COLUMNS and CHARGE_COLUMNS headers, e.g. per client.
+        :param filename: rate table (.csv)
+        :return RateTable:
+        """
+        return cls(read_csv(filename, dtype={'Product Code': str, 'Order Type': str, 'Effective': str}))
+
+    def effective(self, as_of=None):
+        """
+        Latest non-blank charge of each product code and order type as of a date.
+        :param as_of: pricing date, defaults to today
+        :return DataFrame: CHARGE_COLUMNS indexed by (Product Code, Order Type)
+        """
+        as_of = to_datetime(as_of or 'today').strftime('%Y-%m-%d')
+        table = self.rates.loc[self.rates['Effective'] <= as_of].sort_values('Effective', kind='mergesort')
+        if table.empty:
+            raise ValueError(f'No rates in effect on {as_of}, the earliest are effective '
+                             f'{self.rates["Effective"].min()}')
+        # last() skips blanks, so a newer row only replaces the charges it fills in.
+        return table.groupby(['Product Code', 'Order Type'])[CHARGE_COLUMNS].last()
+
+    @staticmethod
+    def lookup(effective, product_code, order_type):
+        """
+        Charges of a single product code and order type.
+        :param effective: {(Product Code, Order Type): charges} from RateTable.effective
+        :param product_code: product code, None when missing
+        :param order_type: order type, None when missing
+        :return list: CHARGE_COLUMNS values, NaN when no rate row applies
+        """
+        keys = [(product_code, order_type), (product_code, ANY), (ANY, order_type), (ANY, ANY)]
+        rows = [effective[k] for k in keys if None not in k and k in effective]
+        if not rows:
+            return [nan] * len(CHARGE_COLUMNS)
+        charges = []
+        for idx in range(len(CHARGE_COLUMNS)):
+            values = (row[idx] for row in rows)
+            charges.append(float(next((v for v in values if v == v), 0.0)))  # v == v skips NaN
+        return charges
+
+    def charges(self, product_code=None, order_type=None, as_of=None):
+        """
+        Charges of a single product code and/or order type, e.g. the BRE postage of junk mail.
+        :param product_code: product code, None for any
+        :param order_type: order type, None for any
+        :param as_of: pricing date, defaults to today
+        :return dict: {charge column: amount}
+        """
+        effective = self.effective(as_of)
+        effective = dict(zip(effective.index, effective.values.tolist()))
+        return dict(zip(CHARGE_COLUMNS, self.lookup(effective, product_code, order_type)))
+
+    def price(self, df, product_column='PRODUCT CODE', order_type_column='ORDER TYPE', as_of=None):
+        """
+        Price every order with one lookup: each product code and order type pair is resolved once,
+        then indexed by the rows' categorical codes.
+        :param df: orders
+        :param product_column: product code column
+        :param order_type_column: order type column
+        :param as_of: pricing date, defaults to today
+        :return DataFrame: CHARGE_COLUMNS and 'TTL', on the index of df
+        :raises ValueError: when no rate is in effect on as_of, or an order matches no rate row
+        """
+        effective = self.effective(as_of)
+        effective = dict(zip(effective.index, effective.values.tolist()))
+        products = df[product_column].astype('category').cat
+        order_types = df[order_type_column].astype('category').cat
+
+        # Codes of -1 (missing values) index the trailing None.
+        product_values = list(products.categories) + [None]
+        order_type_values = list(order_types.categories) + [None]
+        matrix = array([[self.lookup(effective, p, t) for t in order_type_values] for p in product_values])
+        charges = matrix[products.codes.values, order_types.codes.values]
+        unpriced = isnan(charges[:, 0])
+        if unpriced.any():
+            row = df.loc[unpriced, [product_column, order_type_column]].iloc[0]
+            raise ValueError(f'No rate for product code {row[product_column]!r}, order type '
+                             f'{row[order_type_column]!r} ({unpriced.sum()} orders) and no default rate')
+
+        priced = DataFrame(charges, index=df.index, columns=CHARGE_COLUMNS)
+        priced['TTL'] = (priced['Postage In'] + priced['Postage Out'] +
+                         priced['Data Entry'] + priced['Fulfillment Charge'])
+        return priced
+
+
+RATES = RateTable()
@@ -0,0 +1,214 @@
+# Python 3.7.2
+"""
+Long-running MMO order service: watch the XML drop folder and process new order files in small batches
+instead of once a day. Each batch goes through XmlImport (skipping files and orders already in the ingest
+ledger) and ProcessFile, drops names/addresses already written to today's lists, and appends to rolling
+'<plan year> list <date>.csv' files. Folder events come from watchdog when it is installed; network shares
+that don't report events (or --polling) fall back to listing the folder every poll interval.
+"""
+from argparse import ArgumentParser
+from datetime import date, datetime
+from os import listdir, path, stat
+from threading import Event
+from time import time
+from traceback import print_exc
+
+from pandas import Series
+
+from mmo_ledger import DEFAULT_LEDGER, IngestLedger, order_key
+from mmo_process_data import XML_DIR, ProcessFile, XmlImport
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # Polling only
+    FileSystemEventHandler = Observer = None
+
+WINDOW = 60  # Seconds from the first new file to the batch, so files dropped together are processed together.
+POLL = 10  # Seconds between folder listings.
+SETTLE = 5  # Seconds the folder must be unchanged, so files still being copied aren't read.
+
+
+class DropFolder:
+    def __init__(self, xml_dir, events=True):
+        """
+        Order files in the drop folder, with a wake up on folder events when watchdog is available.
+        :param xml_dir: MMO XML Orders drop folder
+        :param events: use folder events, False to only poll
+        """
+        self.xml_dir = xml_dir
+        self.changed = Event()
+        self.observer = None
+        if events and Observer is not None:
+            handler = FileSystemEventHandler()
+            handler.on_any_event = lambda event: self.changed.set()
+            self.observer = Observer()
+            self.observer.schedule(handler, xml_dir)
+            self.observer.start()
+
+    def wait(self, timeout):
+        """ Wait for a folder event, or timeout seconds when polling. """
+        self.changed.wait(timeout)
+        self.changed.clear()
+
+    def snapshot(self):
+        """
+        :return dict: {file name: (size, modification time)} of the .xml files
+        """
+        files = {}
+        for f in listdir(self.xml_dir):
+            if not f.endswith('.xml'):
+                continue
+            try:
+                info = stat(path.join(self.xml_dir, f))
+            except FileNotFoundError:  # Archived or renamed since the listing
+                continue
+            files[f] = (info.st_size, info.st_mtime_ns)
+        return files
+
+    def close(self):
+        if self.observer is not None:
+            self.observer.stop()
+            self.observer.join()
+
+
+def append_csv(df, filename):
+    """ Append rows to a rolling .csv, writing the upper case header when the file is created. """
+    df.to_csv(filename, mode='a', index=False, header=[c.upper() for c in df.columns] if not path.exists(filename)
+              else False)
+
+
+class OrderWatcher:
+    def __init__(self, xml_dir=XML_DIR, output_dir=None, ledger_path=DEFAULT_LEDGER, window=WINDOW, poll=POLL,
+                 settle=SETTLE, workers=1, fuzzy=False, plan_year=None, events=True):
+        """
+        :param xml_dir: MMO XML Orders drop folder
+        :param output_dir: folder of the rolling lists, defaults to the current directory
+        :param ledger_path: ingest ledger location, shared with mmo_process_data
+        :param window: seconds from the first new file to processing the batch
+        :param poll: seconds between folder listings
+        :param settle: seconds the folder must be unchanged before a batch is read
+        :param workers: XML parse processes
+        :param fuzzy: also remove near duplicate names/addresses within each batch
+        :param plan_year: plan year of orders without one, defaults to the current year
+        :param events: use folder events when watchdog is installed, False to only poll
+        """
+        self.xml_dir = xml_dir
+        self.output_dir = output_dir or '.'
+        self.window = window
+        self.poll = poll
+        self.settle = settle
+        self.workers = workers
+        self.fuzzy = fuzzy
+        self.plan_year = plan_year
+        self.folder = DropFolder(xml_dir, events)
+        self.ledger = IngestLedger(ledger_path)
+
+    def run(self, once=False):
+        """
+        Process batches until interrupted. A batch that fails is retried window seconds later.
+        :param once: process the files already in the folder (once they are settled) and return
+        """
+        first_seen = retry_at = None
+        previous, changed_at = None, time()
+        try:
+            while True:
+                snapshot = self.folder.snapshot()
+                now = time()
+                if snapshot != previous:
+                    previous, changed_at = snapshot, now
+                if snapshot:
+                    first_seen = first_seen or now
+                elif once:
+                    return
+                else:
+                    first_seen = None
+                due = first_seen is not None and (once or now - first_seen >= self.window)
+                # A failed batch's files are already archived, so it is retried with the folder empty: its run
+                # isn't completed and the retry picks up its orders from the ledger.
+                retry = retry_at is not None and now >= retry_at
+                if (due or retry) and now - changed_at >= self.settle:
+                    try:
+                        self.process_batch(sorted(snapshot))
+                        retry_at = None
+                    except Exception:
+                        if once:
+                            raise
+                        retry_at = now + self.window
+                        print(f'{datetime.now():%H:%M:%S} batch of {len(snapshot)} files failed, retrying '
+                              f'in {self.window:g}s')
+                        print_exc()
+                    first_seen = None
+                    if once:
+                        return
+                self.folder.wait(self.poll)
+        finally:
+            self.close()
+
+    def process_batch(self, filenames):
+        """
+        Import the new orders and append the ones not already on today's lists. Orders and list records are
+        keyed in the ledger as they are written, so replaying a batch that crashed doesn't write them twice.
+        :param filenames: order files in the batch (for the log line)
+        :return int: records appended
+        """
+        day = date.today()
+        xml = XmlImport(self.xml_dir, self.ledger)
+        xml.parse_xml(stream=True, workers=self.workers)
+
+        # Every order since the last completed batch, so orders of a batch that crashed are picked up again.
+        orders = self.ledger.pending_orders(xml.header_dict.values())
+        if orders.empty:
+            self.ledger.complete_run(xml.run_id)
+            return 0
+
+        # ProcessFile converts the frame it is given in place; the raw orders are written as received.
+        df = ProcessFile(orders.copy(), fuzzy=self.fuzzy, plan_year=self.plan_year, output=False).df
+        keys = Series([order_key(values) for values in zip(df['Full Name'], df['Address'])], index=df.index)
+        new = ~keys.isin(self.ledger.emitted_keys(day.isoformat()))
+        df = df.loc[new]
+        for year, frame in df.groupby('PlanYear', observed=True):
+            append_csv(frame, path.join(self.output_dir, f'{year} list {day:%m-%d-%Y}.csv'))
+        self.ledger.record_emitted(day.isoformat(), keys[new])
+
+        order_keys = Series([order_key(values) for values in orders.drop(columns='BRC_ID').values.tolist()],
+                            index=orders.index)
+        written = order_keys.isin(self.ledger.emitted_keys(f'{day.isoformat()} orders'))
+        append_csv(orders.loc[~written], path.join(self.output_dir, f'MMO_XML_ORDER {day:%m-%d-%Y}.csv'))
+        self.ledger.record_emitted(f'{day.isoformat()} orders', order_keys[~written])
+        self.ledger.complete_run(xml.run_id)
+        print(f'{datetime.now():%H:%M:%S} {len(filenames)} files, {len(orders.index)} orders, '
+              f'{len(df.index)} added to the {day:%m-%d-%Y} lists')
+        return len(df.index)
+
+    def close(self):
+        self.folder.close()
+        self.ledger.close()
+
+
+def main():
+    parser = ArgumentParser(description='Watch the MMO XML drop folder and process new orders as they arrive')
+    parser.add_argument('xml_dir', nargs='?', default=XML_DIR, help='MMO XML Orders drop folder')
+    parser.add_argument('--output-dir', help='Folder of the rolling plan year lists (default: current directory)')
+    parser.add_argument('--ledger', default=DEFAULT_LEDGER, help='Ingest ledger location')
+    parser.add_argument('--window', type=float, default=WINDOW, help='Seconds to collect files into one batch')
+    parser.add_argument('--poll', type=float, default=POLL, help='Seconds between folder listings')
+    parser.add_argument('--settle', type=float, default=SETTLE,
+                        help='Seconds the folder must be unchanged before files are read')
+    parser.add_argument('--workers', type=int, default=1, help='XML parse processes')
+    parser.add_argument('--fuzzy', action='store_true', help='Also remove near duplicate names/addresses')
+    parser.add_argument('--plan-year', help='Plan year of orders without one (default: the current year)')
+    parser.add_argument('--polling', action='store_true', help='Poll only, without folder events')
+    parser.add_argument('--once', action='store_true', help='Process the files in the folder and exit')
+    args = parser.parse_args()
+
+    watcher = OrderWatcher(args.xml_dir, args.output_dir, args.ledger, args.window, args.poll, args.settle,
+                           args.workers, args.fuzzy, args.plan_year, events=not args.polling)
+    try:
+        watcher.run(once=args.once)
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# Python 3.7.2
+""" Streaming helpers for parsing Medical Mutual of Ohio XML order files. """
+from concurrent.futures import ProcessPoolExecutor
+from os import path
+from xml.etree.ElementTree import iterparse, ParseError
+
+from pandas import DataFrame
+
+
+class OrderBuffer:
+    def __init__(self, header_dict):
+        """
+        Columnar buffer of parsed orders. One list per output column instead of one list per order.
+        :param header_dict: XML tag to column name mapping (XmlImport.header_dict)
+        """
+        self.columns = list(header_dict.values())
+        self.data = [[] for _ in self.columns]
+
+    def __len__(self):
+        return len(self.data[0]) if self.data else 0
+
+    def add(self, values):
+        """
+        Add a single order to the buffer.
+        :param values: tag values in header_dict order
+        """
+        for column, value in zip(self.data, values):
+            column.append(value)
+
+    def extend(self, data):
+        """
+        Append every order from a list of column lists (see parse_file) to the buffer.
+        :param data: column lists in header_dict order
+        """
+        for column, values in zip(self.data, data):
+            column.extend(values)
+
+    def to_frame(self):
+        """
+        Convert the buffer into a DataFrame with header_dict column names.
+        :return DataFrame:
+        """
+        return DataFrame(dict(zip(self.columns, self.data)), columns=self.columns)
+
+
+def iter_orders(filename, tags):
+    """
+    Incrementally parse an XML file and yield the header values of each Order.
+    Every tag is resolved in a single pass over the Order, taking the first matching descendant
+    the same way Element.find('.//tag') does. Elements are cleared once the Order is read,
+    so memory stays flat regardless of the size of the file.
+    :param filename: path to XML file
+    :param tags: iterable of XML tags to collect, in output order
+    :return generator: tuple of tag text (None if the tag is missing) per Order
+    """
+    positions = {tag: idx for idx, tag in enumerate(tags)}
+    root = None
+    depth = 0
+    found = None
+    for event, elem in iterparse(filename, events=('start', 'end')):
+        if event == 'start':
+            if root is None:
+                root = elem
+            if elem.tag == 'Order':
+                depth += 1
+                if found is None:
+                    found = [None] * len(positions)
+            elif found is not None and elem.tag in positions and found[positions[elem.tag]] is None:
+                found[positions[elem.tag]] = elem
+            continue
+
+        if elem.tag == 'Order':
+            depth -= 1
+            if depth == 0:
+                yield tuple(None if match is None else match.text for match in found)
+                found = None
+                root.clear()
+
+
+def parse_file(filename, tags):
+    """
+    Parse a single XML file into column lists. Module level so it can run in a worker process.
+    :param filename: path to XML file
+    :param tags: list of XML tags to collect, in output order
+    :return list: one list of values per tag
+    """
+    data = [[] for _ in tags]
+    for values in iter_orders(filename, tags):
+        for column, value in zip(data, values):
+            column.append(value)
+    return data
+
+
+def iter_parsed(filenames, tags, workers=None):
+    """
+    Parse XML files across a pool of worker processes, yielding results in the order given.
+    Files that fail to parse are reported and yielded with None in place of their data.
+    :param filenames: list of XML file paths
+    :param tags: list of XML tags to collect, in output order
+    :param workers: number of worker processes (defaults to the number of CPUs)
+    :return generator: (filename, column lists or None) per file
+    """
+    if workers == 1:
+        for filename in filenames:
+            try:
+                data = parse_file(filename, tags)
+            except (ParseError, OSError):
+                print(f'Unable to process {path.basename(filename)}')
+                data = None
+            yield filename, data
+        return
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(parse_file, filename, tags) for filename in filenames]
+        for filename, future in zip(filenames, futures):
+            try:
+                data = future.result()
+            except (ParseError, OSError):
+                print(f'Unable to process {path.basename(filename)}')
+                data = None
+            yield filename, data
+
+
+def parse_files(filenames, header_dict, workers=None):
+    """
+    Parse XML files across a pool of worker processes and merge the results in filename order.
+    Files that fail to parse are reported and left out of the buffer.
+    :param filenames: list of XML file paths
+    :param header_dict: XML tag to column name mapping (XmlImport.header_dict)
+    :param workers: number of worker processes (defaults to the number of CPUs)
+    :return tuple: (OrderBuffer, list of successfully parsed filenames)
+    """
+    buffer = OrderBuffer(header_dict)
+    parsed = []
+    for filename, data in iter_parsed(sorted(filenames), list(header_dict), workers):
+        if data is not None:
+            buffer.extend(data)
+            parsed.append(filename)
+    return buffer, parsed
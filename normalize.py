@@ -0,0 +1,92 @@
+# Python 3.7.2
+""" Vectorized name/address cleanup shared by the MMO and Anthem list scripts. """
+from numpy import nan
+from pandas import Series
+
+try:
+    import pyarrow
+    import pyarrow.compute as pc
+    from pandas.arrays import ArrowStringArray
+except ImportError:  # pandas string methods only
+    pyarrow = None
+
+
+def arrow_strings(series):
+    """
+    :param series: Series of text, object or STRING dtype
+    :return pyarrow.Array: the values as Arrow strings, None without pyarrow or when some values aren't text
+    """
+    if pyarrow is None:
+        return None
+    try:
+        return pyarrow.array(series, type=pyarrow.string(), from_pandas=True)
+    except (pyarrow.ArrowException, TypeError, ValueError):
+        return None
+
+
+def as_series(values, like):
+    """ Arrow strings back into a Series with the index, name and dtype (object or STRING) of like. """
+    if like.dtype == object:
+        result = Series(values.to_numpy(zero_copy_only=False), index=like.index, name=like.name)
+        return result.where(result.notna(), nan)
+    return Series(ArrowStringArray(pyarrow.chunked_array([values])), index=like.index, name=like.name)
+
+
+def clean_series(series):
+    """
+    Title case and collapse repeated spaces. With pyarrow this runs in Arrow compute kernels: pandas' str.title
+    goes through Python objects and str.replace(' +', ' ') through re for every value, which is where most of
+    the time went. Runs of spaces are halved with a plain substring replace until none are left, so values
+    without doubled spaces cost a single scan. Values that aren't strings become null.
+    :param series: Series of text
+    :return Series:
+    """
+    values = arrow_strings(series)
+    if values is None:
+        return series.str.title().str.replace(' +', ' ', regex=True)
+    values = pc.utf8_title(values)
+    while pc.any(pc.match_substring(values, '  ')).as_py():
+        values = pc.replace_substring(values, '  ', ' ')
+    return as_series(values, series)
+
+
+def normalize_columns(frame, columns):
+    """
+    Title case and collapse whitespace in each of the given columns.
+    :param frame: DataFrame
+    :param columns: list of column names
+    :return DataFrame:
+    """
+    for col in columns:
+        frame[col] = clean_series(frame[col])
+    return frame
+
+
+def test_record_mask(series, pattern='test'):
+    """
+    Case-insensitive substring check for test records.
+    :param series: Series to check, usually 'Full Name'
+    :param pattern: lower case text that marks a test record
+    :return Series: boolean mask, True for test records
+    """
+    values = arrow_strings(series)
+    if values is None:
+        return series.str.lower().str.contains(pattern, regex=False, na=False)
+    found = pc.fill_null(pc.match_substring(values, pattern, ignore_case=True), False)
+    return Series(found.to_numpy(zero_copy_only=False), index=series.index, name=series.name)
+
+
+def normalize_frame(frame, columns, test_column=None, pattern='test'):
+    """
+    Normalize name/address columns and remove test records.
+    :param frame: DataFrame
+    :param columns: list of columns to title case and trim
+    :param test_column: column checked for test records, None to keep every row
+    :param pattern: lower case text that marks a test record
+    :return DataFrame:
+    """
+    frame = normalize_columns(frame, columns)
+    if test_column is not None:
+        # A copy rather than a slice, so callers can keep changing the frame in place.
+        frame = frame.loc[~test_record_mask(frame[test_column], pattern)].copy()
+    return frame
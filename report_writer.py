@@ -0,0 +1,94 @@
+# Python 3.7.2
+""" Shared report output: row-streamed xlsxwriter workbooks, or CSV/Parquet when Excel isn't needed. """
+from os import path
+
+from xlsxwriter import Workbook
+
+CHUNK_SIZE = 10000
+FORMATS = ('xlsx', 'csv', 'parquet')
+
+
+def report_path(filename, output_format=None):
+    """
+    Swap the extension of filename for output_format.
+    :param filename: default output name, e.g. '2020 list.xlsx'
+    :param output_format: one of FORMATS, None to keep filename
+    :return str:
+    """
+    if not output_format:
+        return filename
+    return f'{path.splitext(filename)[0]}.{output_format}'
+
+
+def iter_rows(df, chunksize=CHUNK_SIZE):
+    """
+    Rows of a DataFrame as lists with missing values as None, converted a chunk at a time.
+    :param df: DataFrame
+    :param chunksize: rows converted at a time
+    :return generator:
+    """
+    for start in range(0, len(df.index), chunksize):
+        chunk = df.iloc[start:start + chunksize].astype(object)
+        yield from chunk.where(chunk.notna(), None).values.tolist()
+
+
+def write_frame(ws, df, start_row=0, start_col=0, header=True, header_format=None, cell_format=None):
+    """
+    Write the header once and then each row in order, as constant_memory mode requires.
+    :param ws: xlsxwriter worksheet
+    :param df: DataFrame
+    :param start_row: first row (header row when header is written)
+    :param start_col: first column
+    :param header: True for df.columns, a list of names, or False for no header row
+    :param header_format: xlsxwriter format of the header row
+    :param cell_format: xlsxwriter format of the data rows
+    :return int: row after the last row written
+    """
+    row = start_row
+    if header is not False:
+        ws.write_row(row, start_col, list(df.columns) if header is True else list(header), header_format)
+        row += 1
+    for values in iter_rows(df):
+        ws.write_row(row, start_col, values, cell_format)
+        row += 1
+    return row
+
+
+def write_report(df, filename, output_format=None, header=True, column_width=None, table=False,
+                 sheet_name='Sheet1'):
+    """
+    Write a DataFrame as a single sheet workbook streamed in constant_memory mode, or as CSV/Parquet.
+    :param df: DataFrame
+    :param filename: output name, its extension picks the format unless output_format is given
+    :param output_format: one of FORMATS
+    :param header: True for df.columns, a list of names (e.g. upper cased), or False for none
+    :param column_width: width of every column (xlsx)
+    :param table: format the data as an Excel table (xlsx, written without constant_memory
+                  because xlsxwriter can't add tables in that mode)
+    :param sheet_name: worksheet name (xlsx)
+    :return str: name of the file written
+    """
+    filename = report_path(filename, output_format)
+    names = list(df.columns) if header is True else header
+
+    if filename.endswith('.csv'):
+        df.to_csv(filename, index=False, header=names if names else False)
+        return filename
+    if filename.endswith('.parquet'):
+        out = df.copy(deep=False)
+        if names:
+            out.columns = names
+        out.to_parquet(filename, index=False)
+        return filename
+
+    with Workbook(filename, {'constant_memory': not table}) as wb:
+        ws = wb.add_worksheet(sheet_name)
+        if column_width:
+            ws.set_column(0, max(len(df.columns) - 1, 0), column_width)
+        if table:
+            ws.add_table(0, 0, len(df.index), len(df.columns) - 1,
+                         {'data': list(iter_rows(df)),
+                          'columns': [{'header': str(name)} for name in (names or df.columns)]})
+        else:
+            write_frame(ws, df, header=names if names else False)
+    return filename
@@ -0,0 +1,17 @@
+# Python 3.7.2
+"""
+The modules are scripts in the repository root, so the tests import them from there.
+Inputs are cached in a temporary folder instead of the user's input cache.
+"""
+import sys
+from os import path
+
+import pytest
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def input_cache_dir(tmp_path_factory, monkeypatch):
+    import input_cache
+    monkeypatch.setattr(input_cache, 'CACHE_DIR', str(tmp_path_factory.mktemp('input cache')))
@@ -0,0 +1,44 @@
+# Python 3.7.2
+from numpy import nan
+from pandas import Series
+
+from anthem_contracts import ContractResolver, reduce_unlisted
+
+GRID = ['H1234-001', 'H1234-001-GRP', 'H1234-001-GRP-SUB', 'H9999-002', 'H5555']
+
+
+def longest_prefix(contract, contracts, min_tier=2):
+    """ Reference: try every prefix of the contract, longest first. """
+    if not isinstance(contract, str):
+        return contract, 0
+    parts = contract.split('-')
+    for tier in range(len(parts), min_tier - 1, -1):
+        if '-'.join(parts[:tier]) in contracts:
+            return '-'.join(parts[:tier]), tier
+    return '-'.join(parts[:min_tier]), 0
+
+
+def test_resolve_matches_longest_prefix():
+    contracts = Series(['H1234-001-GRP-SUB-X', 'H1234-001-GRP-OTHER', 'H1234-001-GRP', 'H1234-001-ZZZ',
+                        'H9999-002-A-B-C-D', 'H7777-003-A', 'H5555', '', 42, 'H1234-001-GRP-SUB-X'],
+                       index=range(10, 20))
+    numbers, tiers = ContractResolver(GRID).resolve(contracts)
+    expected = [longest_prefix(c, set(GRID)) for c in contracts]
+    assert numbers.tolist() == [e[0] for e in expected]
+    assert tiers.tolist() == [e[1] for e in expected]
+    assert numbers.index.equals(contracts.index)
+    assert tiers.tolist()[:3] == [4, 3, 3]
+
+
+def test_missing_contracts_are_unmatched():
+    numbers, tiers = ContractResolver(GRID).resolve(Series([nan, 'H1234-001-Q', None]))
+    assert numbers.tolist() == [None, 'H1234-001', None]
+    assert tiers.tolist() == [0, 2, 0]
+    assert ContractResolver(GRID).resolve(Series([nan]))[1].tolist() == [0]
+
+
+def test_tier_counts_and_reduce_unlisted():
+    tiers = Series([4, 3, 3, 0, 2])
+    assert ContractResolver.tier_counts(tiers).to_dict() == {'Tier 4': 1, 'Tier 3': 2, 'Tier 2': 1, 'Unmatched': 1}
+    reduced = reduce_unlisted(Series(GRID[:3]), Series(['H1234-001-GRP']))
+    assert reduced.tolist() == ['H1234-001', 'H1234-001-GRP', 'H1234-001']
@@ -0,0 +1,64 @@
+# Python 3.7.2
+from os import makedirs
+
+from duke_jobs import JobFolderIndex
+
+
+def job_share(tmp_path, *names):
+    root = tmp_path / 'jobs'
+    for name in names:
+        makedirs(root / name)
+    return str(root)
+
+
+def test_index_is_built_on_first_lookup(tmp_path):
+    root = job_share(tmp_path, '12345678 Spring Mailer', '87654321 Fall Mailer')
+    cache_file = tmp_path / 'index.json'
+    index = JobFolderIndex(roots=[str(tmp_path / 'missing'), root], cache_file=str(cache_file))
+    assert not cache_file.exists()
+
+    assert index.find('12345678') == f'{root}/12345678 Spring Mailer'
+    assert index.find('00000000') is None
+    assert cache_file.exists()
+
+
+def test_cache_file_is_shared(tmp_path):
+    root = job_share(tmp_path, '12345678 Spring Mailer')
+    cache_file = str(tmp_path / 'index.json')
+    JobFolderIndex(roots=[root], cache_file=cache_file).find('12345678')
+
+    makedirs(tmp_path / 'jobs' / '87654321 Fall Mailer')
+    index = JobFolderIndex(roots=[root], cache_file=cache_file)
+    assert index.find('12345678') == f'{root}/12345678 Spring Mailer'
+    # The shared listing is younger than miss_ttl, so a miss doesn't list the share again.
+    assert index.find('87654321') is None
+    index.miss_ttl = -1
+    assert index.find('87654321') == f'{root}/87654321 Fall Mailer'
+
+
+def test_other_roots_ignore_cache(tmp_path):
+    root = job_share(tmp_path, '12345678 Spring Mailer')
+    cache_file = str(tmp_path / 'index.json')
+    JobFolderIndex(roots=[root], cache_file=cache_file).find('12345678')
+
+    other = JobFolderIndex(roots=[str(tmp_path / 'missing')], cache_file=cache_file)
+    assert other.find('12345678') is None
+
+
+def test_unreachable_share_is_not_listed_on_every_lookup(tmp_path, monkeypatch):
+    import duke_jobs
+    calls = []
+
+    def unreachable(root):
+        calls.append(root)
+        raise OSError(root)
+
+    monkeypatch.setattr(duke_jobs, 'listdir', unreachable)
+    index = JobFolderIndex(roots=['//offline/jobs', '/Volumes/OFFLINE'], cache_file=None)
+    assert index.find('12345678') is None
+    assert index.find('87654321') is None
+    assert calls == ['//offline/jobs', '/Volumes/OFFLINE']
+
+    index.miss_ttl = -1
+    assert index.find('12345678') is None
+    assert len(calls) == 4
@@ -0,0 +1,45 @@
+# Python 3.7.2
+from os import listdir
+
+import pytest
+from pandas import read_csv
+
+import duke_stream
+from duke_stream import best_record, clean_csv_stream
+
+ROWS = ['Key,Name,Pkg,Var,Empty',
+        '1,Ann,###,,',
+        '2, NA ,A,x,',
+        ',,,,',
+        '3,Bob,A,,']
+
+
+def write(tmp_path, rows):
+    src = tmp_path / 'list.csv'
+    src.write_text('\n'.join(rows) + '\n')
+    return str(src)
+
+
+def test_stream_matches_in_memory(tmp_path):
+    src = write(tmp_path, ROWS)
+    dst = str(tmp_path / 'clean.csv')
+    result = clean_csv_stream(src, dst, chunksize=2)
+    df = read_csv(dst, dtype=str, keep_default_na=False, na_values=[''])
+
+    assert result.record_count == 3
+    assert result.empty_columns == ['Empty']
+    assert list(df.columns) == ['Key', 'Name', 'Pkg', 'Var']
+    assert df['Name'].tolist() == ['Ann', 'NA', 'Bob']
+    assert result.record == ['2', 'NA', 'A', 'x'] == best_record(df)
+    assert sorted(listdir(tmp_path)) == ['clean.csv', 'list.csv']
+
+
+def test_stream_removes_temporary_file(tmp_path, monkeypatch):
+    def fail(*args):
+        raise RuntimeError('2nd pass')
+
+    monkeypatch.setattr(duke_stream, 'best_row', fail)
+    src = write(tmp_path, ROWS)
+    with pytest.raises(RuntimeError):
+        clean_csv_stream(src, str(tmp_path / 'clean.csv'))
+    assert 'clean.csv.tmp' not in listdir(tmp_path)
@@ -0,0 +1,57 @@
+# Python 3.7.2
+from pandas import DataFrame
+
+from fuzzy_dedupe import fuzzy_dedupe, similarity, standardize_address, standardize_name
+
+
+def records(*rows):
+    return DataFrame(rows, columns=['Full Name', 'Address', 'Zip'])
+
+
+def score(name1, addr1, name2, addr2):
+    return similarity(standardize_name(name1), standardize_address(addr1),
+                      standardize_name(name2), standardize_address(addr2))
+
+
+def test_standardize_name_keeps_suffix():
+    assert standardize_name('John Smith Jr.') == 'JOHN SMITH JR'
+    assert standardize_name('John Junior Smith') == 'JOHN SMITH JR'
+    assert standardize_name('Mary Smith') == 'MARY SMITH'
+
+
+def test_standardize_address_units():
+    assert standardize_address('123 Main Street Apt 4') == '123 MAIN ST #4'
+    assert standardize_address('123 Main St. #4') == '123 MAIN ST #4'
+
+
+def test_typos_match():
+    assert score('John Smith', '123 Main Street', 'John Smtih', '123 Main St') >= 0.88
+    assert score('J. Smith', '123 Main St Apt 4', 'John Smith', '123 Main St #4') >= 0.88
+
+
+def test_different_suffixes_never_match():
+    assert score('John Smith Jr', '123 Main St', 'John Smith Sr', '123 Main St') == 0
+    assert score('John Smith Jr', '123 Main St', 'John Smith', '123 Main St') == 0
+
+
+def test_different_first_names_never_match():
+    assert score('Mary Smith', '123 Main St', 'Mark Smith', '123 Main St') == 0
+    assert score('Jo Smith', '123 Main St', 'John Smith', '123 Main St') == 0
+
+
+def test_different_units_never_match():
+    assert score('John Smith', '123 Main St Apt 4', 'John Smith', '123 Main St Apt 5') == 0
+    assert score('John Smith', '123 Main St Apt 4', 'John Smith', '123 Main St') == 0
+
+
+def test_fuzzy_dedupe_keeps_distinct_people():
+    frame = records(('John Smith', '123 Main Street', '44101'),
+                    ('John Smith', '123 Main St.', '44101-1234'),
+                    ('John Smith Jr', '123 Main St', '44101'),
+                    ('Mary Smith', '123 Main St', '44101'),
+                    ('Mark Smith', '123 Main St', '44101'),
+                    ('John Smith', '123 Main St Apt 5', '44101'))
+    deduped, report = fuzzy_dedupe(frame)
+    assert list(deduped.index) == [0, 2, 3, 4, 5]
+    assert list(report.index) == [0, 1]
+    assert list(report['Kept']) == [True, False]
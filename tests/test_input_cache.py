@@ -0,0 +1,88 @@
+# Python 3.7.2
+from os import listdir
+
+import pytest
+from numpy import nan
+from pandas import DataFrame, Timestamp
+from pandas.testing import assert_frame_equal
+
+import anthem_grid as anthem_grid_module
+from anthem_grid import default_key_columns, load_branding_grid
+from bench_data import anthem_grid
+from input_cache import cached_frame, read_excel_cached
+from input_schema import MMO_ORDERS, STRING
+from report_writer import write_report
+
+
+def test_cached_frame_keeps_dtypes(tmp_path):
+    df = MMO_ORDERS.apply(DataFrame({'State': ['OH', nan, 'VA'], 'Full Name': ['Ann Lee', 'Bob Day', nan]}))
+    df['Address'] = ['1 Main St', nan, '']
+    builds = []
+
+    def build():
+        builds.append(1)
+        return df.copy()
+
+    first = cached_frame('orders', build, str(tmp_path))
+    second = cached_frame('orders', build, str(tmp_path))
+    assert len(builds) == 1
+    assert_frame_equal(second, first)
+    assert second['Full Name'].dtype == STRING
+    assert isinstance(second['Address'][1], float)  # NaN as read, not None
+    assert listdir(tmp_path) == ['orders.parquet']
+
+
+def test_mixed_columns_are_pickled(tmp_path):
+    df = DataFrame({'Status': [1, 'Done', Timestamp('2021-01-04')]}, dtype=object)
+    assert cached_frame('mixed', lambda: df, str(tmp_path)) is df
+    assert listdir(tmp_path) == ['mixed.pkl']
+    cached = cached_frame('mixed', lambda: None, str(tmp_path))
+    assert_frame_equal(cached, df)
+    assert cached['Status'].map(type).tolist() == [int, str, Timestamp]
+
+
+def test_read_excel_cached(tmp_path):
+    filename = write_report(DataFrame({'Zip': ['02108', '44101'], 'State': ['MA', 'OH']}),
+                            str(tmp_path / 'orders.xlsx'))
+    cache_dir = str(tmp_path / 'cache')
+    first = read_excel_cached(filename, cache_dir, dtype=STRING)
+    assert_frame_equal(read_excel_cached(filename, cache_dir, dtype=STRING), first)
+    assert first['Zip'].tolist() == ['02108', '44101']
+    assert len(listdir(cache_dir)) == 1
+
+
+def test_read_excel_cached_data_entry(tmp_path):
+    filename = write_report(DataFrame({'Zip': [44101, 'V6B 1A1'], 'STATUS': ['LIST', 'DNC']}),
+                            str(tmp_path / 'data entry.xlsx'))
+    cache_dir = str(tmp_path / 'cache')
+    first = read_excel_cached(filename, cache_dir, dtype=object)
+    assert_frame_equal(read_excel_cached(filename, cache_dir, dtype=object), first)
+    assert first['Zip'].tolist() == [44101, 'V6B 1A1']
+    assert [name[-4:] for name in listdir(cache_dir)] == ['.pkl']
+
+
+def test_branding_grid_cache(tmp_path):
+    filename = write_report(anthem_grid(contracts=50), str(tmp_path / 'Branding Grid.xlsx'))
+    cache_dir = str(tmp_path / 'cache')
+    expected = load_branding_grid(filename, cache_dir='')
+    assert_frame_equal(load_branding_grid(filename, cache_dir=cache_dir), expected)
+    assert_frame_equal(load_branding_grid(filename, cache_dir=cache_dir), expected)
+    assert len(listdir(cache_dir)) == 1
+
+
+def test_branding_grid_cache_key_has_loader_version(tmp_path, monkeypatch):
+    filename = write_report(anthem_grid(contracts=50), str(tmp_path / 'Branding Grid.xlsx'))
+    cache_dir = str(tmp_path / 'cache')
+    load_branding_grid(filename, cache_dir=cache_dir)
+    monkeypatch.setattr(anthem_grid_module, 'LOADER_VERSION', anthem_grid_module.LOADER_VERSION + 1)
+    load_branding_grid(filename, cache_dir=cache_dir)
+    assert len(listdir(cache_dir)) == 2
+
+
+def test_grid_without_pbp_column(tmp_path):
+    assert default_key_columns(['Cms Contract', '2022 Pbp', '2021 Pbp'])[:2] == ['Cms Contract', '2022 Pbp']
+    grid = anthem_grid(contracts=5)
+    grid = grid.rename(columns={c: 'PBP' for c in grid.columns if c.endswith('PBP')})
+    filename = write_report(grid, str(tmp_path / 'Branding Grid.xlsx'))
+    with pytest.raises(ValueError, match='Pbp'):
+        load_branding_grid(filename, cache_dir='')
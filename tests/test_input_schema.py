@@ -0,0 +1,46 @@
+# Python 3.7.2
+from numpy import nan
+from pandas import DataFrame
+from pandas.api.types import is_categorical_dtype
+from pandas.testing import assert_frame_equal
+
+from input_schema import MMO_ORDERS, replace_values
+
+
+def test_replace_values_matches_replace_on_text():
+    df = DataFrame({'Order Type': ['WEB', nan, 'BRE', '', 'WEB'], 'Zip': ['02108', '44101', nan, '', '44101']})
+    updates = {'Order Type': {'WEB': 'Web', nan: 'BRE', '': 'BRE'}, 'Missing': {'a': 'b'}}
+    expected = df.replace({'Order Type': {'WEB': 'Web', nan: 'BRE', '': 'BRE'}})
+    assert_frame_equal(replace_values(df.copy(), updates), expected)
+
+
+def categorical(df):
+    return MMO_ORDERS.apply(df.copy())
+
+
+ORDERS = DataFrame({'State': ['OH', nan, 'va', '', 'VA', 'OH'],
+                    'PlanYear': ['2019', '2020', nan, '', '2021', '2019'],
+                    'Full Name': ['Ann', 'Bob', 'Cy', 'Di', 'Ed', 'Flo']})
+UPDATES = {'State': {'va': 'VA', '': nan},
+           'PlanYear': {'2019': '2020', nan: '2021', '': '2021'}}
+
+
+def test_replace_values_matches_replace_on_categories():
+    expected = ORDERS.replace(UPDATES)
+    result = replace_values(categorical(ORDERS), UPDATES)
+    assert is_categorical_dtype(result['State']) and is_categorical_dtype(result['PlanYear'])
+    assert_frame_equal(result.astype(object), expected.astype(object))
+
+
+def test_replace_values_merges_categories():
+    result = replace_values(categorical(ORDERS), UPDATES)
+    assert list(result['State'].cat.categories) == ['OH', 'VA']
+    assert list(result['PlanYear'].cat.categories) == ['2020', '2021']
+    assert result['PlanYear'].value_counts().to_dict() == {'2020': 3, '2021': 3}
+
+
+def test_replace_values_sort_order():
+    expected = ORDERS.replace(UPDATES).sort_values(['PlanYear', 'State', 'Full Name'], kind='mergesort')
+    result = replace_values(categorical(ORDERS), UPDATES).sort_values(['PlanYear', 'State', 'Full Name'],
+                                                                      kind='mergesort')
+    assert result['Full Name'].tolist() == expected['Full Name'].tolist()
@@ -0,0 +1,32 @@
+# Python 3.7.2
+import pytest
+
+from instrument import RunReport
+
+MB = 1024 ** 2
+
+
+def test_nested_stage_keeps_outer_peak():
+    report = RunReport('test').start()
+    try:
+        with report.stage('outer'):
+            block = bytearray(20 * MB)
+            del block
+            with report.stage('inner'):
+                small = bytearray(MB)
+                del small
+    finally:
+        report.stop()
+    inner, outer = report.stages
+    assert inner['stage'] == 'inner' and outer['stage'] == 'outer'
+    assert outer['peak_memory_mb'] >= 20
+    assert 1 <= inner['peak_memory_mb'] < 20
+
+
+def test_failed_stage_is_recorded():
+    report = RunReport('test', memory=False).start()
+    with pytest.raises(KeyError):
+        with report.stage('lookup', rows_in=3):
+            raise KeyError('Contract Number')
+    assert report.stages[0]['error'] == "KeyError: 'Contract Number'"
+    assert report.open_stages == []
@@ -0,0 +1,86 @@
+# Python 3.7.2
+import pytest
+from numpy import nan
+from pandas import DataFrame, Timestamp, concat, read_excel
+
+from bench_data import write_weekly_files
+from mmo_billing import BillingLedger, summarize_week, week_date
+from mmo_fulfillment_billing import run_eom
+from mmo_rates import ANY, CHARGE_COLUMNS, DEFAULT_RATES, KEY_COLUMNS, RateTable
+from report_writer import write_report
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    ledger = BillingLedger(str(tmp_path / 'billing.sqlite'))
+    yield ledger
+    ledger.close()
+
+
+def test_periods_keep_same_named_files_apart(tmp_path, ledger):
+    january = write_weekly_files(str(tmp_path / 'january'), 40, weeks=2, seed=1)
+    february = write_weekly_files(str(tmp_path / 'february'), 60, weeks=2, seed=2)
+    assert ledger.update(january, period='2021-01') == ['12345678 W01A.xlsx', '12345678 W02A.xlsx']
+    assert ledger.update(february, period='2021-02') == ['12345678 W01A.xlsx', '12345678 W02A.xlsx']
+    assert ledger.update(february, period='2021-02') == []
+
+    assert ledger.latest_period('12345678') == '2021-02'
+    assert ledger.week_totals('12345678', '2021-01')['Count'].sum() == 40
+    totals = ledger.week_totals('12345678', '2021-02')
+    assert totals['Count'].sum() == 60
+    assert set(totals['Period']) == {'2021-02'}
+
+
+def test_closed_period_is_not_recorded_again(tmp_path, ledger):
+    files = write_weekly_files(str(tmp_path / 'weekly'), 20, weeks=1)
+    ledger.update(files, period='2021-01')
+    ledger.close_period('12345678', '2021-01')
+    assert ledger.is_closed('12345678', '2021-01')
+    assert ledger.update(files, period='2021-01') == []
+
+    changed = write_weekly_files(str(tmp_path / 'weekly'), 30, weeks=1)
+    with pytest.raises(ValueError):
+        ledger.update(changed, period='2021-01')
+    assert ledger.week_totals('12345678', '2021-01')['Count'].sum() == 20
+
+
+def weekly_file(filename, order_dates):
+    orders = DataFrame({'FULL NAME': 'Ann Lee', 'PRODUCT CODE': 'PEK', 'ORDER TYPE': 'WEB',
+                        'WEBTRENDSCAMPAIGNIDCODE': '', 'ORDER DATE': order_dates})
+    return write_report(orders, str(filename))
+
+
+def test_period_and_pricing_date_from_order_dates(tmp_path, ledger):
+    filename = weekly_file(tmp_path / '12345678 W05A.xlsx', ['01/27/2021', '02/01/2021', ''])
+    df = read_excel(filename)
+    assert week_date(df, filename) == Timestamp('2021-02-01')
+
+    assert ledger.update([filename]) == ['12345678 W05A.xlsx']
+    assert ledger.latest_period('12345678') == '2021-02'
+    assert ledger.update([filename]) == []
+
+
+def test_summarize_week_before_rates_raises():
+    df = DataFrame({'PRODUCT CODE': ['PEK'], 'ORDER TYPE': ['WEB'], 'WEBTRENDSCAMPAIGNIDCODE': ['']})
+    with pytest.raises(ValueError):
+        summarize_week(df, Timestamp('2019-12-31'))
+
+
+def test_eom_of_period_with_rates(tmp_path):
+    change = DataFrame([[ANY, 'BRE', '2021-02-01', 0.70, nan, nan, nan]], columns=KEY_COLUMNS + CHARGE_COLUMNS)
+    rates = RateTable(concat([DEFAULT_RATES, change], ignore_index=True))
+    ledger_path = str(tmp_path / 'billing.sqlite')
+    january = str(tmp_path / 'january')
+    write_weekly_files(january, 40, weeks=2)
+    run_eom(10, january, ledger_path=ledger_path, rates=rates, period='2021-01', close=True)
+    february = str(tmp_path / 'february')
+    write_weekly_files(february, 60, weeks=2, seed=1)
+    result = run_eom(10, february, ledger_path=ledger_path, rates=rates, period='2021-02')
+
+    assert result.totals['Count'] == 70
+    bre = read_excel(result.filename, sheet_name='Billing', header=3)
+    assert bre['Postage In'].iloc[-1] == pytest.approx(7.0)
+    ledger = BillingLedger(ledger_path)
+    assert ledger.is_closed('12345678', '2021-01')
+    assert not ledger.is_closed('12345678', '2021-02')
+    ledger.close()
@@ -0,0 +1,45 @@
+# Python 3.7.2
+from mmo_ledger import IngestLedger, order_key
+
+COLUMNS = ['Full Name', 'Address']
+
+
+def test_orders_are_recorded_once(tmp_path):
+    ledger = IngestLedger(str(tmp_path / 'ledger.sqlite'))
+    run_id = ledger.start_run()
+    new = ledger.record_file(run_id, 'a.xml', 'hash a', [['Ann Lee', 'Bob Day'], ['1 Main St', '2 Oak Ave']])
+    assert new == [['Ann Lee', 'Bob Day'], ['1 Main St', '2 Oak Ave']]
+    assert ledger.has_file('hash a')
+    assert not ledger.has_file('hash b')
+
+    new = ledger.record_file(run_id, 'b.xml', 'hash b', [['Bob Day', 'Cy Fox'], ['2 Oak Ave', '3 Elm St']])
+    assert new == [['Cy Fox'], ['3 Elm St']]
+    ledger.close()
+
+
+def test_pending_orders_survive_a_crashed_run(tmp_path):
+    db_path = str(tmp_path / 'ledger.sqlite')
+    ledger = IngestLedger(db_path)
+    first = ledger.start_run()
+    ledger.record_file(first, 'a.xml', 'hash a', [['Ann Lee'], ['1 Main St']])
+    ledger.complete_run(first)
+    crashed = ledger.start_run()
+    ledger.record_file(crashed, 'b.xml', 'hash b', [['Bob Day'], ['2 Oak Ave']])
+    ledger.close()
+
+    ledger = IngestLedger(db_path)
+    assert ledger.last_completed_run() == first
+    pending = ledger.pending_orders(COLUMNS)
+    assert list(pending.columns) == ['BRC_ID'] + COLUMNS
+    assert pending['Full Name'].tolist() == ['Bob Day']
+    assert ledger.orders_since(0, COLUMNS)['Full Name'].tolist() == ['Ann Lee', 'Bob Day']
+    ledger.close()
+
+
+def test_emitted_keys_by_day(tmp_path):
+    ledger = IngestLedger(str(tmp_path / 'ledger.sqlite'))
+    key = order_key(('Ann Lee', '1 Main St'))
+    ledger.record_emitted('2021-01-04', [key, key])
+    assert ledger.emitted_keys('2021-01-04') == {key}
+    assert ledger.emitted_keys('2021-01-05') == set()
+    ledger.close()
@@ -0,0 +1,20 @@
+# Python 3.7.2
+from numpy import nan
+from pandas import read_csv
+
+from bench_data import mmo_orders
+from mmo_import_xml import XmlImport
+from mmo_process_data import ProcessFile
+
+
+def test_lists_are_written_per_plan_year(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    orders = mmo_orders(300, seed=5).rename(columns=XmlImport('').header_dict).replace('', nan)
+    orders.insert(0, 'BRC_ID', value=nan)
+    job = ProcessFile(orders, output_format='csv', plan_year='2021')
+
+    lists = {year: read_csv(tmp_path / f'{year} list.csv', dtype=str) for year in ('2020', '2021')}
+    assert sorted(p.name for p in tmp_path.iterdir()) == ['2020 list.csv', '2021 list.csv']
+    assert sum(len(df.index) for df in lists.values()) == len(job.df.index)
+    for year, df in lists.items():
+        assert set(df['PLANYEAR']) == {year}
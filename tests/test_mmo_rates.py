@@ -0,0 +1,27 @@
+# Python 3.7.2
+import pytest
+from numpy import nan
+from pandas import DataFrame, concat
+
+from mmo_rates import ANY, CHARGE_COLUMNS, DEFAULT_RATES, KEY_COLUMNS, PEK, RateTable
+
+ORDERS = DataFrame({'PRODUCT CODE': ['PEK', 'UMG', None], 'ORDER TYPE': ['WEB', 'BRE', 'WEB']})
+
+
+def test_rates_as_of_date():
+    change = DataFrame([['PEK', ANY, '2021-02-01', nan, 9.0, nan, nan]], columns=KEY_COLUMNS + CHARGE_COLUMNS)
+    rates = RateTable(concat([DEFAULT_RATES, change], ignore_index=True))
+    assert rates.price(ORDERS, as_of='2021-01-31')['Postage Out'].tolist() == [PEK, 1.84, 0]
+    assert rates.price(ORDERS, as_of='2021-02-01')['Postage Out'].tolist() == [9.0, 1.84, 0]
+
+
+def test_no_rates_in_effect_raises():
+    with pytest.raises(ValueError, match='No rates in effect on 2019-12-31'):
+        RateTable().price(ORDERS, as_of='2019-12-31')
+
+
+def test_order_without_rate_row_raises():
+    rates = RateTable(DEFAULT_RATES.loc[DEFAULT_RATES['Product Code'] != ANY])
+    assert rates.price(ORDERS.iloc[:2], as_of='2021-01-04')['Postage Out'].tolist() == [PEK, 1.84]
+    with pytest.raises(ValueError, match="product code None, order type 'WEB'"):
+        rates.price(ORDERS, as_of='2021-01-04')
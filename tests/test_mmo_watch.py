@@ -0,0 +1,78 @@
+# Python 3.7.2
+from os import listdir
+
+import pytest
+from pandas import read_csv
+
+from bench_data import mmo_orders, write_mmo_xml
+import mmo_watch
+from mmo_process_data import ProcessFile
+from mmo_watch import OrderWatcher
+
+
+@pytest.fixture
+def drop_folder(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    xml_dir = tmp_path / 'xml'
+    write_mmo_xml(mmo_orders(200, seed=3), str(xml_dir), files=2)
+    return str(xml_dir)
+
+
+def watcher(tmp_path, xml_dir):
+    return OrderWatcher(xml_dir, str(tmp_path), str(tmp_path / 'ledger.sqlite'), window=0, poll=0, settle=0,
+                        plan_year='2021', events=False)
+
+
+def read_outputs(tmp_path):
+    return {f.name: read_csv(f, dtype=str) for f in tmp_path.glob('*.csv')}
+
+
+def test_replayed_batch_writes_orders_once(tmp_path, drop_folder, monkeypatch):
+    crashing = watcher(tmp_path, drop_folder)
+
+    def crash(run_id):
+        raise RuntimeError('crashed before the run completed')
+
+    monkeypatch.setattr(crashing.ledger, 'complete_run', crash)
+    with pytest.raises(RuntimeError):
+        crashing.run(once=True)
+    first = read_outputs(tmp_path)
+
+    write_mmo_xml(mmo_orders(100, seed=4), drop_folder, files=1)
+    watcher(tmp_path, drop_folder).run(once=True)
+    outputs = read_outputs(tmp_path)
+
+    raw = [name for name in outputs if name.startswith('MMO_XML_ORDER')]
+    assert len(raw) == 1
+    assert len(first[raw[0]].index) == 200
+    assert len(outputs[raw[0]].index) == 300
+    lists = [df for name, df in outputs.items() if ' list ' in name]
+    assert {year for df in lists for year in df['PLANYEAR']} == {'2020', '2021'}
+    for df in lists:
+        assert not df.duplicated(['FULL NAME', 'ADDRESS']).any()
+
+
+def test_failed_batch_is_retried(tmp_path, drop_folder, monkeypatch):
+    service = watcher(tmp_path, drop_folder)
+    calls, waits = [], []
+
+    def process_file(*args, **kwargs):
+        calls.append(listdir(drop_folder))
+        if len(calls) == 1:
+            raise ValueError('bad batch')
+        return ProcessFile(*args, **kwargs)
+
+    def wait(timeout):
+        waits.append(timeout)
+        if len(calls) == 2 or len(waits) > 5:
+            raise KeyboardInterrupt
+
+    monkeypatch.setattr(mmo_watch, 'ProcessFile', process_file)
+    monkeypatch.setattr(service.folder, 'wait', wait)
+    with pytest.raises(KeyboardInterrupt):
+        service.run()
+    # The failed batch's files were archived before ProcessFile ran; the retry replays its orders.
+    assert len(calls) == 2
+    assert not [f for f in calls[1] if f.endswith('.xml')]
+    raw = [df for name, df in read_outputs(tmp_path).items() if name.startswith('MMO_XML_ORDER')]
+    assert len(raw[0].index) == 200
@@ -0,0 +1,36 @@
+# Python 3.7.2
+import re
+
+from numpy import nan
+from pandas import DataFrame, Series
+
+from input_schema import STRING
+import normalize
+from normalize import clean_series, normalize_frame
+
+NAMES = ['ann   lee', 'BOB  o\'DAY', nan, 'cy fox', 'TEST user']
+
+
+def old_clean(value):
+    return re.sub(' +', ' ', value.title()) if isinstance(value, str) else nan
+
+
+def test_clean_series_matches_title_and_re():
+    expected = [old_clean(v) for v in NAMES]
+    assert clean_series(Series(NAMES)).equals(Series(expected))
+    strings = clean_series(Series(NAMES, dtype=STRING))
+    assert strings.dtype == STRING
+    assert strings.astype(object).where(strings.notna(), nan).equals(Series(expected, dtype=object))
+
+
+def test_non_text_values_become_null():
+    result = clean_series(Series(['main  st', 12, nan], dtype=object))
+    assert result[0] == 'Main St' and result[1:].isna().all()
+
+
+def test_test_records_removed():
+    frame = DataFrame({'Full Name': NAMES, 'City': ['akron'] * 5})
+    assert normalize.test_record_mask(frame['Full Name']).tolist() == [False, False, False, False, True]
+    result = normalize_frame(frame, ['Full Name', 'City'], test_column='Full Name')
+    assert result['City'].tolist() == ['Akron'] * 4
+    result['City'] = 'Dayton'  # a copy, not a view of the filtered frame